@@ -1,4 +1,5 @@
-from .py3CL import DPEInput, DPE, abaques_configs
+from .py3CL import DPEInput, DPE, abaques_configs, build_abaques_bundle
+from .solver import LabelSolver
 
 from py3cl.utils import (
     serialize_function,
@@ -26,6 +27,22 @@ from py3cl.libs import (
     vectorized_safe_divide,
     set_community,
     iterative_merge,
+    content_hash,
+    save_bundle,
+    load_bundle,
+    AbaqueRegistry,
+    LookupCache,
+    ClimateContext,
+    DepartmentResolver,
+    department_code,
+    safe_divide_many,
+    safe_divide_rows,
+    segment_sum,
+    segment_total,
+    segment_mean,
+    element_table,
+    Pipeline,
+    Stage,
 )
 
 
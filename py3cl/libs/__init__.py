@@ -1,11 +1,25 @@
 from py3cl.libs.abaques import Abaque
 from py3cl.libs.base import BaseProcessor
+from py3cl.libs.batch import (
+    safe_divide_many,
+    safe_divide_rows,
+    segment_sum,
+    segment_total,
+    segment_mean,
+    element_table,
+)
+from py3cl.libs.bundle import content_hash, save_bundle, load_bundle
+from py3cl.libs.cache import LookupCache
 from py3cl.libs.chauffage import Chauffage, ChauffageInput
+from py3cl.libs.climate import ClimateContext
 from py3cl.libs.climatisation import Climatisation, ClimatisationInput
 from py3cl.libs.ecs import ECS, EcsInput
+from py3cl.libs.geography import DepartmentResolver, department_code
 from py3cl.libs.ouvrants import Vitrage, VitrageInput
 from py3cl.libs.parois import Paroi, ParoiInput
+from py3cl.libs.pipeline import Pipeline, Stage
 from py3cl.libs.ponts_thermiques import PontThermique, PontThermiqueInput
+from py3cl.libs.registry import AbaqueRegistry
 from py3cl.libs.utils import (
     safe_divide,
     vectorized_safe_divide,
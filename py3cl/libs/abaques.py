@@ -10,6 +10,308 @@ import os
 from py3cl.utils import save_config, load_config
 import json
 from itertools import product
+from bisect import bisect_left, bisect_right
+from py3cl.libs import transforms
+from py3cl.libs.cache import LookupCache
+
+MISSING_VALUE = "Unknown or Empty"
+
+
+def is_missing(val):
+    """
+    Fast scalar equivalent of the missing value test used by Abaque.standardize_missing_values.
+
+    Returns True or False for the usual scalar types, and None when the value is of a type
+    that cannot be decided cheaply (the caller should then use the reference implementation).
+    """
+    if val is None:
+        return True
+    t = type(val)
+    if t is str:
+        return val == "NULL"
+    if t is float or t is np.float64 or t is np.float32:
+        return val != val
+    if t is int or t is bool or t is np.int64 or t is np.bool_:
+        return False
+    return None
+
+
+class SortedIntervalIndex:
+    """
+    Index over the numeric candidates of one categorical combination of an abaque.
+
+    Resolves the numeric fallback of Abaque.forward: the first candidate (in the order of the
+    abaque) having at least one numeric key greater or equal to the query. Each numeric column
+    is sorted once, with the suffix minimum of the candidate positions, so that a query costs
+    one binary search per numeric key instead of a scan of all the candidates.
+
+    Attributes:
+    -----------
+    candidates : np.ndarray
+        The (n_candidates, n_num_keys) array of candidate numeric values.
+    """
+
+    def __init__(self, candidates):
+        self.candidates = np.asarray(candidates)
+        values = self.candidates.astype(float)
+        self.sorted_values = []
+        self.first_positions = []
+        for j in range(values.shape[1]):
+            order = np.argsort(values[:, j], kind="stable")
+            order = order[~np.isnan(values[order, j])]
+            self.sorted_values.append(values[order, j])
+            self.first_positions.append(np.minimum.accumulate(order[::-1])[::-1])
+        # Plain lists for the scalar path, bisect being faster than numpy on scalars
+        self._sorted_lists = [v.tolist() for v in self.sorted_values]
+        self._first_lists = [v.tolist() for v in self.first_positions]
+
+    def __getstate__(self):
+        """Pickles the arrays only, the plain lists being rebuilt on first use."""
+        state = self.__dict__.copy()
+        state["_sorted_lists"] = None
+        state["_first_lists"] = None
+        return state
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def first(self, query):
+        """
+        Returns the position of the first candidate matching the query, -1 if there is none.
+
+        Parameters:
+        -----------
+        query : list
+            The numeric values, one per numeric key.
+        """
+        if self._sorted_lists is None:
+            self._sorted_lists = [v.tolist() for v in self.sorted_values]
+            self._first_lists = [v.tolist() for v in self.first_positions]
+        best = len(self.candidates)
+        for sorted_values, first_positions, q in zip(
+            self._sorted_lists, self._first_lists, query
+        ):
+            i = bisect_left(sorted_values, q)
+            if i < len(sorted_values) and first_positions[i] < best:
+                best = first_positions[i]
+        return best if best < len(self.candidates) else -1
+
+    def first_many(self, queries):
+        """
+        Batch version of first.
+
+        Parameters:
+        -----------
+        queries : np.ndarray
+            The (n_queries, n_num_keys) array of numeric values.
+
+        Returns:
+        --------
+        Array of candidate positions, -1 where no candidate matches.
+        """
+        n = len(self.candidates)
+        best = np.full(len(queries), n, dtype=np.int64)
+        for j, (sorted_values, first_positions) in enumerate(
+            zip(self.sorted_values, self.first_positions)
+        ):
+            if len(sorted_values) == 0:
+                continue
+            i = np.searchsorted(sorted_values, queries[:, j], side="left")
+            found = i < len(sorted_values)
+            positions = first_positions[np.minimum(i, len(sorted_values) - 1)]
+            best = np.minimum(best, np.where(found, positions, n))
+        return np.where(best < n, best, -1)
+
+
+class CodedColumn:
+    """
+    A column of Python objects, stored as the int codes of its values in the array of its
+    distinct values.
+
+    Only the distinct values are Python objects, the codes being a plain ndarray (memory-mapped
+    when the abaque is restored from a bundle). Indexing returns the same values as the original
+    column, of the same type: 1 and 1.0, or 0.0 and -0.0, get different codes.
+
+    Attributes:
+    -----------
+    uniques : np.ndarray
+        The object array of the distinct values, in the order of their first occurrence.
+    codes : np.ndarray
+        The int32 array of the position of each value in uniques.
+    """
+
+    dtype = np.dtype(object)
+
+    def __init__(self, values):
+        positions = {}
+        uniques = []
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, val in enumerate(values):
+            key = (type(val), repr(val) if isinstance(val, float) else val)
+            try:
+                code = positions.setdefault(key, len(uniques))
+            except TypeError:
+                code = len(uniques)
+            if code == len(uniques):
+                uniques.append(val)
+            codes[i] = code
+        self.uniques = np.empty(len(uniques), dtype=object)
+        for i, val in enumerate(uniques):
+            self.uniques[i] = val
+        self.codes = codes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        return self.uniques[self.codes[index]]
+
+    def decode(self):
+        """Returns the column as an object ndarray."""
+        return self.uniques[self.codes]
+
+
+class Canonicalizer:
+    """
+    Maps the raw inputs of an abaque to their canonical form, compiled from its key_characteristics
+    and compiled columns.
+
+    Missing values (None, NaN, "NULL") become "Unknown or Empty". Categorical keys are encoded to
+    the int code of their value, numeric keys to the index of their upper threshold (as in
+    Abaque.compile_lookup), -1 when the value cannot be encoded.
+
+    Attributes:
+    -----------
+    names : list
+        The names of the keys, in the order of the compiled columns.
+    codes : dict
+        The int code of each value, by categorical key.
+    thresholds : dict
+        The sorted upper thresholds, by numeric key.
+    members : dict
+        The set of the values in key_characteristics, by categorical key.
+    """
+
+    def __init__(self, columns, key_characteristics):
+        self.names = [name for name, _, _, _ in columns]
+        self.codes = {
+            name: codes for name, codes, thresholds, _ in columns if thresholds is None
+        }
+        self.thresholds = {
+            name: np.asarray(thresholds, dtype=float)
+            for name, _, thresholds, _ in columns
+            if thresholds is not None
+        }
+        self.members = {}
+        for name in self.codes:
+            try:
+                self.members[name] = frozenset(key_characteristics[name])
+            except (KeyError, TypeError):
+                pass
+
+    @staticmethod
+    def value(val):
+        """Returns "Unknown or Empty" for the missing values, and val otherwise."""
+        missing = is_missing(val)
+        if missing is None:
+            missing = pd.isna(val) or val in [None, "NULL"]
+        return MISSING_VALUE if missing else val
+
+    def contains(self, name, val):
+        """Tests if val is one of the values of the categorical key name."""
+        try:
+            return val in self.members[name]
+        except TypeError:
+            return False
+
+    def encode_many(self, columns):
+        """
+        Encodes columns of raw inputs.
+
+        Parameters:
+        -----------
+        columns : dict[str, np.ndarray]
+            One array of inputs per key, as prepared by Abaque._prepare_columns.
+
+        Returns:
+        --------
+        Dictionary of int64 arrays of codes, by key, -1 where the input cannot be encoded.
+        """
+        encoded = {}
+        for name in self.names:
+            if name in self.thresholds:
+                encoded[name] = self._snap(columns[name], self.thresholds[name])
+            else:
+                encoded[name] = self._encode(columns[name], self.codes[name])
+        return encoded
+
+    @staticmethod
+    def _factorize(arr):
+        """
+        Factorizes a column, the missing values (as in Canonicalizer.value) being
+        replaced by "Unknown or Empty". Returns None if the column cannot be factorized.
+        """
+        try:
+            labels, uniques = pd.factorize(arr)
+        except TypeError:
+            return None
+        uniques = list(uniques)
+        uniques = [MISSING_VALUE if is_missing(u) else u for u in uniques]
+        if (labels < 0).any():
+            labels = np.where(labels < 0, len(uniques), labels)
+            uniques.append(MISSING_VALUE)
+        return labels, uniques
+
+    @classmethod
+    def _encode(cls, arr, codes):
+        """Maps a categorical column to its int codes, -1 for unknown values."""
+        factorized = cls._factorize(arr)
+        if factorized is None:
+            out = np.full(len(arr), -1, dtype=np.int64)
+            for i, v in enumerate(arr):
+                try:
+                    out[i] = codes.get(MISSING_VALUE if is_missing(v) else v, -1)
+                except TypeError:
+                    pass
+            return out
+        labels, uniques = factorized
+        mapping = np.array([codes.get(u, -1) for u in uniques], dtype=np.int64)
+        return mapping[labels] if len(mapping) else labels.astype(np.int64)
+
+    @classmethod
+    def _snap(cls, arr, thresholds):
+        """
+        Maps a numeric column to the index of its upper threshold, -1 for the values that
+        forward cannot snap.
+
+        As in forward, text inputs (including the missing values, standardized to
+        "Unknown or Empty") are snapped by numpy against the thresholds cast to str.
+        """
+        if arr.dtype.kind in "fiub":
+            num_values = arr.astype(float)
+            code = np.searchsorted(thresholds, num_values, side="right") - 1
+            code = np.maximum(code, 0)
+            missing = np.isnan(num_values)
+            if missing.any():
+                code[missing] = cls._snap_text(MISSING_VALUE, thresholds)
+            return code
+        factorized = cls._factorize(arr)
+        if factorized is None:
+            return np.full(len(arr), -1, dtype=np.int64)
+        labels, uniques = factorized
+        mapping = np.full(len(uniques), -1, dtype=np.int64)
+        for i, u in enumerate(uniques):
+            if isinstance(u, str):
+                mapping[i] = cls._snap_text(u, thresholds)
+            elif isinstance(u, (int, float, np.number)):
+                mapping[i] = max(
+                    np.searchsorted(thresholds, float(u), side="right") - 1, 0
+                )
+        return mapping[labels]
+
+    @staticmethod
+    def _snap_text(label, thresholds):
+        return max(np.searchsorted(thresholds, label, side="right") - 1, 0)
 
 
 class Abaque:
@@ -19,7 +321,7 @@ class Abaque:
     Attributes:
     -----------
     abaque : pd.DataFrame
-        DataFrame that stores the main data.
+        DataFrame that stores the main data while the abaque is built. None once compiled.
     upper_thresholds : dict
         Dictionary to store upper threshold values for numeric keys.
     key_characteristics : dict
@@ -28,6 +330,13 @@ class Abaque:
         Dictionary to store valid combinations of categorical keys.
     config : dict
         Configuration dictionary loaded from a file.
+    compiled : dict
+        Integer coded representation of the abaque, built by compile_lookup. It replaces the
+        DataFrame and its dict once built.
+    canonicalizer : Canonicalizer
+        Canonical form of the inputs, built by compile_lookup.
+    cache : LookupCache
+        Optional memo of the resolved rows, None when disabled.
 
     Methods:
     --------
@@ -46,13 +355,28 @@ class Abaque:
     process_references(refs, data_path):
         Processes reference files to replace column values based on external data.
     apply_mapping(mapping):
-        Applies transformation functions to specified columns.
+        Applies named transforms (see py3cl.libs.transforms) to specified columns.
     apply_reduction(reduce):
-        Reduces multiple columns into a new column based on a specified function.
+        Reduces multiple columns into a new column based on a named reduction.
     initialize_valid_cat_combinations():
         Initializes valid categorical combinations by filtering and deduplicating values.
+    compile_lookup():
+        Builds the integer coded representation used by __call__.
+    release_tables():
+        Drops the DataFrame and the dicts replaced by the compiled representation.
+    lookup_many(columns, value):
+        Vectorized lookup of a value for many rows at once.
+    fetch(keys, values), fetch_many(columns, values):
+        Retrieve several values of the same row, resolving the keys once.
+    has_key_value(key, val):
+        O(1) membership test of a value in the values of a categorical key.
+    enable_cache(capacity, policy), disable_cache(), cache_stats():
+        Manage an optional bounded memo of the resolved rows.
     """
 
+    # Above this number of cells, the compiled row index is stored as a sparse dict
+    COMPILED_DENSE_LIMIT = 1_000_000
+
     def __init__(self, config, name, data_path, **kwargs):
         """
         Constructs all the necessary attributes for the Abaque object.
@@ -68,9 +392,13 @@ class Abaque:
         self.abaque = None
         self.data_path = data_path
         self.upper_thresholds = {}
-        self.key_characteristics = {}
+        self._key_characteristics = {}
 
-        self.valid_cat_combinations = {}
+        self._valid_cat_combinations = {}
+        self.interval_index = {}
+        self.compiled = None
+        self.canonicalizer = None
+        self.cache = None
         self.config = load_config(config)
         self.config["data_path"] = data_path
         self.load_abaques(**self.config)
@@ -90,8 +418,28 @@ Values: {self.values()}
     def __repr__(self):
         return self.__str__()
 
+    def __setstate__(self, state):
+        """Restores a pickled Abaque, the __dict__ method preventing the default behaviour."""
+        for key, val in state.items():
+            setattr(self, key, val)
+
     def keys(self):
-        return self.abaque.index.names
+        return self.key_names
+
+    @property
+    def key_characteristics(self):
+        """The unique values of the categorical keys, the min and max of the numeric ones."""
+        return {
+            name: value.decode() if isinstance(value, CodedColumn) else value
+            for name, value in self._key_characteristics.items()
+        }
+
+    @property
+    def valid_cat_combinations(self):
+        """The distinct combinations of the categorical keys, as a list of records."""
+        combinations = self._valid_cat_combinations
+        columns = [column.decode() for column in combinations.values()]
+        return [dict(zip(combinations, values)) for values in zip(*columns)]
 
     def values(self):
         return self.config["values"]
@@ -113,11 +461,339 @@ Values: {self.values()}
         The retrieved value from the abaque.
         """
         if value is None:
-            return self.forward(keys)[self.config["values"][0]]
+            value = self.config["values"][0]
+        if self.compiled is not None:
+            row = self._lookup_row(keys)
+            if row >= 0:
+                return self.compiled["values"][value][row]
         out = self.forward(keys)
         return out[value]
 
+    def fetch(self, keys, values=None):
+        """
+        Retrieves several values of the same row, resolving the keys only once.
+
+        Parameters:
+        -----------
+        keys : dict
+            Dictionary of keys to be used for lookup.
+        values : list[str]
+            The values to be retrieved from the abaque. If None, all the values are returned.
+
+        Returns:
+        --------
+        Dictionary of the retrieved values, by name.
+        """
+        if values is None:
+            values = self.config["values"]
+        if self.compiled is not None:
+            row = self._lookup_row(keys)
+            if row >= 0:
+                return {v: self.compiled["values"][v][row] for v in values}
+        out = self.forward(keys)
+        return {v: out[v] for v in values}
+
+    def has_key_value(self, key, val):
+        """
+        Tests if a value is one of the values of a categorical key of the abaque, in O(1).
+
+        Parameters:
+        -----------
+        key : str
+            The name of the categorical key.
+        val :
+            The raw value to be tested.
+
+        Returns:
+        --------
+        True if val is in key_characteristics[key].
+        """
+        if self.canonicalizer is not None and key in self.canonicalizer.members:
+            return self.canonicalizer.contains(key, val)
+        return val in self.key_characteristics[key]
+
+    def enable_cache(self, capacity=1024, policy="lru"):
+        """
+        Memoizes the resolved rows of __call__ and fetch in a bounded cache.
+
+        Parameters:
+        -----------
+        capacity : int
+            The maximum number of memoized inputs.
+        policy : str
+            The eviction policy, 'lru' or 'fifo'.
+        """
+        self.cache = LookupCache(capacity, policy)
+
+    def disable_cache(self):
+        """
+        Removes the memo cache of the abaque.
+        """
+        self.cache = None
+
+    def cache_stats(self):
+        """
+        Returns:
+        --------
+        The counters of the memo cache, or None if it is disabled.
+        """
+        return self.cache.stats() if self.cache is not None else None
+
+    def _lookup_row(self, keys):
+        """Resolves the row of keys, through the memo cache if it is enabled."""
+        if self.cache is None:
+            return self.resolve_row(keys)
+        cache_key = self._cache_key(keys)
+        if cache_key is None:
+            return self.resolve_row(keys)
+        row = self.cache.get(cache_key)
+        if row is None:
+            row = self.resolve_row(keys)
+            if row >= 0:
+                self.cache.put(cache_key, row)
+        return row
+
+    def _cache_key(self, keys):
+        """
+        The inputs of keys in the order of the compiled columns, with the missing values
+        canonicalised, or None if they cannot be used as a cache key.
+        """
+        key = []
+        for name, _, _, _ in self.compiled["columns"]:
+            if name not in keys:
+                return None
+            val = keys[name]
+            missing = is_missing(val)
+            if missing is None:
+                return None
+            key.append(MISSING_VALUE if missing else val)
+        key = tuple(key)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def resolve_row(self, keys):
+        """
+        Resolves the keys against the compiled representation of the abaque.
+
+        Categorical keys are mapped to their int code, numeric keys are snapped to the index
+        of their upper threshold, and the flat code is used to address the row index. If the
+        exact key misses, the numeric fallback of forward is resolved with the
+        SortedIntervalIndex of the categorical combination.
+
+        Parameters:
+        -----------
+        keys : dict
+            Dictionary of keys to be used for lookup.
+
+        Returns:
+        --------
+        The row number in the compiled value arrays, or -1 if the key cannot be resolved
+        (or the input cannot be handled by the compiled path).
+        """
+        flat = 0
+        cat_flat = 0
+        query = []
+        for name, codes, thresholds, stride in self.compiled["columns"]:
+            if name not in keys:
+                return -1
+            val = keys[name]
+            missing = is_missing(val)
+            if missing is None:
+                return -1
+            if missing:
+                val = MISSING_VALUE
+            if thresholds is not None:
+                try:
+                    idx = bisect_right(thresholds, val) - 1
+                except TypeError:
+                    return -1
+                code = idx if idx > 0 else 0
+                query.append(thresholds[code])
+            else:
+                try:
+                    code = codes.get(val)
+                except TypeError:
+                    return -1
+                if code is None:
+                    return -1
+                cat_flat += code * stride
+            flat += code * stride
+        rows = self.compiled["rows"]
+        row = rows.get(flat, -1) if isinstance(rows, dict) else rows[flat]
+        if row >= 0 or self.compiled["fallback"] is None:
+            return row
+
+        fallback = self.compiled["fallback"]
+        group = fallback["groups"].get(cat_flat)
+        if group is None:
+            return -1
+        index, num_flat = group
+        position = index.first(query)
+        flat = cat_flat + (
+            num_flat[position] if position >= 0 else fallback["max_flat"]
+        )
+        return rows.get(flat, -1) if isinstance(rows, dict) else rows[flat]
+
+    def lookup_many(self, columns, value=None):
+        """
+        Vectorized equivalent of __call__, for many rows at once.
+
+        The same missing value normalisation, upper threshold snapping and numeric fallback
+        as forward are applied, column-wise.
+
+        Parameters:
+        -----------
+        columns : dict[str, np.ndarray] or pd.DataFrame
+            One array of inputs per key of the abaque. Scalars are broadcast to all rows.
+        value : str
+            The value to be retrieved from the abaque.
+            WARNING: If value is None, the first value in the 'values' list will be returned.
+
+        Returns:
+        --------
+        Tuple (values, miss). values is a float array (NaN on misses) for numeric value
+        columns and an object array (None on misses) otherwise. miss is a boolean array,
+        True for the rows where __call__ would have raised.
+        """
+        if value is None:
+            value = self.config["values"][0]
+        rows = self.resolve_rows(columns)
+        miss = rows < 0
+        array = self.compiled["arrays"][value]
+        out = array[np.where(miss, 0, rows)]
+        out[miss] = np.nan if array.dtype.kind == "f" else None
+        return out, miss
+
+    def fetch_many(self, columns, values=None):
+        """
+        Vectorized equivalent of fetch, resolving the keys of each row only once.
+
+        Parameters:
+        -----------
+        columns : dict[str, np.ndarray] or pd.DataFrame
+            One array of inputs per key of the abaque. Scalars are broadcast to all rows.
+        values : list[str]
+            The values to be retrieved from the abaque. If None, all the values are returned.
+
+        Returns:
+        --------
+        Tuple (values, miss). values is a tuple with one array per requested value, as
+        returned by lookup_many. miss is a boolean array, True for the rows that cannot
+        be resolved.
+        """
+        if values is None:
+            values = self.config["values"]
+        rows = self.resolve_rows(columns)
+        miss = rows < 0
+        safe_rows = np.where(miss, 0, rows)
+        out = []
+        for value in values:
+            array = self.compiled["arrays"][value][safe_rows]
+            array[miss] = np.nan if array.dtype.kind == "f" else None
+            out.append(array)
+        return tuple(out), miss
+
+    def resolve_rows(self, columns):
+        """
+        Vectorized equivalent of resolve_row, including the numeric fallback of forward.
+
+        Parameters:
+        -----------
+        columns : dict[str, np.ndarray] or pd.DataFrame
+            One array of inputs per key of the abaque. Scalars are broadcast to all rows.
+
+        Returns:
+        --------
+        Array of row numbers in the compiled value arrays, -1 for the rows that cannot be
+        resolved.
+        """
+        if self.compiled is None:
+            raise ValueError(f"Abaque {self.name} has no compiled lookup.")
+        n, columns = self._prepare_columns(columns)
+        if any(name not in columns for name in self.canonicalizer.names):
+            return np.full(n, -1, dtype=np.int64)
+        encoded = self.canonicalizer.encode_many(columns)
+        flat = np.zeros(n, dtype=np.int64)
+        cat_flat = np.zeros(n, dtype=np.int64)
+        valid = np.ones(n, dtype=bool)
+        snapped = {}
+        for name, codes, thresholds, stride in self.compiled["columns"]:
+            code = encoded[name]
+            if thresholds is not None:
+                snapped[name] = self.canonicalizer.thresholds[name][np.maximum(code, 0)]
+            else:
+                cat_flat += np.maximum(code, 0) * stride
+            valid &= code >= 0
+            flat += np.maximum(code, 0) * stride
+
+        rows = np.full(n, -1, dtype=np.int64)
+        rows[valid] = self._rows_at(flat[valid])
+
+        fallback = self.compiled["fallback"]
+        todo = np.flatnonzero(valid & (rows < 0))
+        if fallback is not None and len(todo) > 0:
+            queries = np.stack(
+                [snapped[k][todo] for k in fallback["num_columns"]], axis=1
+            )
+            groups, inverse = np.unique(cat_flat[todo], return_inverse=True)
+            for g, group in enumerate(groups):
+                candidates = fallback["groups"].get(int(group))
+                if candidates is None:
+                    continue
+                index, num_flat = candidates
+                sel = np.flatnonzero(inverse == g)
+                positions = index.first_many(queries[sel])
+                first = np.where(
+                    positions >= 0,
+                    num_flat[np.maximum(positions, 0)],
+                    fallback["max_flat"],
+                )
+                rows[todo[sel]] = self._rows_at(group + first)
+        return rows
+
+    def _rows_at(self, flat):
+        rows = self.compiled["rows"]
+        if isinstance(rows, dict):
+            return np.array([rows.get(f, -1) for f in flat.tolist()], dtype=np.int64)
+        return rows[flat]
+
+    @staticmethod
+    def _prepare_columns(columns):
+        """Converts the batch inputs to arrays of the same length."""
+        if isinstance(columns, pd.DataFrame):
+            columns = {k: columns[k].to_numpy() for k in columns.columns}
+        n = None
+        for v in columns.values():
+            if isinstance(v, (list, tuple, np.ndarray, pd.Series)):
+                n = len(v)
+                break
+        if n is None:
+            n = 1
+        prepared = {}
+        for k, v in columns.items():
+            if isinstance(v, pd.Series):
+                v = v.to_numpy()
+            if isinstance(v, (list, tuple)):
+                arr = np.empty(len(v), dtype=object)
+                arr[:] = v
+            elif isinstance(v, np.ndarray):
+                arr = v.astype(object) if v.dtype.kind in "US" else v
+            else:
+                arr = np.empty(n, dtype=object)
+                arr[:] = [v] * n
+            prepared[k] = arr
+        return n, prepared
+
     def forward(self, keys):
+        """
+        Reference implementation of the lookup, working on the rows of the abaque by their keys.
+
+        __call__ only uses it when the compiled path misses, to apply the numeric fallback
+        and to raise the errors.
+        """
         processed_input = self.standardize_missing_values(keys)
 
         for key, val in processed_input.items():
@@ -129,35 +805,108 @@ Values: {self.values()}
                 processed_input[key] = val
 
         try:
-            inputs = tuple(processed_input[k] for k in self.abaque.index.names)
+            inputs = tuple(processed_input[k] for k in self.key_names)
             if len(inputs) == 1:
                 inputs = inputs[0]
-            result = self.abaque_dict[inputs]
+            result = self._row(inputs)
         except KeyError:
             try:
-                if len(self.cat_columns) > 0:
-                    cat_inputs = tuple(processed_input[k] for k in self.cat_columns)
-                    if len(cat_inputs) == 1:
-                        cat_inputs = cat_inputs[0]
-                    num_candidates = self.num_abaque[cat_inputs]
-                else:
-                    num_candidates = self.index.values
+                cat_inputs = tuple(processed_input[k] for k in self.cat_columns)
+                if len(cat_inputs) == 1:
+                    cat_inputs = cat_inputs[0]
+                index = self._interval_index(cat_inputs)
 
-                num_values = np.array([processed_input[k] for k in self.num_columns])
-                idx = np.where(num_candidates >= num_values)[0]
+                num_values = [processed_input[k] for k in self.num_columns]
+                position = index.first(num_values)
                 for i, k in enumerate(self.num_columns):
-                    if len(idx) == 0:
+                    if position < 0:
                         processed_input[k] = self.key_characteristics[k]["max"]
                     else:
-                        processed_input[k] = num_candidates[idx[0], i]
-                inputs = tuple(processed_input[k] for k in self.abaque.index.names)
-                result = self.abaque_dict[inputs]
+                        processed_input[k] = index.candidates[position, i]
+                inputs = tuple(processed_input[k] for k in self.key_names)
+                result = self._row(inputs)
             except Exception as e:
                 raise ValueError(
                     f"An error occurred while processing input {processed_input} for Abaque {self.name}. Details: {str(e)}"
                 ) from None
         return result
 
+    def _codes(self, inputs, names):
+        """
+        Returns the compiled codes of the values of the given keys, or None if one of them is
+        not a key value of the abaque. As with a dict lookup, unhashable values raise a TypeError.
+        """
+        hash(inputs)
+        columns = {
+            name: (codes, thresholds)
+            for name, codes, thresholds, _ in self.compiled["columns"]
+        }
+        out = []
+        for name, val in zip(names, inputs):
+            codes, thresholds = columns[name]
+            if thresholds is None:
+                code = codes.get(val)
+            else:
+                try:
+                    code = bisect_left(thresholds, val)
+                except TypeError:
+                    return None
+                if code == len(thresholds) or thresholds[code] != val:
+                    return None
+            if code is None:
+                return None
+            out.append(code)
+        return out
+
+    def _row(self, inputs):
+        """
+        Returns the values of the row of the given key values, in the order of keys() (the value
+        itself for a single key), as abaque_dict[inputs] before the abaque is compiled.
+
+        Raises:
+        -------
+        KeyError
+            If the abaque has no such row.
+        """
+        if self.compiled is None:
+            return self.abaque_dict[inputs]
+        names = self.key_names
+        codes = self._codes(inputs if len(names) > 1 else (inputs,), names)
+        if codes is None:
+            raise KeyError(inputs)
+        flat = sum(
+            code * stride
+            for code, (_, _, _, stride) in zip(codes, self.compiled["columns"])
+        )
+        rows = self.compiled["rows"]
+        row = rows.get(flat, -1) if isinstance(rows, dict) else rows[flat]
+        if row < 0:
+            raise KeyError(inputs)
+        return {value: column[row] for value, column in self.compiled["values"].items()}
+
+    def _interval_index(self, cat_inputs):
+        """
+        Returns the SortedIntervalIndex of a combination of the categorical keys (the value itself
+        for a single categorical key), as interval_index[cat_inputs] before the abaque is compiled.
+
+        Raises:
+        -------
+        KeyError
+            If the abaque has no numeric candidates for this combination.
+        """
+        if self.compiled is None:
+            return self.interval_index[cat_inputs]
+        names = self.cat_columns
+        codes = self._codes(cat_inputs if len(names) != 1 else (cat_inputs,), names)
+        fallback = self.compiled["fallback"]
+        if codes is None or fallback is None:
+            raise KeyError(cat_inputs)
+        strides = {name: stride for name, _, _, stride in self.compiled["columns"]}
+        group = sum(code * strides[name] for code, name in zip(codes, names))
+        if group not in fallback["groups"]:
+            raise KeyError(cat_inputs)
+        return fallback["groups"][group][0]
+
     def standardize_missing_values(self, keys):
         """
         Standardizes missing values in the input keys.
@@ -171,13 +920,7 @@ Values: {self.values()}
         --------
         Dictionary with standardized keys.
         """
-        standardized_keys = {}
-        for key, val in keys.items():
-            if pd.isna(val) or val in [None, "NULL"]:
-                standardized_keys[key] = "Unknown or Empty"
-            else:
-                standardized_keys[key] = val
-        return standardized_keys
+        return {key: Canonicalizer.value(val) for key, val in keys.items()}
 
     def load_abaques(
         self,
@@ -252,6 +995,10 @@ Values: {self.values()}
                         self.num_abaque[cat_comb] = np.array(
                             [np.array(v) for k, v in num_values.items()]
                         ).T
+                elif len(self.num_columns) > 0:
+                    ## Without cat columns, all the rows are candidates
+                    self.num_abaque = {(): self.abaque[self.num_columns].to_numpy()}
+                self.initialize_interval_index()
 
                 self.abaque = self.abaque.set_index([k["key_name"] for k in keys])
                 self.abaque = self.abaque[values].copy()
@@ -260,10 +1007,132 @@ Values: {self.values()}
             self.abaque.sort_index(inplace=True)
             self.abaque = self.abaque.groupby(self.abaque.index).head(1)
             self.abaque_dict = self.abaque.to_dict(orient="index")
+            self.key_names = list(self.abaque.index.names)
+            if keys:
+                self.compile_lookup()
+                self.release_tables()
 
         except Exception as e:
             print(f"An error occurred: {str(e)}")
 
+    def compile_lookup(self):
+        """
+        Builds the compiled representation of the abaque.
+
+        Categorical keys are dictionary encoded to int codes, numeric keys are encoded as the
+        index of their value in upper_thresholds. Each row of abaque_dict gets a flat code,
+        and the row numbers are stored in a dense ndarray (or a dict if the key space is too
+        large) addressed by those codes. Value columns are stored as CodedColumn, so that the
+        returned values are the ones of abaque_dict, with their type, and as float arrays
+        for the vectorized lookups when they are numeric. The object arrays of
+        key_characteristics are coded the same way.
+        """
+        names = list(self.abaque.index.names)
+        entries = list(self.abaque_dict.items())
+        columns = []
+        codes_per_key = []
+        stride = 1
+        for i, name in enumerate(names):
+            key_values = [k[i] if len(names) > 1 else k for k, _ in entries]
+            if name in self.upper_thresholds:
+                thresholds = [float(t) for t in self.upper_thresholds[name]]
+                codes = None
+                key_codes = [bisect_left(thresholds, float(v)) for v in key_values]
+                cardinality = len(thresholds)
+            else:
+                thresholds = None
+                codes = {}
+                for v in key_values:
+                    if v not in codes:
+                        codes[v] = len(codes)
+                key_codes = [codes[v] for v in key_values]
+                cardinality = len(codes)
+            codes_per_key.append(np.array(key_codes, dtype=np.int64) * stride)
+            columns.append((name, codes, thresholds, stride))
+            stride *= max(cardinality, 1)
+
+        flat_codes = np.sum(codes_per_key, axis=0).astype(np.int64)
+        row_numbers = np.arange(len(entries), dtype=np.int64)
+        if stride <= self.COMPILED_DENSE_LIMIT:
+            rows = np.full(stride, -1, dtype=np.int64)
+            rows[flat_codes] = row_numbers
+        else:
+            rows = dict(zip(flat_codes.tolist(), row_numbers.tolist()))
+
+        values = {}
+        arrays = {}
+        for col in self.abaque.columns:
+            values[col] = CodedColumn([v[col] for _, v in entries])
+            numeric = all(
+                isinstance(v, (int, float, np.number)) and not isinstance(v, bool)
+                for v in values[col].uniques
+            )
+            arrays[col] = values[col].decode().astype(float) if numeric else values[col]
+
+        self.compiled = {
+            "columns": columns,
+            "rows": rows,
+            "values": values,
+            "arrays": arrays,
+            "fallback": self._compile_fallback(columns),
+        }
+        self.canonicalizer = Canonicalizer(columns, self.key_characteristics)
+        for name, value in self._key_characteristics.items():
+            if isinstance(value, np.ndarray) and value.dtype == object:
+                self._key_characteristics[name] = CodedColumn(value)
+
+    def release_tables(self):
+        """
+        Drops the DataFrame of the abaque and the tables derived from it, once compiled: the
+        lookups only use the compiled representation from then on, made of ndarrays and of the
+        distinct values of the keys and values.
+        """
+        self.abaque = None
+        self.abaque_dict = None
+        self.num_abaque = None
+        self.interval_index = None
+
+    def _compile_fallback(self, columns):
+        """
+        Encodes the interval_index with the compiled codes, for the numeric fallback.
+
+        For each categorical combination, stores its SortedIntervalIndex and the part of the
+        flat code of each candidate carried by the numeric keys.
+        """
+        if not self.interval_index:
+            return None
+        by_name = {
+            name: (codes, thresholds, stride)
+            for name, codes, thresholds, stride in columns
+        }
+        max_flat = sum(
+            (len(by_name[k][1]) - 1) * by_name[k][2] for k in self.num_columns
+        )
+        groups = {}
+        for cat_comb, index in self.interval_index.items():
+            if len(self.cat_columns) == 1:
+                cat_comb = (cat_comb,)
+            try:
+                group = sum(
+                    by_name[k][0][v] * by_name[k][2]
+                    for k, v in zip(self.cat_columns, cat_comb)
+                )
+            except KeyError:
+                continue
+            num_flat = np.zeros(len(index), dtype=np.int64)
+            for i, k in enumerate(self.num_columns):
+                _, thresholds, stride = by_name[k]
+                num_flat += (
+                    np.searchsorted(thresholds, index.candidates[:, i].astype(float))
+                    * stride
+                )
+            groups[group] = (index, num_flat)
+        return {
+            "num_columns": list(self.num_columns),
+            "max_flat": max_flat,
+            "groups": groups,
+        }
+
     def get_key_characteristics(self, keys):
         """
         Extracts and stores characteristics of the specified keys.
@@ -275,12 +1144,12 @@ Values: {self.values()}
         """
         for key in keys:
             if key["key_type"] == "num":
-                self.key_characteristics[key["key_name"]] = {
+                self._key_characteristics[key["key_name"]] = {
                     "min": self.abaque[key["key_name"]].min(),
                     "max": self.abaque[key["key_name"]].max(),
                 }
             elif key["key_type"] == "cat":
-                self.key_characteristics[key["key_name"]] = self.abaque[
+                self._key_characteristics[key["key_name"]] = self.abaque[
                     key["key_name"]
                 ].unique()
 
@@ -317,16 +1186,24 @@ Values: {self.values()}
 
     def apply_mapping(self, mapping):
         """
-        Applies transformation functions to specified columns.
+        Applies transformations to specified columns.
 
         Parameters:
         -----------
         mapping : list[dict]
-            List of mappings to be applied to the columns.
+            List of mappings to be applied to the columns. Each mapping references a named transform
+            of py3cl.libs.transforms, or a python lambda as a string under "function" (legacy).
         """
         for m in mapping:
             try:
-                self.abaque[m["col"]] = self.abaque[m["col"]].apply(eval(m["function"]))
+                if "transform" in m:
+                    self.abaque[m["col"]] = transforms.apply_transform(
+                        self.abaque[m["col"]], m
+                    )
+                else:
+                    self.abaque[m["col"]] = self.abaque[m["col"]].apply(
+                        eval(m["function"])
+                    )
             except Exception as e:
                 print(f"Error applying mapping: {str(e)}")
 
@@ -337,13 +1214,16 @@ Values: {self.values()}
         Parameters:
         -----------
         filters : list[dict]
-            List of filters to be applied to the columns.
+            List of filters to be applied to the columns. Each filter references a named transform
+            of py3cl.libs.transforms returning booleans, or a python lambda as a string under "function" (legacy).
         """
         for f in filters:
             try:
-                self.abaque = self.abaque[
-                    self.abaque[f["col"]].apply(eval(f["function"]))
-                ]
+                if "transform" in f:
+                    mask = transforms.apply_transform(self.abaque[f["col"]], f)
+                else:
+                    mask = self.abaque[f["col"]].apply(eval(f["function"]))
+                self.abaque = self.abaque[mask]
             except Exception as e:
                 print(f"Error applying filter: {str(e)}")
 
@@ -354,14 +1234,21 @@ Values: {self.values()}
         Parameters:
         -----------
         reduce : list[dict]
-            List of reduction operations to create new columns.
+            List of reduction operations to create new columns. Each reduction references a named reduction
+            of py3cl.libs.transforms, or a python lambda as a string under "function" (legacy).
         """
         for r in reduce:
             try:
-                self.abaque[r["new_col"]] = self.abaque.apply(
-                    lambda row: eval(r["function"])([row[col] for col in r["cols"]]),
-                    axis=1,
-                )
+                if "transform" in r:
+                    self.abaque[r["new_col"]] = transforms.apply_reduction(
+                        self.abaque, r
+                    )
+                else:
+                    function = eval(r["function"])
+                    self.abaque[r["new_col"]] = self.abaque.apply(
+                        lambda row: function([row[col] for col in r["cols"]]),
+                        axis=1,
+                    )
             except Exception as e:
                 print(f"Error applying reduction: {str(e)}")
 
@@ -376,7 +1263,22 @@ Values: {self.values()}
                 if k["key_type"] == "cat"
             ]
             unique_combinations = self.abaque[cat_keys].drop_duplicates()
-            self.valid_cat_combinations = unique_combinations.to_dict(orient="records")
+            records = unique_combinations.to_dict(orient="records")
+            self._valid_cat_combinations = {
+                key: CodedColumn([record[key] for record in records])
+                for key in cat_keys
+            }
+
+    def initialize_interval_index(self):
+        """
+        Initializes a SortedIntervalIndex for each categorical combination of num_abaque.
+        """
+        self.interval_index = {}
+        for cat_comb, num_candidates in getattr(self, "num_abaque", {}).items():
+            try:
+                self.interval_index[cat_comb] = SortedIntervalIndex(num_candidates)
+            except (TypeError, ValueError) as e:
+                print(f"Error building interval index for {cat_comb}: {str(e)}")
 
     def initialize_upper_tresholds(self):
         """
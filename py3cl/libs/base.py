@@ -1,4 +1,5 @@
 from py3cl.libs.utils import safe_divide, vectorized_safe_divide, set_community
+from py3cl.libs.batch import is_number
 from pydantic import BaseModel
 import os
 from typing import Optional
@@ -186,6 +187,27 @@ class BaseProcessor:
     def forward(self, dpe, kwargs):
         pass
 
+    def _batch_lookup(self, name, columns, values):
+        """
+        Looks up many rows of an abaque. The rows the compiled lookup cannot resolve go through the scalar
+        lookup, which applies its fallback or raises its error.
+
+        Args:
+            name (str): The name of the abaque.
+            columns (dict): One array of inputs per key of the abaque.
+            values (list): The values to be retrieved.
+
+        Returns:
+            tuple: One array per value.
+        """
+        abaque = self.abaques[name]
+        out, miss = abaque.fetch_many(columns, values)
+        for i in np.flatnonzero(miss):
+            row = abaque.fetch({k: v[i] for k, v in columns.items()}, values)
+            for array, value in zip(out, values):
+                array[i] = row[value]
+        return out
+
     def iterative_merge(self, combinations):
         try:
             base = pd.DataFrame(combinations[0])
@@ -203,3 +225,82 @@ class BaseProcessor:
         except Exception as e:
             print(f"Error in iterative_merge: {e}")
             return []
+
+    def _batch_reduction_coefficient(self, table, type_batiment, orientation):
+        """
+        Vectorized reduction coefficient b of the losses of walls or windows: from the exterior type of the
+        elements, from their orientation for the verandas, and from the surfaces in contact with the unheated
+        spaces otherwise.
+
+        Args:
+            table (dict): The element table, with the zone_hiver of the building of each element.
+            type_batiment (np.ndarray): The type of the building of each element.
+            orientation (str): The column of the orientation of the verandas.
+
+        Returns:
+            tuple: (b, aiu_aue, uvue, local, invalid). The b of the elements, the aiu_aue and uvue of the elements
+                next to an unheated space (NaN for the others), the mask of these elements, and the mask of the
+                elements whose surfaces cannot be divided (safe_divide raises), whose b is NaN.
+        """
+        n = len(table["building"])
+        b = np.full(n, np.nan)
+        aiu_aue = np.full(n, np.nan)
+        uvue = np.full(n, np.nan)
+        exterior = table["exterior_type_or_local_non_chauffe"]
+        known = {
+            value: self.abaques["coef_reduction_deperdition_exterieur"].has_key_value(
+                "aiu_aue", value
+            )
+            for value in set(exterior)
+        }
+        exterieur = np.array([known[value] for value in exterior], dtype=bool)
+        veranda = ~exterieur & (exterior == "Véranda")
+        local = ~exterieur & ~veranda
+        if exterieur.any():
+            (b[exterieur],) = self._batch_lookup(
+                "coef_reduction_deperdition_exterieur",
+                {"aiu_aue": exterior[exterieur]},
+                ["valeur"],
+            )
+        if veranda.any():
+            (b[veranda],) = self._batch_lookup(
+                "coef_reduction_veranda",
+                {
+                    "zone_hiver": table["zone_hiver"][veranda],
+                    "orientation_veranda": table[orientation][veranda],
+                    "isolation_paroi": table["isolation"][veranda],
+                },
+                ["bver"],
+            )
+
+        # safe_divide raises on the surfaces that are not numbers, unless dividing by 0
+        contact = table["surface_paroi_contact"]
+        surface_local = table["surface_paroi_local_non_chauffe"]
+        denominator = np.where(is_number(surface_local), surface_local, np.nan)
+        denominator = denominator.astype(float)
+        zero = denominator == 0
+        invalid = local & ~(zero | (is_number(contact) & is_number(surface_local)))
+        local &= ~invalid
+        if local.any():
+            aiu_aue[local] = 0
+            divided = local & ~zero
+            aiu_aue[divided] = contact[divided].astype(float) / denominator[divided]
+            (uvue[local],) = self._batch_lookup(
+                "local_non_chauffe",
+                {
+                    "type_batiment": type_batiment[local],
+                    "local_non_chauffe": exterior[local],
+                },
+                ["uvue"],
+            )
+            (b[local],) = self._batch_lookup(
+                "coef_reduction_deperdition_local",
+                {
+                    "aiu_aue_max": aiu_aue[local],
+                    "aue_isole": table["local_non_chauffe_isole"][local],
+                    "aiu_isole": table["isolation"][local],
+                    "uv_ue": uvue[local],
+                },
+                ["valeur"],
+            )
+        return b, aiu_aue, uvue, local, invalid
@@ -0,0 +1,353 @@
+from itertools import chain, repeat
+
+import numpy as np
+
+# Helpers of the columnar (batch) path of the DPE model.
+# A batch holds the building-level quantities as columns: one value per building, or one row of
+# 12 monthly values per building. The elements of the buildings (parois, vitrages, ponts thermiques,
+# installations) are flattened in element tables: dicts of columns, one entry per element, whose
+# "building" column is the index of the building of each element (its segment id).
+#
+# The reductions mirror the order in which the scalar path adds the values, so that both paths
+# give the same floating point results: segment_sum adds the values one after the other, as the
+# python sum, segment_total adds them as np.sum does on the stacked values of a building.
+
+
+def safe_divide_many(a, b):
+    """
+    Vectorized equivalent of safe_divide: a / b, and 0 where b is 0.
+
+    Args:
+        a (np.ndarray): The numerators.
+        b (np.ndarray): The denominators.
+
+    Returns:
+        np.ndarray: The quotients, as floats.
+    """
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    return np.divide(a, b, out=np.zeros(a.shape), where=b != 0)
+
+
+def safe_divide_rows(a, b):
+    """
+    Equivalent of vectorized_safe_divide applied to each row of the matrices a and b.
+
+    vectorized_safe_divide takes the type of its output from its first element: the rows whose first
+    denominator is 0 are truncated to integers.
+
+    Args:
+        a (np.ndarray): The numerators, one row per building.
+        b (np.ndarray): The denominators, one row per building.
+
+    Returns:
+        np.ndarray: The quotients, as floats.
+    """
+    out = safe_divide_many(a, b)
+    integer = np.broadcast_to(b, out.shape)[:, 0] == 0
+    out[integer] = np.trunc(out[integer])
+    return out
+
+
+def segment_sum(values, building, n):
+    """
+    The sum of the values of each building, added one after the other from 0, as the python sum.
+
+    Args:
+        values (np.ndarray): The values of the elements, one entry (or row) per element.
+        building (np.ndarray): The index of the building of each element.
+        n (int): The number of buildings.
+
+    Returns:
+        np.ndarray: The sums, one entry (or row) per building. 0 for the buildings without elements.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.zeros((n,) + values.shape[1:])
+    np.add.at(out, building, values)
+    return out
+
+
+def segment_total(values, building, n):
+    """
+    The total of the values of each building, added as np.sum adds the stacked values of the building.
+
+    Args:
+        values (np.ndarray): The values of the elements, one entry (or row) per element.
+        building (np.ndarray): The index of the building of each element.
+        n (int): The number of buildings.
+
+    Returns:
+        tuple: (totals, counts). The totals, one per building (0 for the buildings without elements),
+        and the number of elements of each building.
+    """
+    values = np.asarray(values, dtype=float)
+    counts = np.bincount(building, minlength=n)
+    out = np.zeros(n)
+    if len(values) == 0:
+        return out, counts
+    order = np.argsort(building, kind="stable")
+    values = values[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    # The buildings with the same number of elements are reduced together
+    for size in np.unique(counts[counts > 0]):
+        segments = np.flatnonzero(counts == size)
+        index = starts[segments][:, None] + np.arange(size)
+        out[segments] = values[index].reshape(len(segments), -1).sum(axis=1)
+    return out, counts
+
+
+def segment_mean(values, building, n):
+    """
+    The mean of the values of each building, as np.mean. NaN for the buildings without elements.
+
+    Args:
+        values (np.ndarray): The values of the elements, one entry per element.
+        building (np.ndarray): The index of the building of each element.
+        n (int): The number of buildings.
+
+    Returns:
+        np.ndarray: The means, one per building.
+    """
+    totals, counts = segment_total(values, building, n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return totals / counts
+
+
+def to_column(values):
+    """
+    Converts the values of a field, one per element or building, to a column.
+
+    Args:
+        values (list): The values.
+
+    Returns:
+        np.ndarray: A matrix if the values are arrays of the same shape, a float array if they are
+        numbers (None becoming NaN), an object array otherwise.
+    """
+    types = set(map(type, values))
+    present = types - {type(None)}
+    if (
+        present == {np.ndarray}
+        and len(present) == len(types)
+        and len({v.shape for v in values}) == 1
+    ):
+        return np.stack(values)
+    if present and all(
+        issubclass(t, (int, float, np.number)) and not issubclass(t, (bool, np.bool_))
+        for t in present
+    ):
+        if len(present) == len(types):
+            return np.array(values)
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def element_table(records, building):
+    """
+    Converts the records of flattened elements to an element table.
+
+    Args:
+        records (list): The elements, as dicts.
+        building (array-like): The index of the building of each element.
+
+    Returns:
+        dict: The columns of the elements, by field, and their "building" column.
+    """
+    table = {"building": np.asarray(building, dtype=np.int64)}
+    for key in dict.fromkeys(chain.from_iterable(records)):
+        table[key] = to_column(list(map(dict.get, records, repeat(key))))
+    return table
+
+
+def gather(tables, part, row, building):
+    """
+    Assembles an element table from the rows of other element tables.
+
+    Args:
+        tables (list): The element tables.
+        part (np.ndarray): The index of the table of each element.
+        row (np.ndarray): The index of the row of each element in its table.
+        building (np.ndarray): The index of the building of each element.
+
+    Returns:
+        dict: The element table. As in element_table, the fields missing from a table are None for its rows.
+    """
+    sizes = [len(table["building"]) for table in tables]
+    index = np.concatenate(([0], np.cumsum(sizes)))[part] + row
+    out = {"building": np.asarray(building, dtype=np.int64)}
+    for name in dict.fromkeys(chain.from_iterable(tables)):
+        if name == "building":
+            continue
+        columns = [table.get(name) for table in tables]
+        if all(isinstance(c, np.ndarray) for c in columns) and (
+            len({(c.dtype, c.shape[1:]) for c in columns}) == 1
+        ):
+            out[name] = np.concatenate(columns)[index]
+            continue
+        values = list(
+            chain.from_iterable(
+                repeat(None, size) if c is None else c
+                for c, size in zip(columns, sizes)
+            )
+        )
+        out[name] = to_column([values[i] for i in index])
+    return out
+
+
+def column(table, name, default=np.nan):
+    """
+    Gets a column of an element table, filled with default if no element has the field.
+
+    Args:
+        table (dict): The element table.
+        name (str): The name of the field.
+        default: The value of the missing column.
+
+    Returns:
+        np.ndarray: The column.
+    """
+    if name in table:
+        return table[name]
+    return np.full(len(table["building"]), default)
+
+
+def contains(values, pattern):
+    """
+    Tests if each string of an object array contains the pattern.
+
+    Args:
+        values (np.ndarray): The strings.
+        pattern (str): The substring.
+
+    Returns:
+        np.ndarray: A boolean array.
+    """
+    return np.array([pattern in value for value in values], dtype=bool)
+
+
+def truthy(values):
+    """
+    Tests the truth value of each value of a column, as bool(value). None, which becomes NaN in the
+    float columns, is false.
+
+    Args:
+        values (np.ndarray): The column.
+
+    Returns:
+        np.ndarray: A boolean array.
+    """
+    if values.dtype.kind == "f":
+        return (values != 0) & ~np.isnan(values)
+    if values.dtype.kind in "biu":
+        return values != 0
+    return np.array([bool(value) for value in values], dtype=bool)
+
+
+def is_number(values):
+    """
+    Tests if each value of a column is a number (not None, a boolean nor a string).
+
+    Args:
+        values (np.ndarray): The column.
+
+    Returns:
+        np.ndarray: A boolean array.
+    """
+    if values.dtype.kind == "f":
+        return ~np.isnan(values)
+    if values.dtype.kind in "iu":
+        return np.ones(len(values), dtype=bool)
+    return np.array(
+        [
+            isinstance(value, (int, float, np.number))
+            and not isinstance(value, (bool, np.bool_))
+            for value in values
+        ],
+        dtype=bool,
+    )
+
+
+def python_min(a, b):
+    """
+    Vectorized equivalent of the python min(a, b): b where b < a, a otherwise (NaN being kept).
+
+    Args:
+        a (np.ndarray): The first values.
+        b (np.ndarray): The second values.
+
+    Returns:
+        np.ndarray: The minimums.
+    """
+    return np.where(b < a, b, a)
+
+
+# Types of the values converted by freeze
+CONTAINERS = {dict, list, tuple, np.ndarray}
+
+
+def freeze(value):
+    """
+    Converts a value made of dicts, lists and arrays to a hashable key. The types of the values are part of the
+    key, so that e.g. True and 1 give different keys.
+
+    Args:
+        value: The value.
+
+    Returns:
+        tuple: The key.
+
+    Raises:
+        TypeError: If the value holds an unhashable object of another type.
+    """
+    if isinstance(value, dict):
+        values = tuple(value.values())
+        types = tuple(map(type, values))
+        if not CONTAINERS.isdisjoint(types):
+            # Only the values that are not hashable (e.g. lists of identifiers) are converted
+            values = tuple(
+                freeze(v) if t in CONTAINERS else v for v, t in zip(values, types)
+            )
+        key = (dict, tuple(value), types, values)
+        hash(key)
+        return key
+    if isinstance(value, (list, tuple)):
+        values = tuple(value)
+        key = (type(value), tuple(map(type, values)), values)
+        try:
+            hash(key)
+            return key
+        except TypeError:
+            return (type(value), tuple(freeze(v) for v in values))
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            return (np.ndarray, value.shape, freeze(value.tolist()))
+        return (np.ndarray, value.dtype.str, value.shape, value.tobytes())
+    hash(value)
+    return (type(value), value)
+
+
+def validate(records, input_model):
+    """
+    Validates records with the input model of a processor, as input_model(**record).dict(), once per
+    distinct record.
+
+    Args:
+        records (list): The records, as dicts.
+        input_model (BaseModel): The input model.
+
+    Returns:
+        list: The validated records. The identical records share the same dict.
+    """
+    validated = {}
+    out = []
+    for record in records:
+        try:
+            key = freeze(record)
+        except TypeError:
+            out.append(input_model(**record).dict())
+            continue
+        if key not in validated:
+            validated[key] = input_model(**record).dict()
+        out.append(validated[key])
+    return out
@@ -0,0 +1,211 @@
+import hashlib
+import io
+import mmap
+import os
+import pickle
+import struct
+from glob import glob
+
+import numpy as np
+
+# Bump when the processed representation of the abaques changes
+BUNDLE_VERSION = 5
+
+# Layout of a bundle file: magic, length of the index, pickled index, then the numeric arrays
+# of the abaques, each aligned on ARRAY_ALIGNMENT bytes. The arrays are memory-mapped read-only
+# when the bundle is loaded, so that the processes loading the same bundle share their pages.
+# The compiled abaques are made of such arrays (row index, codes of the values and of the key
+# characteristics, float columns, fallback candidates): the pickled index only holds the
+# distinct values of their keys and value columns, and their configuration.
+BUNDLE_MAGIC = b"PY3CLAB\x00"
+ARRAY_ALIGNMENT = 64
+
+_HEADER = struct.Struct("<8sQ")
+
+
+def content_hash(configs, data_path):
+    """
+    Computes the hash identifying a bundle: the bundle version, the config files and all the
+    csv files of the data directory.
+
+    Args:
+        configs (dict): Mapping of abaque names to config file paths.
+        data_path (str): The directory containing the csv files.
+
+    Returns:
+        str: The hex digest of the content hash.
+    """
+    digest = hashlib.sha256(f"py3cl-abaques-v{BUNDLE_VERSION}".encode("utf-8"))
+    for name in sorted(configs):
+        digest.update(name.encode("utf-8"))
+    files = [configs[name] for name in sorted(configs)]
+    files += sorted(glob(os.path.join(data_path, "*.csv")))
+    for file in files:
+        digest.update(os.path.basename(file).encode("utf-8"))
+        with open(file, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class _ArrayPickler(pickle.Pickler):
+    """Pickles the numeric arrays out of line, in the array section of the bundle."""
+
+    def __init__(self, file, arrays):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.arrays = arrays
+
+    def persistent_id(self, obj):
+        if type(obj) is np.ndarray and obj.dtype.kind in "biuf":
+            return self.arrays.add(obj)
+        return None
+
+
+class _ArraySection:
+    """Accumulates the arrays written in the array section of a bundle."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+        self.ids = {}
+        # Keeps the arrays alive, so that their ids are not reused during the save
+        self.refs = []
+
+    def add(self, array):
+        if id(array) in self.ids:
+            return self.ids[id(array)]
+        data = np.ascontiguousarray(array)
+        padding = -self.size % ARRAY_ALIGNMENT
+        if padding:
+            self.chunks.append(b"\x00" * padding)
+        offset = self.size + padding
+        self.chunks.append(data.tobytes())
+        self.size = offset + data.nbytes
+        pid = ("array", offset, data.dtype.str, data.shape)
+        self.ids[id(array)] = pid
+        self.refs.append(array)
+        return pid
+
+
+class _ArrayUnpickler(pickle.Unpickler):
+    """Restores the out of line arrays as read-only views of the memory-mapped bundle."""
+
+    def __init__(self, file, bundle):
+        super().__init__(file)
+        self.bundle = bundle
+
+    def persistent_load(self, pid):
+        _, offset, dtype, shape = pid
+        return self.bundle.array(offset, dtype, shape)
+
+
+class AbaqueBundle:
+    """
+    A loaded bundle. The abaques are unpickled one at a time, their numeric arrays being
+    read-only views of the memory-mapped file.
+
+    Attributes:
+        path (str): Path of the bundle file.
+    """
+
+    def __init__(self, path, abaques, buffer, data_offset):
+        self.path = path
+        self._abaques = abaques
+        self._buffer = buffer
+        self._data_offset = data_offset
+
+    def __contains__(self, name):
+        return name in self._abaques
+
+    def array(self, offset, dtype, shape):
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape, dtype=np.int64))
+        array = np.frombuffer(
+            self._buffer,
+            dtype=dtype,
+            count=count,
+            offset=self._data_offset + offset,
+        )
+        return array.reshape(shape)
+
+    def load(self, name):
+        """
+        Restores an abaque. The pickled abaque is released, each abaque can be loaded once.
+
+        Args:
+            name (str): The name of the abaque.
+
+        Returns:
+            Abaque: The restored abaque.
+        """
+        data = self._abaques.pop(name)
+        return _ArrayUnpickler(io.BytesIO(data), self).load()
+
+
+def save_bundle(path, abaques, digest):
+    """
+    Writes the processed abaques in a single versioned bundle.
+
+    Each abaque is pickled separately, so that they can be restored one at a time, and their
+    numeric arrays are stored in a section that is memory-mapped at load time.
+    The file is written atomically.
+
+    Args:
+        path (str): Path of the bundle file.
+        abaques (dict): Mapping of abaque names to Abaque objects.
+        digest (str): The content hash of the sources of the abaques.
+    """
+    arrays = _ArraySection()
+    pickled = {}
+    for name, abaque in abaques.items():
+        buffer = io.BytesIO()
+        _ArrayPickler(buffer, arrays).dump(abaque)
+        pickled[name] = buffer.getvalue()
+    index = pickle.dumps(
+        {"version": BUNDLE_VERSION, "hash": digest, "abaques": pickled},
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+    header_size = _HEADER.size + len(index)
+    padding = -header_size % ARRAY_ALIGNMENT
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(BUNDLE_MAGIC, len(index)))
+        f.write(index)
+        f.write(b"\x00" * padding)
+        for chunk in arrays.chunks:
+            f.write(chunk)
+    os.replace(tmp_path, path)
+
+
+def load_bundle(path, digest):
+    """
+    Reads a bundle written by save_bundle.
+
+    Args:
+        path (str): Path of the bundle file.
+        digest (str): The expected content hash.
+
+    Returns:
+        AbaqueBundle: The loaded bundle, or None if the bundle does not exist, is from another
+        version or does not match the content hash.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            magic, index_size = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != BUNDLE_MAGIC:
+                return None
+            payload = pickle.loads(f.read(index_size))
+            if (
+                payload.get("version") != BUNDLE_VERSION
+                or payload.get("hash") != digest
+            ):
+                return None
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except Exception as e:
+        print(f"Error reading abaques bundle {path}: {str(e)}")
+        return None
+    header_size = _HEADER.size + index_size
+    data_offset = header_size + (-header_size % ARRAY_ALIGNMENT)
+    return AbaqueBundle(path, payload["abaques"], buffer, data_offset)
@@ -0,0 +1,92 @@
+import threading
+from collections import OrderedDict
+
+CACHE_POLICIES = ("lru", "fifo")
+
+
+class LookupCache:
+    """
+    A bounded memo of resolved abaque rows, keyed on the canonicalised input tuple.
+
+    Attributes:
+        capacity (int): The maximum number of entries.
+        policy (str): The eviction policy. 'lru' evicts the least recently used entry, 'fifo' the oldest one.
+        hits (int): The number of lookups found in the cache.
+        misses (int): The number of lookups not found in the cache.
+        evictions (int): The number of entries evicted to respect the capacity.
+    """
+
+    def __init__(self, capacity=1024, policy="lru"):
+        if capacity < 1:
+            raise ValueError(f"Cache capacity must be positive, got {capacity}")
+        if policy not in CACHE_POLICIES:
+            raise ValueError(
+                f"Unknown cache policy {policy}, expected one of {CACHE_POLICIES}"
+            )
+        self.capacity = capacity
+        self.policy = policy
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Returns the cached entry for key, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.policy == "lru":
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        """
+        Stores an entry, evicting according to the policy if the cache is full.
+        """
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._entries[key] = entry
+
+    def clear(self):
+        """
+        Removes all the entries and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: The counters of the cache, its size and its hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "capacity": self.capacity,
+            "policy": self.policy,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
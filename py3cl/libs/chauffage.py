@@ -5,11 +5,23 @@ from py3cl.libs.utils import (
     iterative_merge,
 )
 from py3cl.libs.base import BaseProcessor
+from py3cl.libs.batch import element_table, is_number, safe_divide_many, validate
 from pydantic import BaseModel
 import os
 from typing import Optional
 import numpy as np
 
+# Building-level columns used by Chauffage.forward_batch
+BATCH_KEYS = [
+    "surface_habitable",
+    "hauteur_sous_plafond",
+    "zone_hiver",
+    "type_batiment",
+    "inertie_globale",
+    "GV",
+    "Bch_j",
+]
+
 
 class ChauffageInput(BaseModel):
     """
@@ -171,6 +183,146 @@ class Chauffage(BaseProcessor):
 
         return heat
 
+    def forward_batch(self, dpe, chauffages):
+        """
+        Vectorized equivalent of forward, for the heating installations of many buildings.
+
+        The efficiencies Rd, Rr, Re, Rg (or the SCOP of the heat pumps) and the intermittence I0 are looked up once
+        for all the installations, the type of emission being determined once per distinct emitter. Cchj is a
+        matrix with the monthly consumptions of each installation. The results are the same as the ones of
+        forward, installation by installation. The installations forward cannot compute (e.g. without heated
+        surface or energy) go through forward, which raises its error.
+
+        Args:
+            dpe (dict): The building-level columns of the batch: surface_habitable, hauteur_sous_plafond,
+                zone_hiver, type_batiment, inertie_globale, GV and Bch_j.
+            chauffages (dict): The flattened heating installations, with their input "records" and the index of
+                their "building".
+
+        Returns:
+            dict: The element table of the processed installations, with the columns of the records returned by
+            forward.
+        """
+        building = chauffages["building"]
+        records = validate(chauffages["records"], ChauffageInput)
+        table = element_table(records, building)
+        n = len(records)
+        if n == 0:
+            return table
+
+        surface_habitable = dpe["surface_habitable"][building].astype(float)
+        surface_chauffee = table["surface_chauffee"]
+        # safe_divide raises on a missing heated surface, unless dividing by 0
+        invalid = ~is_number(surface_chauffee) & (surface_habitable != 0)
+        table["%_surface"] = safe_divide_many(
+            np.where(is_number(surface_chauffee), surface_chauffee, np.nan),
+            surface_habitable,
+        )
+
+        (table["Rd"],) = self._batch_lookup(
+            "Rd_systeme_chauffage",
+            {
+                "type_distribution": table["type_distribution"],
+                "isole": table["isolation_distribution"],
+            },
+            ["rd"],
+        )
+        (table["Rr"],) = self._batch_lookup(
+            "Rr_systeme_chauffage",
+            {"type_installation": table["type_regulation"]},
+            ["rr"],
+        )
+        (table["Re"],) = self._batch_lookup(
+            "Re_systeme_chauffage", {"type_emetteur": table["type_emetteur"]}, ["re"]
+        )
+
+        types = {}
+        for value in table["type_emetteur"]:
+            if value not in types:
+                types[value] = self._determine_type_emission({"type_emetteur": value})
+        type_emission_1 = np.array(
+            [types[value] for value in table["type_emetteur"]], dtype=object
+        )
+
+        rg = np.full(n, np.nan)
+        pac = np.array(["pac" in i.lower() for i in table["identifiant"]], dtype=bool)
+        if pac.any():
+            (rg[pac],) = self._batch_lookup(
+                "scop_pac",
+                {
+                    "type_pac": table["type_pac"][pac],
+                    "zone_hiver": dpe["zone_hiver"][building][pac],
+                    "annee_installation": table["annee_installation"][pac],
+                    "type_emetteur": np.where(
+                        type_emission_1[pac] == "Planchers chauffant",
+                        "Planchers/Plafonds",
+                        "Autres",
+                    ).astype(object),
+                },
+                ["SCOP"],
+            )
+        if (~pac).any():
+            (rg[~pac],) = self._batch_lookup(
+                "Rg", {"type_generateur": table["type_generateur"][~pac]}, ["rg"]
+            )
+        table["Rg"] = rg
+
+        volume = dpe["surface_habitable"] * dpe["hauteur_sous_plafond"]
+        table["G"] = safe_divide_many(dpe["GV"], volume)[building]
+
+        type_batiment = dpe["type_batiment"][building]
+        inertie = dpe["inertie_globale"][building].astype(object)
+        inertie[type_batiment == "Logement collectif"] = None
+        (table["INT"],) = self._batch_lookup(
+            "I0_intermittence",
+            {
+                "type_batiment": type_batiment,
+                "type_installation": table["type_installation"],
+                "type_chauffage": table["type_chauffage"],
+                "type_regulation": table["type_regulation_intermittence"],
+                "type_emetteur": type_emission_1,
+                "inertie": inertie,
+                "equipement_intermittence": table["equipement_intermittence"],
+                "comptage_individuel": table["comptage_individuel"],
+            },
+            ["I0"],
+        )
+
+        table["Ich"] = safe_divide_many(
+            1, table["Rd"] * table["Rr"] * table["Re"] * table["Rg"]
+        )
+
+        type_energie = table["type_energie"]
+        invalid |= np.array([not isinstance(t, str) for t in type_energie])
+        electricite = np.array(
+            [isinstance(t, str) and "Electricité" in t for t in type_energie]
+        )
+        table["ratio_primaire_finale"] = np.where(electricite, 2.3, 1)
+        table["coef_emission"] = np.full(n, 0.078)
+        other = ~electricite & ~invalid
+        if other.any():
+            (table["coef_emission"][other],) = self._batch_lookup(
+                "emission_chauffage",
+                {"type_energie": type_energie[other]},
+                ["taux_conversion"],
+            )
+
+        for i in np.flatnonzero(invalid):
+            # Raises the error of the installation
+            view = {key: dpe[key][building[i]] for key in BATCH_KEYS}
+            self.forward(view, ChauffageInput(**chauffages["records"][i]))
+
+        table["Cchj"] = (
+            dpe["Bch_j"][building]
+            * table["Ich"][:, None]
+            * table["%_surface"][:, None]
+            * table["INT"][:, None]
+        )
+        table["Cch"] = table["Cchj"].sum(axis=1)
+        table["Cch_primaire"] = table["Cch"] * table["ratio_primaire_finale"]
+        table["emission_ch"] = table["Cch"] * table["coef_emission"]
+        return table
+
     def _calculate_surface_percentage(self, heat, dpe):
         """
         Calculate the percentage of the surface that is heated.
@@ -0,0 +1,132 @@
+import numpy as np
+
+
+class ClimateContext:
+    """
+    The monthly climate data of one (zone_climatique, altitude band, inertie) combination.
+
+    Holds, for each month, all the values of the zone_info abaque and the lighting hours of the
+    heure_eclairage abaque, so that a building only needs one lookup of its context. The usage
+    of the building selects the columns (e.g. DH19(°Ch) or DH21(°Ch)).
+
+    Attributes:
+        key (tuple): The (zone_climatique, altitude, inertie) combination.
+        monthly (dict): The read-only monthly arrays, by column name. The lighting hours are under "Nh".
+    """
+
+    def __init__(self, abaques, zone_climatique, altitude, inertie, months):
+        """
+        Resolves the monthly data of the combination.
+
+        Args:
+            abaques (Mapping): The abaques of the DPE model.
+            zone_climatique (str): The climatic zone.
+            altitude (float): The altitude band (upper bound of the band).
+            inertie (str): The global inertia of the building.
+            months (list): The months, in order.
+        """
+        self.key = (zone_climatique, altitude, inertie)
+        zone_info = abaques["zone_info"]
+        rows = [
+            zone_info.fetch(
+                {
+                    "inertie": inertie,
+                    "altitude": altitude,
+                    "month": month,
+                    "zone_climatique": zone_climatique,
+                }
+            )
+            for month in months
+        ]
+        self.monthly = {
+            column: np.array([row[column] for row in rows])
+            for column in zone_info.values()
+        }
+        self.monthly["Nh"] = np.array(
+            [
+                abaques["heure_eclairage"](
+                    {"month": month, "zone_climatique": zone_climatique}, "Nh"
+                )
+                for month in months
+            ]
+        )
+        for array in self.monthly.values():
+            array.setflags(write=False)
+
+    def __getitem__(self, column):
+        return self.monthly[column]
+
+
+class OrientationCoefficients:
+    """
+    The c1 coefficients of the coefficient_orientation abaque, as a dense tensor indexed by
+    [zone_climatique, orientation, inclinaison, month].
+
+    The coefficients of a window are one slice of the tensor instead of one lookup per month.
+
+    Attributes:
+        c1 (np.ndarray): The read-only tensor of the coefficients, NaN for the combinations missing
+            from the abaque.
+        valid (np.ndarray): The read-only mask of the (zone_climatique, orientation, inclinaison)
+            combinations found in the abaque.
+        index (dict): The position of each value along the axes, by key of the abaque.
+    """
+
+    KEYS = ["zone_climatique", "orientation", "inclination"]
+
+    def __init__(self, abaques, months):
+        """
+        Looks up all the combinations of the abaque.
+
+        Args:
+            abaques (Mapping): The abaques of the DPE model.
+            months (list): The months, in order.
+        """
+        abaque = abaques["coefficient_orientation"]
+        values = [list(abaque.key_characteristics[key]) for key in self.KEYS]
+        self.index = {
+            key: {value: i for i, value in enumerate(axis)}
+            for key, axis in zip(self.KEYS, values)
+        }
+        shape = tuple(len(axis) for axis in values)
+        self.c1 = np.full(shape + (len(months),), np.nan)
+        self.valid = np.zeros(shape, dtype=bool)
+        for position in np.ndindex(*shape):
+            keys = {key: axis[i] for key, axis, i in zip(self.KEYS, values, position)}
+            try:
+                self.c1[position] = [
+                    abaque({**keys, "month": month}, "c1") for month in months
+                ]
+            except ValueError:
+                continue
+            self.valid[position] = True
+        self.c1.setflags(write=False)
+        self.valid.setflags(write=False)
+
+    def lookup(self, zone_climatique, orientation, inclinaison):
+        """
+        Get the coefficients of many windows.
+
+        Args:
+            zone_climatique (array-like): The climatic zone of each window.
+            orientation (array-like): The orientation of each window.
+            inclinaison (array-like): The inclination of each window.
+
+        Returns:
+            tuple: (c1, miss). The coefficients, one row of monthly values per window, and a boolean
+            array, True for the windows whose combination is not in the tensor (their row is NaN).
+        """
+        positions = [
+            np.array([self.index[key].get(v, -1) for v in values], dtype=np.int64)
+            for key, values in zip(
+                self.KEYS, [zone_climatique, orientation, inclinaison]
+            )
+        ]
+        miss = np.zeros(len(positions[0]), dtype=bool)
+        for position in positions:
+            miss |= position < 0
+        safe = tuple(np.where(miss, 0, position) for position in positions)
+        miss |= ~self.valid[safe]
+        c1 = self.c1[safe]
+        c1[miss] = np.nan
+        return c1, miss
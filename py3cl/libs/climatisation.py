@@ -1,10 +1,33 @@
 from py3cl.libs.utils import safe_divide, vectorized_safe_divide
 from py3cl.libs.base import BaseProcessor
+from py3cl.libs.batch import (
+    element_table,
+    is_number,
+    safe_divide_many,
+    safe_divide_rows,
+    validate,
+)
 from pydantic import BaseModel
 
 import numpy as np
 from typing import Optional
 
+# The power of forward, element-wise: np.power can round differently from the scalar power
+scalar_power = np.frompyfunc(lambda x, y: np.float64(x) ** y, 2, 1)
+
+# Building-level columns used by Climatisation.forward_batch
+BATCH_KEYS = [
+    "Ai_frj",
+    "Asj",
+    "GV",
+    "Textmoy_clim_j",
+    "Tint_froids",
+    "Nref_froids_j",
+    "inertie_batiment",
+    "surface_habitable",
+    "zone_hiver",
+]
+
 
 class ClimatisationInput(BaseModel):
     """
@@ -139,6 +162,167 @@ class Climatisation(BaseProcessor):
         futj[rbth_j == 0] = 0
         return futj
 
+    def calculate_rbth_j_batch(self, dpe):
+        """
+        Vectorized equivalent of calculate_rbth_j, for many buildings.
+
+        Args:
+            dpe (dict): The building-level columns, Ai_frj, Asj, Textmoy_clim_j and Nref_froids_j being matrices
+                with one row of monthly values per building.
+
+        Returns:
+            np.ndarray: The Rbth_j of the buildings, one row per building.
+        """
+        Rbth_j_num = dpe["Ai_frj"] + dpe["Asj"] * (dpe["Ai_frj"] > 0)
+        Rbth_j_den = (
+            dpe["GV"][:, None]
+            * (dpe["Textmoy_clim_j"] - dpe["Tint_froids"][:, None])
+            * dpe["Nref_froids_j"]
+        )
+        # vectorized_safe_divide truncates the rows whose first denominator is 0
+        Rbth_j = safe_divide_rows(Rbth_j_num, Rbth_j_den)
+        Rbth_j[Rbth_j < 0.5] = 0
+        return Rbth_j
+
+    def calculate_inertia_batch(self, inertie_batiment, surface_habitable):
+        """
+        Vectorized equivalent of calculate_inertia, for many buildings.
+
+        Args:
+            inertie_batiment (np.ndarray): The inertia class of each building.
+            surface_habitable (np.ndarray): The habitable surface of each building.
+
+        Returns:
+            np.ndarray: The inertia coefficients C_in.
+        """
+        coefficient = np.select(
+            [
+                inertie_batiment == self.LIGHT_INERTIA,
+                inertie_batiment == self.MEDIUM_INERTIA,
+            ],
+            [110000, 165000],
+            260000,
+        )
+        return coefficient * surface_habitable
+
+    def calculate_futj_batch(self, rbth_j, c_in, gv):
+        """
+        Vectorized equivalent of calculate_futj, for many buildings.
+
+        The months where Rbth_j is 1 and the months where it is 0 are handled with masks, the other months with
+        the general formula.
+
+        Args:
+            rbth_j (np.ndarray): The Rbth_j of the buildings, one row per building.
+            c_in (np.ndarray): The inertia coefficient of each building.
+            gv (np.ndarray): The GV of each building.
+
+        Returns:
+            np.ndarray: The futj of the buildings, one row per building.
+        """
+        a = (1 + c_in / (gv * 3600 * 15))[:, None]
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            power_a = scalar_power(rbth_j, -a).astype(float)
+            power_a1 = scalar_power(rbth_j, -a - 1).astype(float)
+            futj = safe_divide_many(1 - power_a, 1 - power_a1)
+        one = np.broadcast_to(safe_divide_many(a, 1 + a), futj.shape)
+        futj = np.where(rbth_j == 1, one, futj)
+        futj[rbth_j == 0] = 0
+        return futj
+
+    def forward_batch(self, dpe, climatisations):
+        """
+        Vectorized equivalent of forward, for the cooling installations of many buildings.
+
+        Rbth_j, futj and Bfrj are computed as matrices, with one row of monthly values per building having
+        installations, and SEER is looked up once for all the installations. The results are the same as the
+        ones of forward, installation by installation. The installations forward cannot compute (e.g. without
+        cooled surface or energy) go through forward, which raises its error.
+
+        Args:
+            dpe (dict): The building-level columns of the batch, the ones of BATCH_KEYS.
+            climatisations (dict): The flattened cooling installations, with their input "records" and the index
+                of their "building".
+
+        Returns:
+            dict: The element table of the processed installations, with the columns of the records returned by
+            forward.
+        """
+        building = climatisations["building"]
+        records = validate(climatisations["records"], ClimatisationInput)
+        table = element_table(records, building)
+        n = len(records)
+        if n == 0:
+            return table
+
+        # The monthly quantities only depend on the building
+        buildings, index = np.unique(building, return_inverse=True)
+        columns = {key: dpe[key][buildings] for key in BATCH_KEYS}
+        gv = columns["GV"].astype(float)
+        rbth_j = self.calculate_rbth_j_batch(columns)
+        c_in = self.calculate_inertia_batch(
+            columns["inertie_batiment"], columns["surface_habitable"]
+        )
+        futj = self.calculate_futj_batch(rbth_j, c_in, gv)
+        bfroids_term1 = (
+            columns["Ai_frj"] + columns["Asj"] * (columns["Ai_frj"] > 0)
+        ) / 1000
+        bfroids_term2 = (
+            futj
+            * gv[:, None]
+            * (columns["Tint_froids"][:, None] - columns["Textmoy_clim_j"])
+            * columns["Nref_froids_j"]
+        ) / 1000
+        table["Rbth_j"] = rbth_j[index]
+        table["C_in"] = c_in[index]
+        table["futj"] = futj[index]
+        table["Bfrj"] = (bfroids_term1 - bfroids_term2)[index]
+
+        (table["EER"],) = self._batch_lookup(
+            "seer_clim",
+            {
+                "zone_hiver": dpe["zone_hiver"][building],
+                "annee_climatisation": table["annee_installation"],
+            },
+            ["SEER"],
+        )
+        table["SEER"] = 0.95 * table["EER"]
+
+        surface_habitable = dpe["surface_habitable"][building].astype(float)
+        surface_refroidie = table["surface_refroidie"]
+        # safe_divide raises on a missing cooled surface, unless dividing by 0
+        invalid = ~is_number(surface_refroidie) & (surface_habitable != 0)
+        ratio = safe_divide_many(
+            np.where(is_number(surface_refroidie), surface_refroidie, np.nan),
+            surface_habitable,
+        )
+        table["Cfr"] = 0.9 * table["Bfrj"] / table["SEER"][:, None]
+        table["Cfr"] = table["Cfr"] * ratio[:, None]
+
+        type_energie = table["type_energie"]
+        invalid |= np.array([not isinstance(t, str) for t in type_energie])
+        electricite = np.array(
+            [isinstance(t, str) and "Electricité" in t for t in type_energie]
+        )
+        table["ratio_primaire_finale"] = np.where(electricite, 2.3, 1)
+        table["coef_emission"] = np.full(n, 0.079)
+        other = ~electricite & ~invalid
+        if other.any():
+            (table["coef_emission"][other],) = self._batch_lookup(
+                "emission_froid",
+                {"type_energie": type_energie[other]},
+                ["taux_conversion"],
+            )
+
+        for i in np.flatnonzero(invalid):
+            # Raises the error of the installation
+            view = {key: dpe[key][building[i]] for key in BATCH_KEYS}
+            self.forward(view, ClimatisationInput(**climatisations["records"][i]))
+
+        table["Cfr_primaire"] = table["Cfr"] * table["ratio_primaire_finale"][:, None]
+        table["emission_fr"] = table["Cfr"] * table["coef_emission"][:, None]
+        return table
+
     def forward(self, dpe, kwargs: ClimatisationInput):
         """
         Calculates and updates climatisation-related metrics based on DPE (Diagnostic de Performance Énergétique) data and input parameters.
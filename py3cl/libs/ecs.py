@@ -1,7 +1,15 @@
 from py3cl.libs.utils import safe_divide
 from py3cl.libs.base import BaseProcessor
+from py3cl.libs.batch import (
+    element_table,
+    is_number,
+    safe_divide_many,
+    to_column,
+    validate,
+)
 from pydantic import BaseModel
 import os
+import numpy as np
 from typing import Optional, Dict, Any, Union
 
 generator_types = [
@@ -18,6 +26,30 @@ generator_types = [
     "Thermodynamique à accumulation sans appoint",
 ]
 
+# Family of each type of generator, dispatching the computation of its efficiency
+generator_families = {
+    "A combustion Chauffe-bain au gaz à production instantannée": "combustion",
+    "Electrique": "electrique",
+    "Electrique classique": "electrique",
+    "Electrique thermodinamyque": "electrique",
+    "Réseau de chaleur isolé": "reseau",
+    "Réseau de chaleur non isolé": "reseau",
+    "A combustion ECS seule par chaudière gaz, fioul ou chauffe-eau gaz": "combustion",
+    "A combustion Mixte chaudière gaz, fioul ou bois": "combustion",
+    "A combustion Accumulateur gaz": "accumulateur",
+    "Thermodynamique à accumulation avec appoint": "thermodynamique",
+    "Thermodynamique à accumulation sans appoint": "thermodynamique",
+}
+
+# Constant generator efficiencies, by type of generator
+constant_generator_efficiencies = {
+    "Electrique": 1,
+    "Electrique classique": 1,
+    "Electrique thermodinamyque": 1,
+    "Réseau de chaleur isolé": 0.9,
+    "Réseau de chaleur non isolé": 0.75,
+}
+
 
 class EcsInput(BaseModel):
     """
@@ -186,6 +218,195 @@ class ECS(BaseProcessor):
         ecs["emission_ecs"] = ecs["Cecs"] * ecs["coef_emission"]
         return ecs
 
+    def forward_batch(
+        self, dpe: Dict[str, Any], installations: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Vectorized equivalent of forward, for the hot water installations of many buildings.
+
+        The type of generator of each installation is encoded once into its family (generator_families), and the
+        generator efficiency Rg is computed family by family, with masked formulas over the installations of the
+        family. Each abaque is looked up once for all the installations needing it. The results are the same as
+        the ones of forward, installation by installation. The installations forward cannot compute (e.g. an
+        unknown type of generator) go through forward, which raises its error.
+
+        Args:
+            dpe (dict): The building-level columns of the batch: Becs, fecs and zone_hiver.
+            installations (dict): The flattened hot water installations, with their input "records" and the index
+                of their "building".
+
+        Returns:
+            dict: The element table of the processed installations, with the columns of the records returned by
+            forward.
+        """
+        building = installations["building"]
+        records = validate(installations["records"], EcsInput)
+        table = element_table(records, building)
+        n = len(records)
+        if n == 0:
+            return table
+        becs = dpe["Becs"][building].astype(float)
+
+        (rd,) = self._batch_lookup(
+            "Rd_ecs",
+            {
+                "type_installation": table["type_installation"],
+                "type_generateur": table["type_generateur_distribution"],
+                "production_volume_habitable": table["production_en_volume_habitable"],
+                "pieces_alimentees_contigues": table["pieces_alimentees_contigues"],
+            },
+            ["rd"],
+        )
+
+        # Storage
+        volume = table["volume_ballon"]
+        stockage = np.array([t is not None for t in table["type_stockage"]])
+        invalid = stockage & ~is_number(volume)
+        rs = np.ones(n)
+        qgw = np.zeros(n)
+        stockage &= ~invalid
+        if stockage.any():
+            (cr,) = self._batch_lookup(
+                "Rs_ecs",
+                {
+                    "type_stockage": table["type_stockage"][stockage],
+                    "category_stockage": table["category_stockage"][stockage],
+                    "volume_stockage": volume[stockage],
+                },
+                ["Cr"],
+            )
+            qgw[stockage] = 8592 * (45 / 24) * cr * volume[stockage].astype(float)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rs[stockage] = safe_divide_many(
+                    1, 1 + (qgw[stockage] * rd[stockage] / becs[stockage])
+                )
+
+        # Generation, by family of generator
+        family = np.array(
+            [generator_families.get(t) for t in table["type_generateur"]], dtype=object
+        )
+        invalid |= np.array([f is None for f in family], dtype=bool)
+        rg = np.full(n, np.nan)
+        pnom = list(table["Pnom"])
+
+        constant = family == "reseau"
+        rs[constant] = 1
+        constant |= family == "electrique"
+        rg[constant] = [
+            constant_generator_efficiencies[t]
+            for t in table["type_generateur"][constant]
+        ]
+
+        combustion = (family == "combustion") & is_number(table["Pnom"])
+        invalid |= (family == "combustion") & ~combustion
+        if combustion.any():
+            power = np.where(
+                table["Pnom"][combustion].astype(float) < self.DEFAULT_POWER_LIMIT_LOW,
+                self.DEFAULT_POWER_LIMIT_LOW,
+                self.DEFAULT_POWER_LIMIT_HIGH,
+            )
+            for i, value in zip(np.flatnonzero(combustion), power.tolist()):
+                pnom[i] = value
+            rpn, qp0, pveilleuse = self._batch_lookup(
+                "Rg_ecs",
+                {
+                    "annee_generateur": table["annee_generateur"][combustion],
+                    "puissance_nominale": power,
+                },
+                ["Rpn", "Qp0", "Pveilleuse"],
+            )
+            mixte = (
+                table["type_generateur"][combustion]
+                == "A combustion Mixte chaudière gaz, fioul ou bois"
+            )
+            rows_becs = becs[combustion]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rg[combustion] = safe_divide_many(
+                    1,
+                    np.where(
+                        mixte,
+                        (1 / rpn)
+                        + ((1790 * qp0 + qgw[combustion]) / rows_becs)
+                        + (6970 * 0.5 * pveilleuse / rows_becs),
+                        (1 / rpn)
+                        + (1790 * qp0 / rows_becs)
+                        + (6970 * pveilleuse / rows_becs),
+                    ),
+                )
+
+        accumulateur = (family == "accumulateur") & is_number(table["Pnom"])
+        invalid |= (family == "accumulateur") & ~accumulateur
+        if accumulateur.any():
+            qp0 = 1.5 * table["Pnom"][accumulateur].astype(float) / 100
+            rpn, pveilleuse = self._batch_lookup(
+                "Rg_ecs",
+                {
+                    "annee_generateur": table["annee_generateur"][accumulateur],
+                    "puissance_nominale": np.full(
+                        int(accumulateur.sum()), "Accumulateur", dtype=object
+                    ),
+                },
+                ["Rpn", "Pveilleuse"],
+            )
+            rows_becs = becs[accumulateur]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rg[accumulateur] = safe_divide_many(
+                    1,
+                    (1 / rpn)
+                    + ((8592 * qp0 + qgw[accumulateur]) / rows_becs)
+                    + (6970 * pveilleuse / rows_becs),
+                )
+
+        thermodynamique = family == "thermodynamique"
+        if thermodynamique.any():
+            rs[thermodynamique] = 1
+            (rg[thermodynamique],) = self._batch_lookup(
+                "Rg_ecs_pac",
+                {
+                    "annee_generateur": table["annee_generateur"][thermodynamique],
+                    "zone_hiver": dpe["zone_hiver"][building][thermodynamique],
+                    "type_pac": table["type_pac"][thermodynamique],
+                },
+                ["COP"],
+            )
+
+        type_energie = table["type_energie"]
+        invalid |= np.array([not isinstance(t, str) for t in type_energie])
+        electricite = np.array(
+            [isinstance(t, str) and "Electricité" in t for t in type_energie]
+        )
+        coef_emission = np.full(n, 0.079)
+        other = ~electricite & ~invalid
+        if other.any():
+            (coef_emission[other],) = self._batch_lookup(
+                "emission_ecs",
+                {"type_energie": type_energie[other]},
+                ["taux_conversion"],
+            )
+
+        for i in np.flatnonzero(invalid):
+            # Raises the error of the installation
+            view = {
+                key: dpe[key][building[i]] for key in ["Becs", "fecs", "zone_hiver"]
+            }
+            self.forward(view, EcsInput(**installations["records"][i]))
+
+        table["Pnom"] = to_column(pnom)
+        table["Rd"] = rd
+        table["Rs"] = rs
+        table["Qgw"] = qgw
+        table["Rg"] = rg
+        table["Recs"] = rg * rs * rd
+        table["Iecs"] = safe_divide_many(1, table["Recs"])
+        table["ratio_primaire_finale"] = np.where(electricite, 2.3, 1)
+        table["coef_emission"] = coef_emission
+        table["Cecs"] = (
+            dpe["Becs"][building] * table["Iecs"] * (1 - dpe["fecs"][building]) / 1000
+        )
+        table["Cecs_primaire"] = table["Cecs"] * table["ratio_primaire_finale"]
+        table["emission_ecs"] = table["Cecs"] * coef_emission
+        return table
+
     def calculate_distribution_efficiency(self, ecs: Dict[str, Any]) -> float:
         """
         Calculate the distribution efficiency (Rd) for the ECS system.
@@ -283,20 +504,14 @@ class ECS(BaseProcessor):
 
         if type_generateur == "A combustion Accumulateur gaz":
             Qp0 = 1.5 * ecs["Pnom"] / 100
-            Rpn = self.abaques["Rg_ecs"](
+            rg = self.abaques["Rg_ecs"].fetch(
                 {
                     "annee_generateur": ecs["annee_generateur"],
                     "puissance_nominale": "Accumulateur",
                 },
-                "Rpn",
-            )
-            Pveilleuse = self.abaques["Rg_ecs"](
-                {
-                    "annee_generateur": ecs["annee_generateur"],
-                    "puissance_nominale": "Accumulateur",
-                },
-                "Pveilleuse",
+                ["Rpn", "Pveilleuse"],
             )
+            Rpn, Pveilleuse = rg["Rpn"], rg["Pveilleuse"]
             return safe_divide(
                 1,
                 (1 / Rpn)
@@ -339,27 +554,14 @@ class ECS(BaseProcessor):
             if ecs["Pnom"] < self.DEFAULT_POWER_LIMIT_LOW
             else self.DEFAULT_POWER_LIMIT_HIGH
         )
-        Rpn = self.abaques["Rg_ecs"](
-            {
-                "annee_generateur": ecs["annee_generateur"],
-                "puissance_nominale": ecs["Pnom"],
-            },
-            "Rpn",
-        )
-        Qp0 = self.abaques["Rg_ecs"](
-            {
-                "annee_generateur": ecs["annee_generateur"],
-                "puissance_nominale": ecs["Pnom"],
-            },
-            "Qp0",
-        )
-        Pveilleuse = self.abaques["Rg_ecs"](
+        rg = self.abaques["Rg_ecs"].fetch(
             {
                 "annee_generateur": ecs["annee_generateur"],
                 "puissance_nominale": ecs["Pnom"],
             },
-            "Pveilleuse",
+            ["Rpn", "Qp0", "Pveilleuse"],
         )
+        Rpn, Qp0, Pveilleuse = rg["Rpn"], rg["Qp0"], rg["Pveilleuse"]
 
         if (
             type_generateur
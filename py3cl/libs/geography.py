@@ -0,0 +1,146 @@
+import numpy as np
+
+# Fields of a department record, in order
+DEPARTMENT_FIELDS = [
+    "department",
+    "code",
+    "coef_co2_elec_dpt",
+    "zone_climatique",
+    "zone_hiver",
+    "t_ext_basse",
+    "altitude",
+]
+
+
+def department_code(postal_code):
+    """
+    Get the department code of a postal code: its first two characters, except for Corsica
+    where the postal codes 200xx and 201xx belong to 2A and the others to 2B.
+
+    Args:
+        postal_code (str): The postal code.
+
+    Returns:
+        str: The department code, e.g. '01', '75', '2A'.
+    """
+    postal_code = str(postal_code).strip().upper()
+    code = postal_code[:2]
+    if code == "20":
+        try:
+            code = "2A" if int(postal_code[:3]) < 202 else "2B"
+        except ValueError:
+            pass
+    return code
+
+
+class DepartmentResolver:
+    """
+    Resolves postal codes to the geographic data of their department, precomputed once per department.
+
+    Each record holds the department id of the abaques, its code, the electricity CO2 factor, the climatic
+    zone (H3 sub zones merged into H3), the winter zone, the base outdoor temperature and the middle of
+    its altitude range (used when the altitude of the building is unknown).
+
+    Attributes:
+        records (list): The department records, as dicts with the DEPARTMENT_FIELDS keys.
+        index (dict): The position of each department code in records.
+        columns (dict): The records as a struct of arrays, by field.
+    """
+
+    def __init__(self, abaques):
+        """
+        Builds the department records from the department and kwh_to_co2 abaques.
+
+        Args:
+            abaques (Mapping): The abaques of the DPE model.
+        """
+        department = abaques["department"]
+        kwh_to_co2 = abaques["kwh_to_co2"]
+        self.records = []
+        self.index = {}
+        for department_id in department.key_characteristics["id"]:
+            values = department.fetch(
+                {"id": department_id},
+                ["code", "zone_climatique", "altmin", "altmax", "t_ext_basse"],
+            )
+            try:
+                co2 = kwh_to_co2({"departement": department_id}, "co2")
+            except ValueError:
+                # Departments without an electricity CO2 factor cannot be resolved
+                continue
+            zone_climatique = values["zone_climatique"]
+            if zone_climatique[:2] == "H3":
+                zone_climatique = "H3"
+            self.index[values["code"]] = len(self.records)
+            self.records.append(
+                {
+                    "department": department_id,
+                    "code": values["code"],
+                    "coef_co2_elec_dpt": co2,
+                    "zone_climatique": zone_climatique,
+                    "zone_hiver": zone_climatique[:2],
+                    "t_ext_basse": values["t_ext_basse"],
+                    "altitude": (values["altmin"] + values["altmax"]) / 2,
+                }
+            )
+
+        self.columns = {}
+        for field in DEPARTMENT_FIELDS:
+            column = [record[field] for record in self.records]
+            if all(
+                isinstance(v, (int, float, np.number)) and not isinstance(v, bool)
+                for v in column
+            ):
+                self.columns[field] = np.array(column)
+            else:
+                self.columns[field] = np.empty(len(column), dtype=object)
+                self.columns[field][:] = column
+
+    def resolve(self, postal_code):
+        """
+        Get the record of the department of a postal code.
+
+        Args:
+            postal_code (str): The postal code.
+
+        Returns:
+            dict: The department record.
+
+        Raises:
+            ValueError: If the department is unknown.
+        """
+        code = department_code(postal_code)
+        position = self.index.get(code)
+        if position is None:
+            raise ValueError(f"Unknown department {code} for postal code {postal_code}")
+        return self.records[position]
+
+    def resolve_many(self, postal_codes):
+        """
+        Vectorized equivalent of resolve.
+
+        Args:
+            postal_codes (array-like): The postal codes.
+
+        Returns:
+            tuple: (columns, miss). columns is a dict of arrays by field of the records, miss is a boolean
+            array, True for the postal codes whose department is unknown (their fields are NaN or None).
+        """
+        # Each distinct postal code is resolved once
+        postal_codes = np.asarray(postal_codes, dtype=object).astype(str)
+        unique, inverse = np.unique(postal_codes, return_inverse=True)
+        positions = np.array(
+            [self.index.get(department_code(code), -1) for code in unique],
+            dtype=np.int64,
+        )[inverse.reshape(-1)]
+        miss = positions < 0
+        safe_positions = np.where(miss, 0, positions)
+        columns = {}
+        for field, array in self.columns.items():
+            column = array[safe_positions]
+            if miss.any():
+                if column.dtype.kind in "iu":
+                    column = column.astype(float)
+                column[miss] = np.nan if column.dtype.kind == "f" else None
+            columns[field] = column
+        return columns, miss
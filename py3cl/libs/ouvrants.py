@@ -1,5 +1,7 @@
 from py3cl.libs.utils import safe_divide
 from py3cl.libs.base import BaseProcessor
+from py3cl.libs.batch import element_table, python_min, truthy, validate
+from py3cl.libs.climate import OrientationCoefficients
 from pydantic import BaseModel
 import os
 import numpy as np
@@ -159,6 +161,18 @@ class Vitrage(BaseProcessor):
             "Portes-fenêtres battantes  avec soubassement",
             "Portes-fenêtres battantes  sans soubassement",
         ]
+        self._orientation_coefficients = None
+
+    @property
+    def orientation_coefficients(self):
+        """
+        OrientationCoefficients: The tensor of the c1 coefficients, built on first use.
+        """
+        if self._orientation_coefficients is None:
+            self._orientation_coefficients = OrientationCoefficients(
+                self.abaques, self.months
+            )
+        return self._orientation_coefficients
 
     def define_categorical(self):
         self.categorical_fields = [
@@ -296,6 +310,278 @@ class Vitrage(BaseProcessor):
 
         return vitrage
 
+    def forward_batch(
+        self, dpe: Dict[str, Any], vitrages: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Vectorized equivalent of forward, for the windows of many buildings.
+
+        Each abaque is looked up once for all the windows needing it, the orientation coefficients c1j are rows of
+        the orientation_coefficients tensor, and the solar gains ssej are a matrix with the monthly values of each
+        window, summed per building by the apports solaires. The results are the same as the ones of forward,
+        window by window. The windows forward cannot compute (e.g. an unknown type_menuiserie) go through
+        forward, which raises its error.
+
+        Args:
+            dpe (dict): The building-level columns of the batch: zone_climatique, zone_hiver and type_batiment.
+            vitrages (dict): The flattened windows, with their input "records" and the index of their "building".
+
+        Returns:
+            dict: The element table of the processed windows, with the columns of the records returned by forward.
+        """
+        building = vitrages["building"]
+        records = validate(vitrages["records"], VitrageInput)
+        n = len(records)
+        table = element_table(records, building)
+        if n == 0:
+            return table
+        table["zone_climatique"] = dpe["zone_climatique"][building]
+        table["zone_hiver"] = dpe["zone_hiver"][building]
+        # The computed columns, with the mask of the windows forward sets them for
+        outputs = {}
+
+        def output(name, mask, values):
+            if name not in outputs:
+                outputs[name] = (np.full(n, np.nan), np.zeros(n, dtype=bool))
+            column, done = outputs[name]
+            column[mask] = values
+            done |= mask
+
+        b, aiu_aue, uvue, local, invalid = self._batch_reduction_coefficient(
+            table, dpe["type_batiment"][building], "orientation_veranda"
+        )
+        output("b", ~invalid, b[~invalid])
+        output("aiu_aue", local, aiu_aue[local])
+        output("uvue", local, uvue[local])
+
+        every = np.ones(n, dtype=bool)
+        type_vitrage = table["type_vitrage"]
+        orientation = table["orientation"]
+        horizontal = orientation == ORIENTATION_HORIZONTAL
+        ug = np.full(n, 5.8)
+        glazed = type_vitrage != "Simple Vitrage"
+        if glazed.any():
+            (ug[glazed],) = self._batch_lookup(
+                "ug_vitrage",
+                {
+                    "type_vitrage": type_vitrage[glazed],
+                    "orientation": np.where(
+                        horizontal[glazed], "Horizontale", "Verticale"
+                    ).astype(object),
+                    "remplissage": table["remplissage"][glazed],
+                    "traitement_vitrage": table["traitement_vitrage"][glazed],
+                    "epaisseur_lame": table["epaisseur_lame"][glazed],
+                },
+                ["ug"],
+            )
+        output("Ug", every, ug)
+
+        type_baie = table["type_baie"]
+        fenetres = np.isin(type_baie, self.valid_sub_type_fenetres)
+        (uw,) = self._batch_lookup(
+            "uw_vitrage",
+            {
+                "type_materiaux": table["type_materiaux"],
+                "type_menuiserie": table["type_menuiserie"],
+                "type_baie": np.where(
+                    fenetres, "Fenêtres / Porte-fenêtres", type_baie
+                ).astype(object),
+                "ug": ug,
+            },
+            ["uw"],
+        )
+        output("Uw", every, uw)
+
+        fermetures = table["fermetures"]
+        fermees = truthy(fermetures) & (fermetures != "Unknown or Empty")
+        output("U", ~fermees, uw[~fermees])
+        if fermees.any():
+            (delta_r,) = self._batch_lookup(
+                "resistance_additionnelle_vitrage",
+                {"fermetures": fermetures[fermees]},
+                ["resistance_additionnelle"],
+            )
+            (ujn,) = self._batch_lookup(
+                "transmission_thermique_baie",
+                {"uw": uw[fermees], "deltar": delta_r},
+                ["ujn"],
+            )
+            output("DeltaR", fermees, delta_r)
+            output("Ujn", fermees, ujn)
+            output("U", fermees, ujn)
+
+        # The doors have no solar gains
+        baies = type_baie != "Portes"
+        type_menuiserie = table["type_menuiserie"]
+        invalid |= baies & ~np.array(
+            [value in menuiserie2baie for value in type_menuiserie], dtype=bool
+        )
+        baies &= ~invalid
+        solar = {}
+        if baies.any():
+            zone_climatique = table["zone_climatique"][baies]
+            type_vitrage_fs = np.array(
+                [
+                    (
+                        value + " VIR"
+                        if traitement != "Non Traités"
+                        and ("Double" in value or "Triple" in value)
+                        else value
+                    )
+                    for value, traitement in zip(
+                        type_vitrage[baies], table["traitement_vitrage"][baies]
+                    )
+                ],
+                dtype=object,
+            )
+            type_baie_fs = np.array(
+                [menuiserie2baie[value] for value in type_menuiserie[baies]],
+                dtype=object,
+            )
+            (facteur_solaire,) = self._batch_lookup(
+                "facteur_solaire",
+                {
+                    "type_pose": table["type_pose"][baies],
+                    "materiaux": table["type_materiaux"][baies],
+                    "type_baie": type_baie_fs,
+                    "type_vitrage": type_vitrage_fs,
+                },
+                ["fts"],
+            )
+            output("facteur_solaire", baies, facteur_solaire)
+
+            c1j, miss = self.orientation_coefficients.lookup(
+                zone_climatique,
+                np.where(horizontal, ORIENTATION_HORIZONTAL, orientation)[baies],
+                np.where(horizontal, "Unknown or Empty", table["inclinaison"])[baies],
+            )
+            for i in np.flatnonzero(miss):
+                # Goes through the abaque, which applies its fallback or raises
+                c1j[i] = self.calculate_c1j(
+                    {
+                        "zone_climatique": zone_climatique[i],
+                        "orientation": orientation[baies][i],
+                        "inclinaison": table["inclinaison"][baies][i],
+                    }
+                )
+
+            fe, fe1, fe2 = self._batch_fe(table, baies)
+            output("Fe", baies, fe)
+            output("Fe1", baies, fe1)
+            output("Fe2", baies, fe2)
+            ssej = (table["surface_vitrage"][baies] * facteur_solaire * fe)[
+                :, None
+            ] * c1j
+            solar = {
+                "type_vitrage_fs": type_vitrage_fs,
+                "type_baie_fs": type_baie_fs,
+                "c1j": c1j,
+                "ssej": ssej,
+            }
+
+        for i in np.flatnonzero(invalid):
+            # Raises the error of the window
+            view = {
+                key: dpe[key][building[i]]
+                for key in ["zone_climatique", "zone_hiver", "type_batiment"]
+            }
+            self.forward(view, VitrageInput(**vitrages["records"][i]))
+
+        for name, (column, done) in outputs.items():
+            if done.any():
+                column[~done] = np.nan
+                table[name] = column
+        for name, values in solar.items():
+            # As in the records of forward, the doors have None for the fields of the solar gains
+            if baies.all():
+                table[name] = values
+            else:
+                table[name] = np.full(n, None, dtype=object)
+                table[name][baies] = list(values)
+        return table
+
+    def _batch_fe(self, table, baies):
+        """
+        Vectorized equivalent of calculate_fe, for the windows of the mask baies.
+
+        Returns:
+            tuple: The arrays (Fe, Fe1, Fe2) of the windows.
+        """
+        n = int(baies.sum())
+
+        def known(*names):
+            # The fields are set, and not "Unknown or Empty"
+            mask = np.ones(n, dtype=bool)
+            for name in names:
+                values = table[name][baies]
+                mask &= truthy(values) & (values != "Unknown or Empty")
+            return mask
+
+        def keys(mask, fields):
+            return {key: table[field][baies][mask] for key, field in fields.items()}
+
+        fe1 = np.ones(n)
+        proche = known("masque_proche_type_masque")
+        proche &= (
+            table["masque_proche_type_masque"][baies] != "Absence de masque proche"
+        )
+        if proche.any():
+            (fe1[proche],) = self._batch_lookup(
+                "coef_masques_proches",
+                keys(
+                    proche,
+                    {
+                        "type_masque": "masque_proche_type_masque",
+                        "avance": "masque_proche_avance",
+                        "orientation": "masque_proche_orientation",
+                        "rapport_l1_l2": "masque_proche_rapport_l1_l2",
+                        "beta_gama": "masque_proche_beta_gama",
+                        "angle_superieur_30": "masque_proche_angle_superieur_30",
+                    },
+                ),
+                ["fe1"],
+            )
+
+        fe2_1 = np.ones(n)
+        lointain = truthy(table["masque_lointain_hauteur_alpha"][baies])
+        lointain &= known("masque_lointain_orientation")
+        if lointain.any():
+            (fe2_1[lointain],) = self._batch_lookup(
+                "coef_masques_lointain_homogene",
+                keys(
+                    lointain,
+                    {
+                        "hauteur_alpha": "masque_lointain_hauteur_alpha",
+                        "orientation": "masque_lointain_orientation",
+                    },
+                ),
+                ["fe2"],
+            )
+
+        fe2_2 = np.ones(n)
+        ombrage = known(
+            "ombrage_lointain_hauteur",
+            "ombrage_lointain_orientation",
+            "ombrage_lointain_secteur",
+        )
+        if ombrage.any():
+            (omb,) = self._batch_lookup(
+                "coef_ombrage_lointain",
+                keys(
+                    ombrage,
+                    {
+                        "hauteur": "ombrage_lointain_hauteur",
+                        "orientation": "ombrage_lointain_orientation",
+                        "secteur": "ombrage_lointain_secteur",
+                    },
+                ),
+                ["omb"],
+            )
+            fe2_2[ombrage] = 1 - 0.01 * omb
+
+        fe2 = python_min(fe2_1, fe2_2)
+        return fe1 * fe2, fe1, fe2
+
     def calculate_b(self, vitrage: Dict[str, Any], dpe: Dict[str, Any]) -> float:
         """
         Calculates the coefficient of reduction of loss (b) for the vitrage.
@@ -308,11 +594,8 @@ class Vitrage(BaseProcessor):
             float: The coefficient of reduction of loss (b).
         """
         exterior_type = vitrage["exterior_type_or_local_non_chauffe"]
-        if (
-            exterior_type
-            in self.abaques["coef_reduction_deperdition_exterieur"].key_characteristics[
-                "aiu_aue"
-            ]
+        if self.abaques["coef_reduction_deperdition_exterieur"].has_key_value(
+            "aiu_aue", exterior_type
         ):
             return self.abaques["coef_reduction_deperdition_exterieur"](
                 {"aiu_aue": exterior_type}, "valeur"
@@ -469,6 +752,12 @@ class Vitrage(BaseProcessor):
             if vitrage["orientation"] == "Horizontal"
             else vitrage["inclinaison"]
         )
+        c1, miss = self.orientation_coefficients.lookup(
+            [vitrage["zone_climatique"]], [orientation], [inclinaison]
+        )
+        if not miss[0]:
+            return c1[0]
+        # Unknown combinations go through the abaque, which applies its fallback or raises its error
         return np.array(
             [
                 self.abaques["coefficient_orientation"](
@@ -1,5 +1,15 @@
 from py3cl.libs.utils import safe_divide
 from py3cl.libs.base import BaseProcessor
+from py3cl.libs.batch import (
+    element_table,
+    is_number,
+    python_min,
+    safe_divide_many,
+    to_column,
+    truthy,
+    validate,
+)
+import numpy as np
 from pydantic import BaseModel
 import os
 from typing import Optional, List, Dict, Any, Union
@@ -223,11 +233,8 @@ class Paroi(BaseProcessor):
         paroi["zone_hiver"] = dpe["zone_hiver"]
 
         # Calc b : coefficient de reduction de deperdition
-        if (
-            paroi["exterior_type_or_local_non_chauffe"]
-            in self.abaques["coef_reduction_deperdition_exterieur"].key_characteristics[
-                "aiu_aue"
-            ]
+        if self.abaques["coef_reduction_deperdition_exterieur"].has_key_value(
+            "aiu_aue", paroi["exterior_type_or_local_non_chauffe"]
         ):
             paroi["b"] = self.abaques["coef_reduction_deperdition_exterieur"](
                 {"aiu_aue": paroi["exterior_type_or_local_non_chauffe"]}, "valeur"
@@ -275,6 +282,234 @@ class Paroi(BaseProcessor):
 
         return paroi
 
+    def forward_batch(self, dpe, parois):
+        """
+        Vectorized equivalent of forward, for the walls and floors of many buildings.
+
+        The branches of forward (the reduction coefficient b, then the U of the murs, planchers bas and planchers
+        hauts) are computed as masks over all the elements, each abaque being looked up once for the elements of a
+        branch. The results are the same as the ones of forward, element by element. The elements forward cannot
+        compute (e.g. an insulated wall without materials, a plancher bas on terre plein without perimeter) go
+        through forward, which raises its error.
+
+        Args:
+            dpe (dict): The building-level columns of the batch: annee_construction, zone_hiver and type_batiment.
+            parois (dict): The flattened walls, with their input "records" and the index of their "building".
+
+        Returns:
+            dict: The element table of the processed walls, with the columns of the records returned by forward.
+        """
+        building = parois["building"]
+        records = validate(parois["records"], ParoiInput)
+        n = len(records)
+        if n == 0:
+            return element_table(records, building)
+
+        records = [
+            (
+                {**record, "annee_isolation": None}
+                if record["annee_isolation"] == "Unknown or Empty"
+                else record
+            )
+            for record in records
+        ]
+        annee_construction = dpe["annee_construction"][building]
+        table = element_table(records, building)
+        table["annee_construction_ou_isolation"] = to_column(
+            [
+                (
+                    record["annee_isolation"]
+                    if record["annee_isolation"] is not None
+                    else annee
+                )
+                for record, annee in zip(records, annee_construction)
+            ]
+        )
+        table["zone_hiver"] = dpe["zone_hiver"][building]
+        # The computed columns, with the mask of the elements forward sets them for
+        outputs = {}
+
+        def output(name, mask, values):
+            if name not in outputs:
+                outputs[name] = (np.full(n, np.nan), np.zeros(n, dtype=bool))
+            column, done = outputs[name]
+            column[mask] = values
+            done |= mask
+
+        # Calc b : coefficient de reduction de deperdition
+        b, aiu_aue, uvue, local, invalid = self._batch_reduction_coefficient(
+            table, dpe["type_batiment"][building], "orientation"
+        )
+        output("b", ~invalid, b[~invalid])
+        output("aiu_aue", local, aiu_aue[local])
+        output("uvue", local, uvue[local])
+
+        # Calc U
+        identifiant = table["identifiant"]
+        uparoi = np.array([record["uparoi"] is not None for record in records])
+        kind = np.select(
+            [
+                uparoi,
+                np.array(["mur" in i for i in identifiant], dtype=bool),
+                np.array(["plancher_bas" in i for i in identifiant], dtype=bool),
+                np.array(["plancher_haut" in i for i in identifiant], dtype=bool),
+            ],
+            ["uparoi", "mur", "plancher_bas", "plancher_haut"],
+            "",
+        )
+        output("U", kind == "uparoi", table["uparoi"][kind == "uparoi"])
+        isolation = table["isolation"]
+        isolation_false = np.array([value == False for value in isolation], dtype=bool)
+        isolation_none = np.array([value is None for value in isolation], dtype=bool)
+        r_isolant = truthy(table["r_isolant"])
+        epaisseur_isolant = truthy(table["epaisseur_isolant"])
+        materiaux = truthy(table["materiaux"])
+        tabulated_keys = {
+            "zone_hiver": table["zone_hiver"],
+            "effet_joule": table["effet_joule"],
+        }
+
+        for name, mask, has_u0, u0_abaque, u0_keys, cap, tab_abaque, tab_key, lame in [
+            (
+                "mur",
+                kind == "mur",
+                materiaux & truthy(table["epaisseur"]),
+                "umur0",
+                {"umur0_materiaux": "materiaux", "epaisseur": "epaisseur"},
+                2.5,
+                "umur",
+                "annee_construction_max",
+                40,
+            ),
+            (
+                "plancher_bas",
+                kind == "plancher_bas",
+                materiaux,
+                "upb0",
+                {"materiaux": "materiaux"},
+                2.0,
+                "upb",
+                "annee_construction_max",
+                42,
+            ),
+            (
+                "plancher_haut",
+                kind == "plancher_haut",
+                materiaux,
+                "uph0",
+                {"materiaux": "materiaux"},
+                2.5,
+                "uph",
+                "type_toit",
+                40,
+            ),
+        ]:
+            if not mask.any():
+                continue
+            u0 = np.full(n, np.nan)
+            if (mask & has_u0).any():
+                rows = mask & has_u0
+                # umur0 stores its values under "umur"
+                value = "umur" if u0_abaque == "umur0" else u0_abaque
+                (u0[rows],) = self._batch_lookup(
+                    u0_abaque,
+                    {key: table[field][rows] for key, field in u0_keys.items()},
+                    [value],
+                )
+            u_nu = np.where(has_u0, python_min(u0, cap), cap)
+            output("U_nu", mask, u_nu[mask])
+
+            # The insulated elements need the U of their materials
+            invalid |= mask & ~isolation_false & ~has_u0
+            rows = mask & ~invalid
+            insulated = rows & ~isolation_false & ~isolation_none
+            with_r = insulated & r_isolant
+            with_epaisseur = insulated & ~r_isolant & epaisseur_isolant
+            tabulated = (rows & isolation_none) | (
+                insulated & ~r_isolant & ~epaisseur_isolant
+            )
+            if name == "mur":
+                r_enduit = np.select(
+                    [
+                        truthy(table["enduit"]),
+                        truthy(table["doublage_with_lame_below_15mm"]),
+                        truthy(table["doublage_with_lame_above_15mm"]),
+                    ],
+                    [0.7, 0.1, 0.21],
+                    0,
+                )
+                u_false = safe_divide_many(1, safe_divide_many(1, u_nu) + r_enduit)
+            else:
+                u_false = u_nu
+            output("U", rows & isolation_false, u_false[rows & isolation_false])
+            output(
+                "U",
+                with_r,
+                safe_divide_many(
+                    1,
+                    safe_divide_many(1, u0[with_r]) + table["r_isolant"][with_r],
+                ),
+            )
+            output(
+                "U",
+                with_epaisseur,
+                safe_divide_many(
+                    1,
+                    safe_divide_many(1, u0[with_epaisseur])
+                    + table["epaisseur_isolant"][with_epaisseur] / lame,
+                ),
+            )
+            if tabulated.any():
+                (u_tab,) = self._batch_lookup(
+                    tab_abaque,
+                    {
+                        tab_key: table["annee_construction_ou_isolation"][tabulated],
+                        **{k: v[tabulated] for k, v in tabulated_keys.items()},
+                    },
+                    [tab_abaque],
+                )
+                output("U", tabulated, python_min(u0[tabulated], u_tab))
+
+        # Planchers bas on vide sanitaire, unheated underground or terre plein
+        underground = truthy(table["is_vide_sanitaire"]) | truthy(
+            table["is_unheated_underground"]
+        )
+        terre_plein = (kind == "plancher_bas") & ~invalid
+        terre_plein &= underground | truthy(table["is_terre_plain"])
+        perimeter = table["perimeter_immeuble"]
+        valid_perimeter = is_number(perimeter) & (perimeter != 0)
+        # The type of terre plein reads the construction year of the paroi, which it lacks
+        invalid |= terre_plein & ~(underground & valid_perimeter)
+        terre_plein &= ~invalid
+        if terre_plein.any():
+            surface = np.where(
+                is_number(table["surface_immeuble"]),
+                table["surface_immeuble"],
+                table["surface_paroi"],
+            )
+            ssp = 2 * surface[terre_plein] / perimeter[terre_plein]
+            upb = outputs["U"][0][terre_plein]
+            type_tp = np.full(len(ssp), "other", dtype=object)
+            (u_tp,) = self._batch_lookup(
+                "upb_tp", {"type_tp": type_tp, "2S/P": ssp, "Upb": upb}, ["Value"]
+            )
+            output("Upb_sans_tp", terre_plein, upb)
+            output("U", terre_plein, u_tp)
+
+        for i in np.flatnonzero(invalid):
+            # Raises the error of the element
+            view = {
+                key: dpe[key][building[i]]
+                for key in ["annee_construction", "zone_hiver", "type_batiment"]
+            }
+            self.forward(view, ParoiInput(**parois["records"][i]))
+
+        for name, (column, done) in outputs.items():
+            if done.any():
+                column[~done] = np.nan
+                table[name] = column
+        return table
+
     def _forward_plancher_haut(self, paroi):
         """
         Processes and calculates thermal transmittance values specifically for upper floors.
@@ -0,0 +1,288 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class Stage:
+    """
+    A stage of a computation: a function reading some fields of a state dict and writing others.
+
+    Attributes:
+        name (str): The name of the stage.
+        inputs (tuple): The fields read by the stage.
+        outputs (tuple): The fields written by the stage. A field can be both read and written, when the stage
+            completes or updates it in place (e.g. the processed parois).
+        forward (callable): The function of the stage, called with the state of a single building.
+        forward_batch (callable, optional): The function of the stage, called with the columns of a batch of
+            buildings.
+        elements (str, optional): The input field whose elements the stage processes one by one. Its forward then
+            accepts the identifiers of the elements to process as ids keyword argument.
+        element_patterns (list, optional): The stage only processes the elements whose identifier contains one of
+            the patterns. None processes all the elements.
+    """
+
+    def __init__(
+        self,
+        name,
+        inputs,
+        outputs,
+        forward,
+        forward_batch=None,
+        elements=None,
+        element_patterns=None,
+    ):
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.forward = forward
+        self.forward_batch = forward_batch
+        self.elements = elements
+        self.element_patterns = element_patterns
+
+    def processes(self, identifier):
+        """
+        Tests if the stage processes an element of its elements field.
+
+        Args:
+            identifier (str): The identifier of the element.
+
+        Returns:
+            bool: True if the identifier matches the element patterns of the stage.
+        """
+        if self.element_patterns is None:
+            return True
+        return any(pattern in identifier for pattern in self.element_patterns)
+
+    def __repr__(self):
+        return f"Stage({self.name})"
+
+
+class Pipeline:
+    """
+    A computation declared as a DAG of stages, each stage depending on the stages writing its inputs.
+
+    The stages are declared in an order compatible with their dependencies, which is the order of a
+    sequential run. The fields not written by any stage are the inputs of the computation.
+
+    Attributes:
+        stages (list): The stages, in declaration order.
+        producers (dict): The stage writing each field.
+        dependencies (dict): The names of the stages each stage depends on, by stage name.
+        dependents (dict): The names of the stages depending on each stage, by stage name.
+    """
+
+    def __init__(self, stages):
+        """
+        Builds the DAG of the stages.
+
+        Args:
+            stages (list): The stages, in an order compatible with their dependencies.
+
+        Raises:
+            ValueError: If two stages write the same field, or a stage reads a field written by a later stage.
+        """
+        self.stages = list(stages)
+        self.producers = {}
+        for stage in self.stages:
+            for field in stage.outputs:
+                if field in self.producers:
+                    raise ValueError(
+                        f"Field {field} is written by stages {self.producers[field].name} and {stage.name}"
+                    )
+                self.producers[field] = stage
+
+        self.dependencies = {}
+        self.dependents = {stage.name: [] for stage in self.stages}
+        done = set()
+        for stage in self.stages:
+            dependencies = []
+            for field in stage.inputs:
+                producer = self.producers.get(field)
+                if producer is None or producer is stage:
+                    continue
+                if producer.name not in done:
+                    raise ValueError(
+                        f"Stage {stage.name} reads {field}, written by the later stage {producer.name}"
+                    )
+                if producer.name not in dependencies:
+                    dependencies.append(producer.name)
+                    self.dependents[producer.name].append(stage.name)
+            self.dependencies[stage.name] = dependencies
+            done.add(stage.name)
+        self._by_name = {stage.name: stage for stage in self.stages}
+
+    def __getitem__(self, name):
+        return self._by_name[name]
+
+    @property
+    def inputs(self):
+        """
+        list: The fields read by the stages and written by none of them.
+        """
+        fields = [
+            field
+            for stage in self.stages
+            for field in stage.inputs
+            if self.producers.get(field, stage) is stage
+        ]
+        return list(dict.fromkeys(fields))
+
+    def required(self, outputs):
+        """
+        The stages needed to compute some fields.
+
+        Args:
+            outputs (list): The requested fields.
+
+        Returns:
+            list: The stages writing the fields and the stages they depend on, in declaration order.
+
+        Raises:
+            KeyError: If a field is written by no stage.
+        """
+        needed = set()
+        todo = []
+        for field in outputs:
+            if field not in self.producers:
+                raise KeyError(f"No stage computes {field}")
+            todo.append(self.producers[field].name)
+        while todo:
+            name = todo.pop()
+            if name not in needed:
+                needed.add(name)
+                todo.extend(self.dependencies[name])
+        return [stage for stage in self.stages if stage.name in needed]
+
+    def affected(self, fields, elements=None):
+        """
+        The stages to re-run when some inputs of the computation change.
+
+        A stage is affected if it reads a changed field or a field written by an affected stage. A stage affected
+        only by changes of some elements of its elements field only re-processes these elements.
+
+        Args:
+            fields (iterable): The changed fields.
+            elements (dict, optional): The identifiers of the changed (added, modified or removed) elements, by
+                field made of elements.
+
+        Returns:
+            list: The (stage, ids) pairs of the affected stages, in declaration order. ids are the identifiers of
+            the elements the stage re-processes, or None if the stage has to be fully re-run.
+        """
+        elements = elements or {}
+        dirty = set(fields)
+        affected = []
+        for stage in self.stages:
+            hit, ids = self._affected_ids(stage, dirty, elements)
+            if hit:
+                affected.append((stage, ids))
+                dirty.update(stage.outputs)
+        return affected
+
+    def update(self, state, fields, elements=None, prepare=None, same=None):
+        """
+        Re-runs the stages affected by a change of some inputs on the state of a previous run.
+
+        Unlike affected, the changes are followed while the stages run: the outputs a re-run stage leaves
+        unchanged do not affect the stages reading them.
+
+        Args:
+            state (dict): The state of the previous run, holding the changed inputs. Updated in place.
+            fields (iterable): The changed fields.
+            elements (dict, optional): The identifiers of the changed elements, by field, as in affected.
+            prepare (callable, optional): Called with each stage and its ids before re-running it, e.g. to restore
+                the inputs the stage completes in place.
+            same (callable, optional): Tests if the previous and new values of an output are equal. None considers
+                all the outputs of the re-run stages as changed.
+
+        Returns:
+            list: The (stage, ids) pairs of the re-run stages, as in affected.
+        """
+        elements = elements or {}
+        dirty = set(fields)
+        rerun = []
+        for stage in self.stages:
+            hit, ids = self._affected_ids(stage, dirty, elements)
+            if not hit:
+                continue
+            before = {field: state[field] for field in stage.outputs if field in state}
+            if prepare is not None:
+                prepare(stage, ids)
+            if ids is None:
+                stage.forward(state)
+            else:
+                stage.forward(state, ids=ids)
+            rerun.append((stage, ids))
+            for field in stage.outputs:
+                if (
+                    same is None
+                    or field not in before
+                    or not same(before[field], state.get(field))
+                ):
+                    dirty.add(field)
+        return rerun
+
+    @staticmethod
+    def _affected_ids(stage, dirty, elements):
+        """
+        Tests if a stage reads a changed field.
+
+        Returns:
+            tuple: (affected, ids), ids being the identifiers of the elements to re-process or None for all.
+        """
+        reasons = [field for field in stage.inputs if field in dirty]
+        if not reasons:
+            return False, None
+        if reasons == [stage.elements] and stage.elements in elements:
+            ids = [i for i in elements[stage.elements] if stage.processes(i)]
+            # None of the changed elements may be processed by the stage
+            return bool(ids), ids
+        return True, None
+
+    def run(self, state, outputs=None, batch=False, max_workers=None):
+        """
+        Runs the stages on a state.
+
+        Args:
+            state (dict): The inputs of the computation, completed in place by the stages.
+            outputs (list, optional): The requested fields. Only the stages needed to compute them are run. None
+                runs all the stages.
+            batch (bool): Whether state holds the columns of a batch of buildings (forward_batch of the stages).
+            max_workers (int, optional): The number of threads running the independent stages concurrently. None
+                runs the stages one after the other, in declaration order.
+
+        Returns:
+            dict: The state.
+        """
+        stages = self.stages if outputs is None else self.required(outputs)
+        if max_workers is None or max_workers <= 1:
+            for stage in stages:
+                self._function(stage, batch)(state)
+            return state
+
+        pending = {stage.name: stage for stage in stages}
+        waiting = {
+            stage.name: {d for d in self.dependencies[stage.name] if d in pending}
+            for stage in stages
+        }
+        running = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while pending or running:
+                for name in [n for n in pending if not waiting[n]]:
+                    stage = pending.pop(name)
+                    running[executor.submit(self._function(stage, batch), state)] = name
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    # Raises the error of the stage
+                    future.result()
+                    for dependent in self.dependents[name]:
+                        if dependent in waiting:
+                            waiting[dependent].discard(name)
+        return state
+
+    @staticmethod
+    def _function(stage, batch):
+        if not batch:
+            return stage.forward
+        if stage.forward_batch is None:
+            raise ValueError(f"Stage {stage.name} has no batch function")
+        return stage.forward_batch
@@ -1,7 +1,9 @@
 from py3cl.libs.utils import safe_divide
 from py3cl.libs.base import BaseProcessor
+from py3cl.libs.batch import element_table, is_number, validate
 from pydantic import BaseModel, Field
 import os
+import numpy as np
 from typing import Optional, Dict, Any, Union
 import logging
 
@@ -12,6 +14,35 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Keys of the kpth abaque, in order
+KPTH_KEYS = [
+    "type_liaison",
+    "isolation_mur",
+    "isolation_plancher_bas",
+    "type_pose",
+    "retour_isolation",
+    "largeur_dormant",
+]
+
+
+def parse_largeur_dormant(largeur_dormant):
+    """Parse the width of the frame to the value of the kpth abaque.
+
+    Args:
+        largeur_dormant (str): The width of the frame, e.g. "10 cm".
+
+    Returns:
+        float or str: 10.0 or 5.0 if the width mentions them, "Unknown or Empty" otherwise.
+
+    Raises:
+        TypeError: If the width is not a string.
+    """
+    if "10" in largeur_dormant:
+        return 10.0
+    elif "5" in largeur_dormant:
+        return 5.0
+    return "Unknown or Empty"
+
 
 class PontThermiqueInput(BaseModel):
     """Represents the input for a thermal bridge calculation.
@@ -102,13 +133,7 @@ class PontThermique(BaseProcessor):
             ValueError: If the k value is not found.
         """
         try:
-            largeur_dormant = pont_thermique["largeur_dormant"]
-            if "10" in largeur_dormant:
-                largeur_dormant = 10.0
-            elif "5" in largeur_dormant:
-                largeur_dormant = 5.0
-            else:
-                largeur_dormant = "Unknown or Empty"
+            largeur_dormant = parse_largeur_dormant(pont_thermique["largeur_dormant"])
 
             k_value = self.abaques["kpth"](
                 {
@@ -159,3 +184,79 @@ class PontThermique(BaseProcessor):
             pont_thermique["k"] * pont_thermique["longueur_pont"], 1
         )  # Use safe_divide to handle any potential division issues
         return pont_thermique
+
+    def forward_batch(
+        self, dpe: Dict[str, Any], ponts_thermiques: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Vectorized equivalent of forward, for the thermal bridges of many buildings.
+
+        The widths of the frames are parsed once per distinct value, and the keys of the kpth abaque are encoded
+        once per distinct combination, each combination being looked up once for the whole batch. d_pont is then
+        k * longueur_pont, as an array. The bridges whose k or length is missing (forward cannot compute their
+        d_pont) get a NaN d_pont (and k, if it is the lookup that failed) and a True "miss" column, the caller deciding whether to raise, as with
+        Abaque.lookup_many.
+
+        Args:
+            dpe (dict): The building-level columns of the batch (unused, as in forward).
+            ponts_thermiques (dict): The flattened thermal bridges, with their input "records" and the index of
+                their "building".
+
+        Returns:
+            dict: The element table of the processed bridges, with the columns of the records returned by forward
+                and the boolean "miss" column.
+        """
+        building = ponts_thermiques["building"]
+        records = validate(ponts_thermiques["records"], PontThermiqueInput)
+        table = element_table(records, building)
+        n = len(records)
+        if n == 0:
+            table["miss"] = np.zeros(0, dtype=bool)
+            return table
+
+        # Each distinct width is parsed once, the widths that are not strings having no k
+        largeurs = {}
+        for record in records:
+            value = record["largeur_dormant"]
+            if value not in largeurs:
+                try:
+                    largeurs[value] = parse_largeur_dormant(value)
+                except TypeError:
+                    largeurs[value] = None
+
+        # Each distinct combination of the keys is looked up once
+        combinations = {}
+        code = np.empty(n, dtype=np.int64)
+        for i, record in enumerate(records):
+            key = tuple(record[key] for key in KPTH_KEYS[:-1])
+            key += (largeurs[record["largeur_dormant"]],)
+            code[i] = combinations.setdefault(key, len(combinations))
+        columns = {}
+        for j, key in enumerate(KPTH_KEYS):
+            columns[key] = np.empty(len(combinations), dtype=object)
+            columns[key][:] = [combination[j] for combination in combinations]
+        unparsed = np.array([value is None for value in columns["largeur_dormant"]])
+        k = np.full(len(combinations), np.nan)
+        miss = unparsed.copy()
+        abaque = self.abaques["kpth"]
+        if (~unparsed).any():
+            (k[~unparsed],), miss[~unparsed] = abaque.fetch_many(
+                {key: column[~unparsed] for key, column in columns.items()}, ["k"]
+            )
+        for j in np.flatnonzero(miss & ~unparsed):
+            # The abaque applies its fallback, or raises
+            try:
+                k[j] = abaque({key: column[j] for key, column in columns.items()})
+                miss[j] = False
+            except ValueError:
+                pass
+
+        number = is_number(table["longueur_pont"])
+        longueur = np.full(n, np.nan)
+        longueur[number] = table["longueur_pont"][number]
+        k = k[code]
+        miss = miss[code] | ~number
+
+        table["k"] = k
+        table["d_pont"] = k * longueur
+        table["miss"] = miss
+        return table
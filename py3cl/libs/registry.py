@@ -0,0 +1,209 @@
+import logging
+import os
+import threading
+from collections.abc import Mapping
+
+from py3cl.libs.abaques import Abaque
+from py3cl.libs.bundle import content_hash, save_bundle, load_bundle
+
+logger = logging.getLogger(__name__)
+
+
+class AbaqueRegistry(Mapping):
+    """
+    A read only mapping of abaque names to Abaque objects, materialised on first access.
+
+    Each abaque is restored from the precompiled bundle when it matches the configuration and data files,
+    and built from its configuration otherwise. The numeric arrays restored from the bundle are read-only
+    views of the memory-mapped file, shared by all the processes using the same bundle. A missing or outdated
+    bundle is rewritten after the first abaque is built, so that only the first instance rebuilds the abaques
+    from the csv files. If the directory of the bundle is not writable, the abaques are built on first access
+    and the bundle is left to make bundle. Access is thread-safe: an abaque is built only once, even when several
+    threads request it at the same time.
+
+    Attributes:
+        configs (dict): A dictionary containing the paths to the configuration files of the abaques.
+        data_path (str): The directory containing the csv files of the abaques.
+        bundle_path (str, optional): Path of the precompiled abaques bundle. None disables the bundle.
+    """
+
+    def __init__(self, configs, data_path, bundle_path=None):
+        self.configs = configs
+        self.data_path = data_path
+        self.bundle_path = bundle_path
+        self._abaques = {}
+        self._bundle = None
+        self._digest = None
+        self._stale = False
+        self._cache_settings = {}
+        self._init_locks()
+
+    def _init_locks(self):
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._key_locks = {key: threading.Lock() for key in self.configs}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"], state["_write_lock"], state["_key_locks"]
+        # The memory-mapped bundle is opened again if needed
+        state["_bundle"] = None
+        state["_digest"] = None
+        state["_stale"] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_locks()
+
+    def __getitem__(self, key):
+        try:
+            return self._abaques[key]
+        except KeyError:
+            pass
+        if key not in self.configs:
+            raise KeyError(key)
+        with self._key_locks[key]:
+            if key not in self._abaques:
+                abaque = self._materialise(key)
+                if key in self._cache_settings:
+                    abaque.enable_cache(**self._cache_settings[key])
+                self._abaques[key] = abaque
+        if self._stale:
+            self._rewrite_bundle()
+        return self._abaques[key]
+
+    def __contains__(self, key):
+        return key in self.configs
+
+    def __iter__(self):
+        return iter(self.configs)
+
+    def __len__(self):
+        return len(self.configs)
+
+    def _read_bundle(self):
+        """
+        Reads the bundle once, and keeps the pickled abaques it contains if it matches the sources.
+        """
+        with self._lock:
+            if self._digest is None:
+                self._digest = content_hash(self.configs, self.data_path)
+                bundle = load_bundle(self.bundle_path, self._digest)
+                self._bundle = bundle if bundle is not None else {}
+                # The abaques are only all materialised to rewrite a bundle that can be written
+                self._stale = bundle is None and self._writable()
+                if self._stale:
+                    logger.warning(
+                        f"The abaques bundle {self.bundle_path} is missing or outdated: the abaques are "
+                        "rebuilt from the csv files and the bundle rewritten. Build it ahead of time with "
+                        "make bundle or DPE.preload()."
+                    )
+                elif bundle is None:
+                    logger.warning(
+                        f"The abaques bundle {self.bundle_path} is missing or outdated, and its directory is "
+                        "not writable: the abaques are rebuilt from the csv files on first access. Build it "
+                        "with make bundle."
+                    )
+        return self._bundle
+
+    def _writable(self):
+        """
+        Tests if the bundle can be rewritten: save_bundle writes a temporary file next to it.
+        """
+        directory = os.path.dirname(os.path.abspath(self.bundle_path))
+        return os.access(directory, os.W_OK)
+
+    def _rewrite_bundle(self):
+        """
+        Rewrites the missing or outdated bundle once, materialising the abaques that have not been built yet.
+        """
+        # The thread rewriting the bundle materialises the other abaques, the other threads go on
+        if not self._write_lock.acquire(blocking=False):
+            return
+        try:
+            if not self._stale:
+                return
+            for key in self.configs:
+                self[key]
+            try:
+                save_bundle(self.bundle_path, self._abaques, self._digest)
+            except OSError as e:
+                logger.warning(f"Could not write the abaques bundle: {str(e)}")
+            self._stale = False
+        finally:
+            self._write_lock.release()
+
+    def _materialise(self, key):
+        if self.bundle_path:
+            bundle = self._read_bundle()
+            if key in bundle:
+                return bundle.load(key)
+        return Abaque(self.configs[key], name=key, data_path=self.data_path)
+
+    def materialised(self):
+        """
+        Lists the abaques that have been loaded or built so far.
+
+        Returns:
+            list: The names of the materialised abaques, in the order of the configuration.
+        """
+        return [key for key in self.configs if key in self._abaques]
+
+    def preload(self):
+        """
+        Materialises all the abaques. If the bundle was missing or outdated, it is rewritten if its directory is
+        writable.
+
+        Returns:
+            list: The names of the abaques materialised by this call.
+        """
+        loaded = [key for key in self.configs if key not in self._abaques]
+        for key in loaded:
+            self[key]
+
+        if self.bundle_path:
+            self._read_bundle()
+            if self._stale:
+                self._rewrite_bundle()
+        return loaded
+
+    def enable_cache(self, names=None, capacity=1024, policy="lru"):
+        """
+        Enables the memo cache of the given abaques, now for the materialised ones and on first access for the
+        others.
+
+        Args:
+            names (list, optional): The names of the abaques. None selects all of them.
+            capacity (int): The maximum number of memoized inputs per abaque.
+            policy (str): The eviction policy, 'lru' or 'fifo'.
+        """
+        for key in self.configs if names is None else names:
+            if key not in self.configs:
+                raise KeyError(key)
+            self._cache_settings[key] = {"capacity": capacity, "policy": policy}
+            if key in self._abaques:
+                self._abaques[key].enable_cache(capacity, policy)
+
+    def disable_cache(self, names=None):
+        """
+        Disables the memo cache of the given abaques.
+
+        Args:
+            names (list, optional): The names of the abaques. None selects all of them.
+        """
+        for key in self.configs if names is None else names:
+            self._cache_settings.pop(key, None)
+            if key in self._abaques:
+                self._abaques[key].disable_cache()
+
+    def cache_stats(self):
+        """
+        Returns:
+            dict: The counters of the memo caches, by name of the materialised abaques that have one.
+        """
+        return {
+            key: abaque.cache_stats()
+            for key, abaque in list(self._abaques.items())
+            if abaque.cache is not None
+        }
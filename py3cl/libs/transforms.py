@@ -0,0 +1,167 @@
+from functools import reduce
+import operator
+
+# Named transforms that abaque configs can reference instead of python lambdas.
+# Column transforms take a Series and return a Series of the same length, they are used by
+# the mapping and filters blocks of the configs (a filter keeps the rows where the result is True).
+# Reductions take a DataFrame of the reduced columns and return a Series, they are used by the
+# reduce block.
+COLUMN_TRANSFORMS = {}
+REDUCTIONS = {}
+
+_KEEP = object()
+
+
+def register_transform(name):
+    """
+    Registers a column transform under the given name.
+
+    Args:
+        name (str): The name referenced by the configs.
+    """
+
+    def decorator(func):
+        COLUMN_TRANSFORMS[name] = func
+        return func
+
+    return decorator
+
+
+def register_reduction(name):
+    """
+    Registers a reduction under the given name.
+
+    Args:
+        name (str): The name referenced by the configs.
+    """
+
+    def decorator(func):
+        REDUCTIONS[name] = func
+        return func
+
+    return decorator
+
+
+def apply_transform(series, spec):
+    """
+    Applies the column transform described by a config entry.
+
+    Args:
+        series (pd.Series): The column to transform.
+        spec (dict): The config entry, with the name of the transform under "transform" and its parameters.
+
+    Returns:
+        pd.Series: The transformed column.
+    """
+    params = {k: v for k, v in spec.items() if k not in ("col", "transform", "negate")}
+    result = COLUMN_TRANSFORMS[spec["transform"]](series, **params)
+    if spec.get("negate", False):
+        result = ~result.astype(bool)
+    return result
+
+
+def apply_reduction(frame, spec):
+    """
+    Applies the reduction described by a config entry.
+
+    Args:
+        frame (pd.DataFrame): The table containing the reduced columns.
+        spec (dict): The config entry, with the reduced columns under "cols", the name of the reduction under
+            "transform" and its parameters.
+
+    Returns:
+        pd.Series: The reduced column.
+    """
+    params = {
+        k: v for k, v in spec.items() if k not in ("cols", "new_col", "transform")
+    }
+    return REDUCTIONS[spec["transform"]](frame[spec["cols"]], **params)
+
+
+@register_transform("replace")
+def replace(series, replacements):
+    """Replaces substrings, in order, in a column of strings."""
+    for old, new in replacements.items():
+        series = series.str.replace(old, new, regex=False)
+    return series
+
+
+@register_transform("astype")
+def astype(series, dtype):
+    """Casts a column to the given dtype (e.g. float, str)."""
+    return series.astype(dtype)
+
+
+@register_transform("map_values")
+def map_values(series, values, default=_KEEP):
+    """Maps the values of a column with a dictionary, other values are kept or set to default."""
+    mapped = series.map(values)
+    other = series if default is _KEEP else default
+    return mapped.where(series.isin(list(values)), other)
+
+
+@register_transform("fill_missing")
+def fill_missing(series, value):
+    """Replaces the missing values of a column."""
+    return series.fillna(value)
+
+
+@register_transform("divide")
+def divide(series, by):
+    """Divides a numeric column by a constant."""
+    return series / by
+
+
+@register_transform("clip")
+def clip(series, lower=None, upper=None):
+    """Clips a numeric column to the given bounds."""
+    return series.clip(lower=lower, upper=upper)
+
+
+@register_transform("substring")
+def substring(series, start=None, stop=None):
+    """Slices each string of a column."""
+    return series.str.slice(start, stop)
+
+
+@register_transform("equals")
+def equals(series, value):
+    """Tests each value of a column for equality."""
+    return series == value
+
+
+@register_transform("isin")
+def isin(series, values):
+    """Tests the membership of each value of a column in a list."""
+    return series.isin(values)
+
+
+@register_transform("notna")
+def notna(series):
+    """Tests each value of a column for non missing values."""
+    return series.notna()
+
+
+@register_transform("contains_any")
+def contains_any(series, values):
+    """Tests if the string representation of each value of a column contains one of the substrings."""
+    text = series.astype(str)
+    return reduce(operator.or_, [text.str.contains(v, regex=False) for v in values])
+
+
+@register_reduction("concat")
+def concat(frame):
+    """Concatenates string columns, row by row."""
+    return reduce(operator.add, [frame[col] for col in frame.columns])
+
+
+@register_reduction("min")
+def row_min(frame):
+    """The minimum of the columns, row by row."""
+    return frame.min(axis=1)
+
+
+@register_reduction("max")
+def row_max(frame):
+    """The maximum of the columns, row by row."""
+    return frame.max(axis=1)
@@ -15,18 +15,34 @@ from py3cl.libs import (
     Chauffage,
     safe_divide,
     vectorized_safe_divide,
+    content_hash,
+    save_bundle,
+    AbaqueRegistry,
+    ClimateContext,
+    DepartmentResolver,
+    Pipeline,
+    Stage,
+    safe_divide_many,
+    safe_divide_rows,
+    segment_sum,
+    segment_total,
+    segment_mean,
 )
+from py3cl.libs.batch import column, contains, element_table, freeze, gather
 
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, get_args
 import os
+from itertools import product
 import numpy as np
+import pandas as pd
 import logging
 
 # Get the current working directory
 dir_path = os.path.dirname(os.path.realpath(__file__))
 configs_path = os.path.join(dir_path, "configs")
 data_path = os.path.join(dir_path, "data")
+bundle_path = os.path.join(data_path, "abaques.bundle")
 # configs_path = "../py3cl/configs/"
 
 abaques_configs = {
@@ -360,6 +376,34 @@ abaques_configs = {
 # Values: ['ges']
 
 
+def build_abaques(configs=abaques_configs):
+    """
+    Builds all the abaques from their configuration and data files.
+
+    Args:
+        configs (dict): A dictionary containing the paths to the configuration files of the abaques.
+
+    Returns:
+        dict: The Abaque objects, by name.
+    """
+    abaques = {}
+    for key, value in configs.items():
+        print(key)
+        abaques[key] = Abaque(value, name=key, data_path=data_path)
+    return abaques
+
+
+def build_abaques_bundle(configs=abaques_configs, path=bundle_path):
+    """
+    Builds all the abaques and writes them in a single bundle, loaded by DPE at startup.
+
+    Args:
+        configs (dict): A dictionary containing the paths to the configuration files of the abaques.
+        path (str): Path of the bundle file.
+    """
+    save_bundle(path, build_abaques(configs), content_hash(configs, data_path))
+
+
 class DPEInput(BaseModel):
     """
     This class represents the input for the DPE (Diagnostic de Performance Énergétique) model.
@@ -433,6 +477,42 @@ months_days = {
     "Décembre": 24,
 }
 
+# Fields of DPEInput holding the elements of the building (flattened by DPE.forward_batch)
+ELEMENT_FIELDS = ["parois", "vitrages", "ponts_thermiques"]
+# Kinds of installations, by the patterns of their identifiers
+INSTALLATION_KINDS = {
+    "ecs": ["ecs"],
+    "clim": ["clim"],
+    "chauffage": ["chauffage", "pac"],
+}
+# Labels of the dpe and ges abaques, from the best to the worst
+LABELS = ["A", "B", "C", "D", "E", "F", "G"]
+# Errors of the input values not found in the abaques or not valid
+LOOKUP_ERRORS = (ValueError, TypeError, KeyError)
+
+logger = logging.getLogger(__name__)
+
+
+def iter_elements(data):
+    """
+    Iterates over the elements of a building.
+
+    Args:
+        data (dict): The input parameters of the building, as a dict of DPEInput fields.
+
+    Yields:
+        tuple: (field, kind, identifier, element). The kind is the field for the parois, vitrages and
+            ponts_thermiques, and the kind of installation (see INSTALLATION_KINDS) for the installations.
+    """
+    for field in ELEMENT_FIELDS:
+        for id, element in (data[field] or {}).items():
+            yield field, field, id, element
+    for id, element in (data["installations"] or {}).items():
+        for kind, patterns in INSTALLATION_KINDS.items():
+            if any(pattern in id for pattern in patterns):
+                yield "installations", kind, id, element
+                break
+
 
 class DPE(BaseProcessor):
     """
@@ -440,7 +520,7 @@ class DPE(BaseProcessor):
 
     Attributes:
         configs (dict): A dictionary containing the paths to the configuration files for the DPE model.
-        abaques (dict): A dictionary containing the lookup tables for the DPE model.
+        abaques (AbaqueRegistry): A mapping of the lookup tables for the DPE model, loaded on first access.
         parois_processor (Paroi): A Paroi object to process the walls of the building.
         vitrage_processor (Vitrage): A Vitrage object to process the glazing of the building.
         pont_thermique_processor (PontThermique): A PontThermique object to process the thermal bridges of the building.
@@ -448,17 +528,23 @@ class DPE(BaseProcessor):
         clim_processor (Climatisation): A Climatisation object to process the air conditioning system of the building.
         chauffage_processor (Chauffage): A Chauffage object to process the heating system of the building.
         months (list): A list of months in French.
+        climate_contexts (dict): The ClimateContext objects built so far, by (zone_climatique, altitude band, inertie).
+        department_resolver (DepartmentResolver): The geographic data of the departments, by postal code.
+        pipeline (Pipeline): The stages of the computation, with the fields they read and write.
 
     """
 
-    def __init__(self, configs=abaques_configs):
+    def __init__(self, configs=abaques_configs, bundle_path=bundle_path):
         """
         Initializes a new DPE instance with the given configuration files.
 
         Args:
             configs (dict): A dictionary containing the paths to the configuration files for the DPE model.
+            bundle_path (str, optional): Path of the precompiled abaques bundle. Abaques are restored from it if it
+                matches the content of the configuration and data files, and built otherwise. None disables the bundle.
         """
         self.configs = configs
+        self.bundle_path = bundle_path
         self.load_abaques(self.configs)
         self.characteristics_corrections = {
             "usage": ["Conventionnel", "Dépensier"],
@@ -480,6 +566,9 @@ class DPE(BaseProcessor):
         self.chauffage_processor = Chauffage(self.abaques)
 
         self.months = list(months_days.keys())
+        self.climate_contexts = {}
+        self._department_resolver = None
+        self.define_pipeline()
 
     def define_categorical(self):
         self.categorical_fields = [
@@ -522,125 +611,1890 @@ class DPE(BaseProcessor):
             # },
         }
 
-    def forward(self, kwargs: DPEInput):
+    def define_pipeline(self):
+        """
+        Declares the stages of the DPE computation, with the fields each stage reads and writes. The stages run in
+        the order of their dependencies, the independent ones (e.g. ECS, cooling and lighting) can run concurrently.
+        """
+        self.pipeline = Pipeline(
+            [
+                Stage(
+                    "geographics",
+                    inputs=["usage", "postal_code", "altitude"],
+                    outputs=[
+                        "DH_chauffe",
+                        "DH_froids",
+                        "Nref_chauffe",
+                        "Nref_froids",
+                        "Textmoy_clim",
+                        "Tint_froids",
+                        "Tint_chauffe",
+                        "E_fr",
+                        "department",
+                        "coef_co2_elec_dpt",
+                        "zone_climatique",
+                        "zone_hiver",
+                        "t_ext_basse",
+                        "altitude",
+                    ],
+                    forward=self._calc_geographics,
+                    forward_batch=self._batch_geographics,
+                ),
+                Stage(
+                    "n_adeq",
+                    inputs=["surface_habitable", "nb_logements", "type_batiment"],
+                    outputs=["surface_habitable_moyenne", "Nmax", "Nadeq"],
+                    forward=self._calc_n_adeq,
+                    forward_batch=self._batch_n_adeq,
+                ),
+                Stage(
+                    "parois",
+                    inputs=[
+                        "parois",
+                        "annee_construction",
+                        "zone_hiver",
+                        "type_batiment",
+                    ],
+                    outputs=["parois"],
+                    forward=self._calc_parois,
+                    forward_batch=self._batch_parois,
+                    elements="parois",
+                ),
+                Stage(
+                    "vitrages",
+                    inputs=[
+                        "vitrages",
+                        "zone_climatique",
+                        "zone_hiver",
+                        "type_batiment",
+                    ],
+                    outputs=["vitrages"],
+                    forward=self._calc_vitrages,
+                    forward_batch=self._batch_vitrages,
+                    elements="vitrages",
+                ),
+                Stage(
+                    "ponts_thermiques",
+                    inputs=["ponts_thermiques"],
+                    outputs=["ponts_thermiques"],
+                    forward=self._calc_ponts_thermiques,
+                    forward_batch=self._batch_ponts_thermiques,
+                    elements="ponts_thermiques",
+                ),
+                Stage(
+                    "deperdition_flux_air",
+                    inputs=[
+                        "q4paconv",
+                        "type_batiment",
+                        "annee_construction",
+                        "surface_habitable",
+                        "hauteur_sous_plafond",
+                        "type_ventilation",
+                        "parois",
+                    ],
+                    outputs=[
+                        "nu_50",
+                        "nb_facade_exposee",
+                        "surface_parois_exposees",
+                        "q4paconv",
+                        "q4paenv",
+                        "q4pa",
+                        "Hvent",
+                        "Hperm",
+                    ],
+                    forward=self._calc_deperdition_flux_air,
+                    forward_batch=self._batch_deperdition_flux_air,
+                ),
+                Stage(
+                    "inertie",
+                    inputs=["parois"],
+                    outputs=["inertie_batiment", "coef_inertie", "inertie_globale"],
+                    forward=self._calc_inertie,
+                    forward_batch=self._batch_inertie,
+                ),
+                Stage(
+                    "geographics_bis",
+                    inputs=[
+                        "altitude",
+                        "zone_climatique",
+                        "inertie_globale",
+                        "DH_chauffe",
+                        "DH_froids",
+                        "Textmoy_clim",
+                        "Nref_chauffe",
+                        "Nref_froids",
+                        "E_fr",
+                    ],
+                    outputs=[
+                        "altitude_1",
+                        "Dh_chauffe_j",
+                        "Dh_froids_j",
+                        "Textmoy_clim_j",
+                        "Nref_chauffe_j",
+                        "Nref_froids_j",
+                        "DHj",
+                        "Nrefj",
+                        "E_chauffe_j",
+                        "Nhj",
+                        "E_froids_j",
+                        "Ej",
+                        "Textj",
+                    ],
+                    forward=self._calc_geographics_bis,
+                    forward_batch=self._batch_geographics_bis,
+                ),
+                Stage(
+                    "deperdition_enveloppe",
+                    inputs=[
+                        "parois",
+                        "vitrages",
+                        "ponts_thermiques",
+                        "Hvent",
+                        "Hperm",
+                    ],
+                    outputs=[
+                        "DP_mur",
+                        "DP_pb",
+                        "DP_ph",
+                        "DP_vitrage",
+                        "PT",
+                        "DR",
+                        "GV",
+                    ],
+                    forward=self._calc_deperdition_enveloppe,
+                    forward_batch=self._batch_deperdition_enveloppe,
+                ),
+                Stage(
+                    "apports_solaire",
+                    inputs=[
+                        "vitrages",
+                        "Ej",
+                        "surface_habitable",
+                        "Nadeq",
+                        "Nref_chauffe_j",
+                        "Nref_froids_j",
+                        "GV",
+                        "DHj",
+                        "coef_inertie",
+                    ],
+                    outputs=["ssej", "Asj", "Ai_chj", "Ai_frj", "Aij", "Xj", "Fj"],
+                    forward=self._calc_apports_solaire,
+                    forward_batch=self._batch_apports_solaire,
+                ),
+                Stage(
+                    "besoin_mensuel",
+                    inputs=["GV", "Fj"],
+                    outputs=["BVj"],
+                    forward=self._calc_besoin_mensuel,
+                    forward_batch=self._batch_besoin_mensuel,
+                ),
+                Stage(
+                    "consommation_ecs",
+                    inputs=[
+                        "zone_climatique",
+                        "altitude_1",
+                        "inertie_globale",
+                        "usage",
+                        "Nadeq",
+                        "type_batiment",
+                        "type_installation_fecs",
+                        "zone_hiver",
+                        "installations",
+                    ],
+                    outputs=[
+                        "Tefsj",
+                        "Nlmoy",
+                        "nj",
+                        "Becsj",
+                        "Becs",
+                        "fecs",
+                        "Iecs",
+                        "Qgw",
+                        "Cecs",
+                        "Cecs_primaire",
+                        "emission_ecs",
+                        "installations[ecs]",
+                    ],
+                    forward=self._calc_consommation_ecs,
+                    forward_batch=self._batch_consommation_ecs,
+                    elements="installations",
+                    element_patterns=INSTALLATION_KINDS["ecs"],
+                ),
+                Stage(
+                    "consommation_froids",
+                    inputs=[
+                        "Ai_frj",
+                        "Asj",
+                        "GV",
+                        "Textmoy_clim_j",
+                        "Tint_froids",
+                        "Nref_froids_j",
+                        "inertie_batiment",
+                        "surface_habitable",
+                        "zone_hiver",
+                        "installations",
+                    ],
+                    outputs=[
+                        "Cfr",
+                        "Cfr_primaire",
+                        "emission_fr",
+                        "installations[clim]",
+                    ],
+                    forward=self._calc_consommation_froids,
+                    forward_batch=self._batch_consommation_froids,
+                    elements="installations",
+                    element_patterns=INSTALLATION_KINDS["clim"],
+                ),
+                Stage(
+                    "consommation_eclairage",
+                    inputs=["Nhj", "surface_habitable"],
+                    outputs=[
+                        "Cecl_j",
+                        "Cecl",
+                        "coef_emission_ecl",
+                        "Cecl_primaire",
+                        "emission_ecl",
+                    ],
+                    forward=self._calc_consommation_eclairage,
+                    forward_batch=self._batch_consommation_eclairage,
+                ),
+                Stage(
+                    "besoin_chauffage",
+                    inputs=["BVj", "Dh_chauffe_j", "Nref_chauffe_j", "Qgw"],
+                    outputs=["Bch_hp_j", "Bch_j"],
+                    forward=self._calc_besoin_chauffage,
+                    forward_batch=self._batch_besoin_chauffage,
+                ),
+                Stage(
+                    "consommation_chauffage",
+                    inputs=[
+                        "surface_habitable",
+                        "hauteur_sous_plafond",
+                        "zone_hiver",
+                        "type_batiment",
+                        "inertie_globale",
+                        "GV",
+                        "Bch_j",
+                        "installations",
+                    ],
+                    outputs=[
+                        "Cch",
+                        "Cch_primaire",
+                        "emission_ch",
+                        "installations[chauffage]",
+                    ],
+                    forward=self._calc_consommation_chauffage,
+                    forward_batch=self._batch_consommation_chauffage,
+                    elements="installations",
+                    element_patterns=INSTALLATION_KINDS["chauffage"],
+                ),
+                Stage(
+                    "totals",
+                    inputs=[
+                        "Cch",
+                        "Cfr",
+                        "Cecl",
+                        "Cecs",
+                        "Cch_primaire",
+                        "Cfr_primaire",
+                        "Cecl_primaire",
+                        "Cecs_primaire",
+                        "emission_ch",
+                        "emission_fr",
+                        "emission_ecl",
+                        "emission_ecs",
+                        "surface_habitable",
+                    ],
+                    outputs=[
+                        "C_finale",
+                        "C_primaire",
+                        "emission_totale",
+                        "C_finale_m2",
+                        "C_primaire_m2",
+                        "emission_totale_m2",
+                    ],
+                    forward=self._calc_totals,
+                    forward_batch=self._batch_totals,
+                ),
+                Stage(
+                    "labels",
+                    inputs=["C_primaire_m2", "emission_totale_m2"],
+                    outputs=["dpe", "ges"],
+                    forward=self._calc_labels,
+                    forward_batch=self._batch_labels,
+                ),
+            ]
+        )
+
+    def forward(
+        self, kwargs: DPEInput, outputs=None, max_workers=None, keep_input=False
+    ):
         """
         Processes the DPE data using the input parameters to calculate various energy efficiency metrics.
 
+        The stages of the computation are run in the order of their dependencies, see define_pipeline.
+
         Args:
             kwargs (DPEInput): Input parameters for the DPE model.
+            outputs (list, optional): The requested metrics. Only the stages needed to compute them are run. None
+                computes all the metrics.
+            max_workers (int, optional): The number of threads running the independent stages concurrently. None
+                runs the stages one after the other.
+            keep_input (bool, optional): Whether to keep a copy of the input parameters under "input", as needed by
+                forward_delta and forward_variants.
 
         Returns:
             dict: A dictionary containing the calculated energy efficiency metrics.
         """
+        dpe = kwargs.dict()  # Convert Pydantic model to dictionary
+        dpe = self.pipeline.run(dpe, outputs=outputs, max_workers=max_workers)
+        if keep_input:
+            dpe["input"] = kwargs.model_copy(deep=True)
+        return dpe
 
-        ## Warning you who read this code, each function is used in a given order, changing this order will likelly break the code
+    def __call__(self, kwargs: DPEInput):
+        dpe = self.forward(kwargs)
 
-        dpe = kwargs.dict()  # Convert Pydantic model to dictionary
-        ## Compute the climatic zone and altitude
-        dpe = self._calc_geographics(dpe)
+    def forward_delta(self, previous, delta):
+        """
+        Recomputes the DPE of a building after a change of some of its input parameters (what-if analysis),
+        re-running only the stages affected by the change.
 
-        # Compute the number of inhabitants
-        dpe = self._calc_n_adeq(dpe)
+        The fields of delta replace the ones of the previous input, except for the elements (parois, vitrages,
+        ponts_thermiques and installations): delta gives the changed fields of each changed element, by
+        identifier, a new identifier adding an element and None removing it. Only the changed elements are
+        recomputed: e.g. changing a window recomputes this window, the losses of the envelope and the monthly
+        stages depending on them, but neither the geographic data, the walls nor the hot water. The stages whose
+        inputs are left unchanged by the re-run stages are not re-run either.
 
-        ## Compute the envelope
-        dpe = self._calc_enveloppe(dpe)
+        Args:
+            previous (dict): The result of forward (with keep_input=True) or forward_delta for the building, with
+                all the metrics.
+            delta (dict): The changes of the input parameters.
 
-        ## Calcul des deperditions par flux d'airs
-        dpe = self._calc_deperdition_flux_air(dpe)
+        Returns:
+            dict: The metrics for the changed input parameters, the same as the ones of forward, and the new input
+                parameters under "input". previous is left unchanged.
 
-        ## Calcul Inertie
-        dpe = self._calc_inertie(dpe)
+        Raises:
+            ValueError: If delta changes an unknown field, or if previous has no input parameters.
+        """
+        old = self._previous_input(previous).dict()
+        new_input = self._apply_delta(old, delta)
+        new = new_input.dict()
+        fields, elements = self._input_changes(old, new)
+
+        dpe = dict(previous)
+        for field in fields:
+            dpe[field] = new[field]
+        # The unchanged elements keep their computed values, the changed ones restart from their inputs
+        for field in ELEMENT_FIELDS + ["installations"]:
+            changed = elements.get(field, [])
+            dpe[field] = {
+                id: record if id in changed else previous[field][id]
+                for id, record in (new[field] or {}).items()
+            }
+
+        self.pipeline.update(
+            dpe,
+            fields + list(elements),
+            elements,
+            prepare=lambda stage, ids: self._reset_stage_inputs(dpe, new, stage, ids),
+            same=self._same_value,
+        )
+        dpe["input"] = new_input
+        return dpe
 
-        ## Get info based on inertie, altitude etc.
-        dpe = self._calc_geographics_bis(dpe)
+    def forward_scenarios(self, baseline, scenarios, max_workers=None):
+        """
+        Evaluates renovation scenarios of a building: variants of its input parameters, each described by a delta
+        as in forward_delta (e.g. insulating the walls, replacing windows, installing a heat pump).
 
-        ## Calcul deperdition enveloppe
-        dpe = self._calc_deperdition_enveloppe(dpe)
+        The baseline is computed once. The scenarios are then evaluated together by forward_variants, the elements
+        a scenario leaves unchanged reusing their baseline results.
 
-        ## Calcul apports solaires
-        dpe = self._calc_apports_solaire(dpe)
+        Args:
+            baseline (DPEInput): The input parameters of the building.
+            scenarios (dict): The deltas of the scenarios, by name. A list names the scenarios by their position.
+            max_workers (int, optional): The number of threads running the independent stages, as in forward.
 
-        ## Besoin de chauffage mois i
-        dpe["BVj"] = dpe["GV"] * (1 - dpe["Fj"])
+        Returns:
+            pd.DataFrame: One row per scenario, with its C_primaire_m2, emission_totale_m2, dpe and ges.
+
+        Raises:
+            ValueError: If a delta changes an unknown field.
+        """
+        if not isinstance(scenarios, dict):
+            scenarios = dict(enumerate(scenarios))
+        batch = self.forward_variants(
+            self.forward(baseline, keep_input=True),
+            list(scenarios.values()),
+            max_workers=max_workers,
+        )
+        return pd.DataFrame(
+            {
+                "C_primaire_m2": batch["C_primaire_m2"],
+                "emission_totale_m2": batch["emission_totale_m2"],
+                "dpe": batch["dpe"],
+                "ges": batch["ges"],
+            },
+            index=list(scenarios),
+        )
 
-        ## Consommation ECS
-        dpe = self._calc_consommation_ecs(dpe)
+    def forward_monte_carlo(
+        self,
+        kwargs: DPEInput,
+        distributions,
+        n_draws=1000,
+        percentiles=(5, 25, 50, 75, 95),
+        seed=None,
+        max_workers=None,
+    ):
+        """
+        Propagates the uncertainty of the missing input parameters of a building (None or "Unknown or Empty") to
+        its labels, by Monte Carlo sampling.
 
-        ## Consommation Froids
-        dpe = self._calc_consommation_froids(dpe)
+        The missing values are drawn from distributions, by field:
 
-        ## Calcul des besoins d'éclairage
-        dpe = self._calc_consommation_eclairage(dpe)
+            distributions = {
+                "q4paconv": lambda rng, n: rng.uniform(1.2, 3.0, n),
+                "parois": {"annee_isolation": {2000: 1, 2010: 2}, "epaisseur_isolant": [5, 10, 20]},
+                "vitrages": {"masque_lointain_hauteur_alpha": ["0 ≤ α < 15°", "15 ≤ α < 30°"]},
+            }
 
-        ## Caclcul consommation auxilliaires
+        The distributions of the fields made of elements (parois, vitrages, ponts_thermiques and installations)
+        are given by field of the elements, and drawn independently for each element missing the field. A
+        distribution is a list of equally likely values, a dict of values and their weights, or a function of a
+        numpy random generator and a number of draws returning the drawn values. All the draws are evaluated
+        together by forward_variants: the elements without missing values are computed once, and the elements
+        drawing the same values are computed once.
+
+        Args:
+            kwargs (DPEInput): The input parameters of the building.
+            distributions (dict): The distributions of the missing values.
+            n_draws (int): The number of draws.
+            percentiles (tuple): The percentiles of the consumption and emissions to compute.
+            seed (int, optional): The seed of the random generator.
+            max_workers (int, optional): The number of threads running the independent stages, as in forward.
+
+        Returns:
+            dict: The probabilities of the labels under "dpe" and "ges" (pd.Series indexed by label), the
+                percentiles of C_primaire_m2 and emission_totale_m2 under their names (pd.Series indexed by
+                percentile), and the drawn values and metrics of each draw under "draws" (pd.DataFrame, the
+                element fields being named "<field>.<identifier>.<name>").
+
+        Raises:
+            ValueError: If a distribution is given for an unknown field.
+        """
+        rng = np.random.default_rng(seed)
+        data = kwargs.dict()
+        draws = {}
+        deltas = [{} for _ in range(n_draws)]
+        for field, distribution in distributions.items():
+            if field not in DPEInput.model_fields:
+                raise ValueError(f"Unknown input field {field}")
+            if field not in ELEMENT_FIELDS and field != "installations":
+                if self._missing(data[field]):
+                    values = self._draw(distribution, rng, n_draws)
+                    draws[field] = values
+                    for delta, value in zip(deltas, values):
+                        delta[field] = value
+                continue
+            for id, element in (data[field] or {}).items():
+                for name, element_distribution in distribution.items():
+                    if not self._missing(element.get(name)):
+                        continue
+                    values = self._draw(element_distribution, rng, n_draws)
+                    draws[f"{field}.{id}.{name}"] = values
+                    for delta, value in zip(deltas, values):
+                        delta.setdefault(field, {}).setdefault(id, {})[name] = value
+
+        metrics = ["C_primaire_m2", "emission_totale_m2", "dpe", "ges"]
+        batch = self.forward_variants(
+            self.forward(kwargs, keep_input=True),
+            deltas,
+            outputs=metrics,
+            max_workers=max_workers,
+        )
+        draws = pd.DataFrame({**draws, **{metric: batch[metric] for metric in metrics}})
+        results = {
+            label: draws[label]
+            .value_counts(normalize=True)
+            .reindex(LABELS, fill_value=0.0)
+            for label in ["dpe", "ges"]
+        }
+        for metric in ["C_primaire_m2", "emission_totale_m2"]:
+            results[metric] = pd.Series(
+                np.percentile(draws[metric].to_numpy(dtype=float), percentiles),
+                index=list(percentiles),
+            )
+        results["draws"] = draws
+        return results
+
+    def forward_sensitivity(self, kwargs: DPEInput, step=0.01, max_workers=None):
+        """
+        Ranks the numerical input parameters of a building by their effect on its consumption.
+
+        Each numerical field (numerical_fields of the DPE model and of the processors of the elements) set for
+        the building or one of its elements is increased by step, relatively, or by 1 for the integer fields (e.g.
+        the years). All the perturbations are evaluated together by forward_variants. The elasticity of a metric is
+        its relative change divided by the relative change of the field.
+
+        Args:
+            kwargs (DPEInput): The input parameters of the building.
+            step (float): The relative perturbation of the fields.
+            max_workers (int, optional): The number of threads running the independent stages, as in forward.
+
+        Returns:
+            pd.DataFrame: One row per perturbed field, sorted by decreasing absolute elasticity of C_primaire_m2:
+                the "field" and "id" of the element (None for the fields of the building), the "name" of the
+                field, its "value" and "perturbed" value, the resulting metrics and their elasticities
+                ("elasticity_C_primaire_m2" and "elasticity_emission_totale_m2"). The fields whose perturbation
+                cannot be computed have NaN metrics, and the fields set to 0, which have no relative
+                perturbation, a NaN perturbed value and NaN metrics: they are listed last.
+        """
+        data = kwargs.dict()
+        processors = {
+            "parois": self.parois_processor,
+            "vitrages": self.vitrage_processor,
+            "ponts_thermiques": self.pont_thermique_processor,
+            "ecs": self.ecs_processor,
+            "clim": self.clim_processor,
+            "chauffage": self.chauffage_processor,
+        }
+        slots = [
+            (None, None, name, data[name], DPEInput) for name in self.numerical_fields
+        ]
+        for field, kind, id, element in iter_elements(data):
+            processor = processors[kind]
+            slots += [
+                (field, id, name, element.get(name), processor.input)
+                for name in processor.numerical_fields
+            ]
+
+        rows = []
+        deltas = []
+        zeros = []
+        for field, id, name, value, input_model in slots:
+            # Booleans are numbers
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            if value == 0:
+                # Zero has no relative perturbation
+                zeros.append({"field": field, "id": id, "name": name, "value": value})
+                continue
+            types = get_args(input_model.model_fields[name].annotation)
+            if int in types and float not in types:
+                # Integer fields, e.g. years
+                perturbed = value + 1
+            else:
+                perturbed = value * (1 + step)
+            rows.append(
+                {
+                    "field": field,
+                    "id": id,
+                    "name": name,
+                    "value": value,
+                    "perturbed": perturbed,
+                }
+            )
+            if field is None:
+                deltas.append({name: perturbed})
+            else:
+                deltas.append({field: {id: {name: perturbed}}})
+
+        previous = self.forward(kwargs, keep_input=True)
+        metrics = ["C_primaire_m2", "emission_totale_m2", "dpe", "ges"]
+        batch = self.forward_variants(
+            previous,
+            deltas,
+            outputs=metrics,
+            max_workers=max_workers,
+            flag_misses=True,
+        )
+        results = []
+        for k, delta in enumerate(deltas):
+            if batch["miss"][k]:
+                logger.warning(f"The perturbation {delta} cannot be computed")
+                results.append({m: np.nan for m in metrics})
+            else:
+                results.append({m: batch[m][k] for m in metrics})
+
+        table = pd.DataFrame(
+            [{**row, **result} for row, result in zip(rows, results)]
+            + [{**row, "perturbed": np.nan} for row in zeros],
+            columns=["field", "id", "name", "value", "perturbed"] + metrics,
+        )
+        change = (table["perturbed"] - table["value"]) / table["value"]
+        for metric in ["C_primaire_m2", "emission_totale_m2"]:
+            table[f"elasticity_{metric}"] = (
+                (table[metric] - previous[metric]) / previous[metric] / change
+            )
+        return table.sort_values(
+            "elasticity_C_primaire_m2",
+            key=np.abs,
+            ascending=False,
+            ignore_index=True,
+        )
+
+    @staticmethod
+    def _missing(value):
+        return value is None or value == "Unknown or Empty"
+
+    @staticmethod
+    def _draw(distribution, rng, n):
+        """
+        Draws values from a distribution of forward_monte_carlo.
+
+        Returns:
+            list: The n values, as python objects.
+        """
+        if callable(distribution):
+            return np.asarray(distribution(rng, n)).tolist()
+        values = list(distribution)
+        if isinstance(distribution, dict):
+            weights = np.array([distribution[v] for v in values], dtype=float)
+            picks = rng.choice(len(values), size=n, p=weights / weights.sum())
+        else:
+            picks = rng.integers(len(values), size=n)
+        return [values[i] for i in picks]
+
+    def forward_variants(
+        self, previous, deltas, outputs=None, max_workers=None, flag_misses=False
+    ):
+        """
+        Evaluates variants of a building together, with forward_batch. The elements a variant leaves unchanged
+        reuse their results in previous as long as the building-level values they depend on are unchanged, and
+        the changed elements go through the vectorized stages once per distinct input record. Only the changed
+        fields and elements are validated again.
+
+        With flag_misses, the variants that cannot be computed (invalid input values, or values not found in the
+        abaques) are flagged instead of raising: their float metrics are NaN, their labels None, and the "miss"
+        array of the results is True for them. The changed elements failing are computed one by one, and the
+        variants failing at the building level are found by bisection.
+
+        Args:
+            previous (dict): The result of forward (with keep_input=True) or forward_delta for the building, with
+                all the metrics.
+            deltas (list): The changes of the input parameters of the variants, as in forward_delta.
+            outputs (list, optional): The requested metrics, as in forward.
+            max_workers (int, optional): The number of threads running the independent stages, as in forward.
+            flag_misses (bool): Whether to flag the variants that cannot be computed.
+
+        Returns:
+            dict: The metrics of the variants, as returned by forward_batch, and their "miss" mask with
+                flag_misses.
+
+        Raises:
+            ValueError: If a delta changes an unknown field, or if previous has no input parameters.
+        """
+        batch = self._variant_batch(previous, deltas, flag_misses)
+        if not flag_misses:
+            return self.pipeline.run(
+                batch, outputs=outputs, batch=True, max_workers=max_workers
+            )
+
+        def run(deltas):
+            batch = self._variant_batch(previous, deltas, flag_misses=True)
+            return self.pipeline.run(
+                batch, outputs=outputs, batch=True, max_workers=max_workers
+            )
+
+        def failing(positions):
+            # The variants failing at the building level, by bisection
+            try:
+                run([deltas[k] for k in positions])
+                return []
+            except LOOKUP_ERRORS as e:
+                if len(positions) == 1:
+                    logger.debug(
+                        f"Error evaluating variant {deltas[positions[0]]}: {e}"
+                    )
+                    return positions
+            half = len(positions) // 2
+            return failing(positions[:half]) + failing(positions[half:])
+
+        try:
+            results = self.pipeline.run(
+                batch, outputs=outputs, batch=True, max_workers=max_workers
+            )
+        except LOOKUP_ERRORS:
+            failed = failing(list(range(len(deltas))))
+            # The failing variants are computed as the building itself, then masked
+            results = run(
+                [{} if k in failed else delta for k, delta in enumerate(deltas)]
+            )
+            results["_miss"][failed] = True
+        miss = results.pop("_miss")
+        if miss.any():
+            for name in self.pipeline.producers:
+                value = results.get(name)
+                if not isinstance(value, np.ndarray) or value.shape[:1] != miss.shape:
+                    continue
+                if value.dtype.kind == "f":
+                    mask = miss.reshape((-1,) + (1,) * (value.ndim - 1))
+                    results[name] = np.where(mask, np.nan, value)
+                elif value.dtype == object:
+                    results[name] = value.copy()
+                    results[name][miss] = None
+        results["miss"] = miss
+        return results
+
+    def _variant_batch(self, previous, deltas, flag_misses=False):
+        """
+        Builds the batch of variants of a building, as _batch_inputs does for their input parameters.
+
+        The fields of the building changed by a delta are validated with DPEInput, once per distinct change. The
+        element tables also give the results in previous of the elements, previous being their "baseline": their
+        "computed" list holds the results, and their "origin" column the position in it of the elements a variant
+        leaves unchanged (-1 for the others). See _batch_process.
+
+        Args:
+            previous (dict): The result of forward (with keep_input=True) or forward_delta for the building.
+            deltas (list): The changes of the input parameters of the variants, as in forward_delta.
+            flag_misses (bool): Whether to flag the variants with invalid fields in the "_miss" column of the batch
+                (computed as the building itself) instead of raising, as in forward_variants.
+
+        Returns:
+            dict: The batch.
+
+        Raises:
+            ValueError: If a delta changes an unknown field, or if previous has no input parameters.
+        """
+        old = self._previous_input(previous).dict()
+        n = len(deltas)
+        fields = [
+            field
+            for field in DPEInput.model_fields
+            if field not in ELEMENT_FIELDS and field != "installations"
+        ]
+        scalars = {field: old[field] for field in fields}
+        batch = {}
+        for field in fields:
+            batch[field] = np.empty(n, dtype=object)
+            batch[field][:] = [old[field]] * n
+
+        if flag_misses:
+            batch["_miss"] = np.zeros(n, dtype=bool)
+        validated = {}
+        for k, delta in enumerate(deltas):
+            for field in delta:
+                if field not in DPEInput.model_fields:
+                    raise ValueError(f"Unknown input field {field}")
+            values = {field: delta[field] for field in fields if field in delta}
+            if not values:
+                continue
+            try:
+                key = freeze(values)
+            except TypeError:
+                # Unhashable values, validated on their own
+                key = k
+            if key not in validated:
+                try:
+                    data = DPEInput(**{**scalars, **values}).dict()
+                    validated[key] = {field: data[field] for field in values}
+                except LOOKUP_ERRORS as e:
+                    if not flag_misses:
+                        raise
+                    logger.debug(f"Error validating variant {delta}: {e}")
+                    validated[key] = None
+            if validated[key] is None:
+                batch["_miss"][k] = True
+                continue
+            for field, value in validated[key].items():
+                batch[field][k] = value
+
+        def flatten(field, patterns=None):
+            before = {
+                id: record
+                for id, record in (old[field] or {}).items()
+                if patterns is None or any(pattern in id for pattern in patterns)
+            }
+            positions = {id: position for position, id in enumerate(before)}
+            unchanged = list(range(len(before)))
+            # The variants making the same change of an element share its record
+            merged = {}
+            ids, records, origin, sizes = [], [], [], []
+            for delta in deltas:
+                if not delta.get(field):
+                    ids += before
+                    records += before.values()
+                    origin += unchanged
+                    sizes.append(len(before))
+                    continue
+                elements = dict(before)
+                changed = set()
+                for id, change in delta[field].items():
+                    if patterns is not None and not any(p in id for p in patterns):
+                        continue
+                    changed.add(id)
+                    if change is None:
+                        elements.pop(id, None)
+                        continue
+                    try:
+                        key = (id, freeze(change))
+                    except TypeError:
+                        # Unhashable change, merged on its own
+                        key = object()
+                    if key not in merged:
+                        merged[key] = {**before.get(id, {}), **change}
+                    elements[id] = merged[key]
+                ids += elements
+                records += elements.values()
+                origin += [
+                    -1 if id in changed and before.get(id) != record else positions[id]
+                    for id, record in elements.items()
+                ]
+                sizes.append(len(elements))
+            return {
+                "building": np.repeat(np.arange(n, dtype=np.int64), sizes),
+                "ids": ids,
+                "records": records,
+                "origin": np.array(origin, dtype=np.int64),
+                "computed": [previous[field][id] for id in before],
+                "baseline": previous,
+            }
+
+        for field in ELEMENT_FIELDS:
+            batch[field] = flatten(field)
+        batch["installations"] = {
+            kind: flatten("installations", patterns)
+            for kind, patterns in INSTALLATION_KINDS.items()
+        }
+        return batch
+
+    def _previous_input(self, previous):
+        """
+        Gets the input parameters kept in a result of forward.
+
+        Args:
+            previous (dict): The result of forward (with keep_input=True) or forward_delta.
+
+        Returns:
+            DPEInput: The input parameters of previous.
+
+        Raises:
+            ValueError: If previous has no input parameters.
+        """
+        if "input" not in previous:
+            raise ValueError(
+                "previous has no input parameters, see forward(keep_input=True)"
+            )
+        return previous["input"]
+
+    def _input_changes(self, old, new):
+        """
+        Compares two sets of input parameters.
+
+        Args:
+            old (dict): The previous input parameters, as a dict of DPEInput fields.
+            new (dict): The new input parameters.
+
+        Returns:
+            tuple: (fields, elements). The changed fields not made of elements, and the identifiers of the changed
+                (added, modified or removed) elements, by field.
+        """
+        fields = [
+            field
+            for field in DPEInput.model_fields
+            if field not in ELEMENT_FIELDS
+            and field != "installations"
+            and new[field] != old[field]
+        ]
+        elements = {}
+        for field in ELEMENT_FIELDS + ["installations"]:
+            before, after = old[field] or {}, new[field] or {}
+            changed = [
+                id
+                for id in dict.fromkeys(list(before) + list(after))
+                if before.get(id) != after.get(id)
+            ]
+            if changed:
+                elements[field] = changed
+        return fields, elements
+
+    def _apply_delta(self, data, delta):
+        """
+        Applies a change of the input parameters, as described in forward_delta.
+
+        Args:
+            data (dict): The input parameters, as a dict of DPEInput fields. Left unchanged.
+            delta (dict): The changes of the input parameters.
+
+        Returns:
+            DPEInput: The changed input parameters.
+
+        Raises:
+            ValueError: If delta changes an unknown field.
+        """
+        data = dict(data)
+        for field, value in delta.items():
+            if field not in DPEInput.model_fields:
+                raise ValueError(f"Unknown input field {field}")
+            if field in ELEMENT_FIELDS or field == "installations":
+                elements = dict(data[field] or {})
+                for id, changes in value.items():
+                    if changes is None:
+                        elements.pop(id, None)
+                    else:
+                        elements[id] = {**elements.get(id, {}), **changes}
+                data[field] = elements
+            else:
+                data[field] = value
+        return DPEInput(**data)
+
+    @staticmethod
+    def _same_value(a, b):
+        """
+        Tests if two values of a metric are equal, in value and type. The elements are never considered equal.
+        """
+        if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+            return (
+                isinstance(a, np.ndarray)
+                and isinstance(b, np.ndarray)
+                and a.dtype == b.dtype
+                and np.array_equal(a, b)
+            )
+        if isinstance(a, dict) or isinstance(b, dict):
+            return False
+        return type(a) is type(b) and a == b
+
+    def _reset_stage_inputs(self, dpe, inputs, stage, ids):
+        """
+        Restores the inputs a stage completes in place (e.g. the altitude, the elements) before re-running it.
+
+        Args:
+            dpe (dict): The state of the computation.
+            inputs (dict): The input parameters of the building.
+            stage (Stage): The stage to re-run.
+            ids (list): The identifiers of the elements the stage re-computes, or None for all its elements.
+        """
+        for field in stage.inputs:
+            if field in stage.outputs and field != stage.elements:
+                dpe[field] = inputs[field]
+        if stage.elements is not None:
+            elements = inputs[stage.elements] or {}
+            for id in elements if ids is None else ids:
+                if id in elements and stage.processes(id):
+                    dpe[stage.elements][id] = elements[id]
+
+    def forward_batch(self, inputs, outputs=None, max_workers=None):
+        """
+        Processes the DPE data of many buildings at once, column-wise.
+
+        The building-level quantities are computed for all the buildings together, the monthly ones as
+        matrices with one row of 12 values per building. The elements of the buildings (parois, vitrages,
+        ponts thermiques, installations) are flattened in element tables, and their contributions are
+        reduced per building. The results are the same as the ones of forward, building by building.
+
+        Args:
+            inputs (list): The input parameters of the buildings, as DPEInput (or dicts of DPEInput fields).
+            outputs (list, optional): The requested metrics, as in forward.
+            max_workers (int, optional): The number of threads running the independent stages, as in forward.
+
+        Returns:
+            dict: The calculated metrics, by name as in forward: an array with one value per building, or a
+                matrix with one row of monthly values per building. The results of the elements are under
+                "parois", "vitrages", "ponts_thermiques" and "installations" ("ecs", "clim" and "chauffage"),
+                as element tables: dicts of columns, with the index of the building of each element in
+                their "building" column.
+        """
+        batch = self._batch_inputs(inputs)
+        return self.pipeline.run(
+            batch, outputs=outputs, batch=True, max_workers=max_workers
+        )
+
+    def _batch_inputs(self, inputs):
+        """
+        Converts the inputs of the buildings to the columns of a batch.
+
+        Args:
+            inputs (list): The input parameters of the buildings.
+
+        Returns:
+            dict: The batch, with one object column per input field, and the elements of the buildings as
+                element tables of input records ("records" column) and identifiers ("ids" column).
+        """
+        rows = [
+            (kwargs if isinstance(kwargs, DPEInput) else DPEInput(**kwargs)).dict()
+            for kwargs in inputs
+        ]
+        batch = {}
+        for field in DPEInput.model_fields:
+            if field in ELEMENT_FIELDS or field == "installations":
+                continue
+            batch[field] = np.empty(len(rows), dtype=object)
+            batch[field][:] = [row[field] for row in rows]
+
+        def flatten(elements):
+            ids, records, building = [], [], []
+            for i, items in enumerate(elements):
+                for key, record in items:
+                    ids.append(key)
+                    records.append(record)
+                    building.append(i)
+            return {
+                "building": np.array(building, dtype=np.int64),
+                "ids": ids,
+                "records": records,
+            }
+
+        for field in ELEMENT_FIELDS:
+            batch[field] = flatten(row[field].items() for row in rows)
+        batch["installations"] = {
+            kind: flatten(
+                [
+                    (key, installation)
+                    for key, installation in row["installations"].items()
+                    if any(pattern in key for pattern in patterns)
+                ]
+                for row in rows
+            )
+            for kind, patterns in INSTALLATION_KINDS.items()
+        }
+        return batch
+
+    def _batch_monthly(self, batch, names):
+        """
+        Gets monthly climate data of the buildings of a batch.
+
+        Args:
+            batch (dict): The batch, with the climate context of each building.
+            names (str or np.ndarray): The column of the climate contexts, or the column of each building.
+
+        Returns:
+            np.ndarray: The monthly values, one row per building.
+        """
+        contexts, group = batch["_climate_contexts"], batch["_climate_group"]
+        if isinstance(names, str):
+            return np.stack([context[names] for context in contexts])[group]
+        tables = {
+            name: np.stack([context[name] for context in contexts])
+            for name in dict.fromkeys(names)
+        }
+        out = np.empty(
+            (len(group), len(self.months)), dtype=np.result_type(*tables.values())
+        )
+        for name, table in tables.items():
+            mask = names == name
+            out[mask] = table[group[mask]]
+        return out
+
+    def _batch_process(self, batch, table, forward_batch, keys):
+        """
+        Runs the vectorized forward_batch of a processor on an element table.
+
+        In forward_variants, the table also gives the results of the elements for another state of their
+        buildings, the state being its "baseline" dict: in its "computed" list, at the positions of its "origin"
+        column (-1 for the elements without results). These elements reuse their results if the building-level
+        values used by the processor are the ones of the baseline. The other elements go through forward_batch
+        once per distinct input record and building-level values, and the rows of the element table are gathered
+        from both.
+
+        Args:
+            batch (dict): The batch.
+            table (dict): The element table of the input records.
+            forward_batch (callable): The vectorized function of the processor, called with the batch and an
+                element table of input records.
+            keys (list): The building-level columns used by the processor.
 
+        Returns:
+            dict: The element table of the processed elements.
+        """
+        origin = table.get("origin")
+        if origin is None:
+            return forward_batch(batch, table)
+
+        building = table["building"]
+        same, groups = self._baseline_groups(batch, keys, table["baseline"])
+        reuse = (origin >= 0) & same[building]
+        # The row of each element in the computed table (0) or in the table of the reused results (1)
+        row = np.where(reuse, origin, 0)
+        pending = np.flatnonzero(~reuse)
+        distinct, rows = {}, []
+        # The records of the unchanged elements are shared by the variants, and frozen once
+        frozen = {}
+        for i, group in zip(pending.tolist(), groups[building[pending]].tolist()):
+            record = table["records"][i]
+            try:
+                if id(record) not in frozen:
+                    frozen[id(record)] = freeze(record)
+                key = (frozen[id(record)], group)
+            except TypeError:
+                # Unhashable input, processed on its own
+                key = i
+            if key not in distinct:
+                distinct[key] = len(rows)
+                rows.append(i)
+            row[i] = distinct[key]
+
+        rows = np.array(rows, dtype=np.int64)
+        changed, failed = self._batch_changed(
+            batch,
+            {
+                "building": building[rows],
+                "ids": [table["ids"][i] for i in rows],
+                "records": [table["records"][i] for i in rows],
+            },
+            forward_batch,
+        )
+        keep = np.ones(len(building), dtype=bool)
+        if failed.any():
+            # The elements that cannot be computed are left out, and their variants flagged
+            keep = reuse | ~failed[np.where(reuse, 0, row)]
+            batch["_miss"][building[~keep]] = True
+            row = np.where(
+                reuse, row, (np.cumsum(~failed) - 1)[np.where(reuse, 0, row)]
+            )
+        computed = table["computed"]
+        baseline = element_table(computed, np.zeros(len(computed), dtype=np.int64))
+        return gather(
+            [changed, baseline],
+            reuse[keep].astype(np.int64),
+            row[keep],
+            building[keep],
+        )
+
+    @staticmethod
+    def _batch_changed(batch, table, forward_batch):
+        """
+        Runs forward_batch on the changed elements of forward_variants. If it fails and the variants are flagged
+        (the "_miss" column of the batch, see forward_variants), the elements are computed one by one, the ones
+        failing being left out.
+
+        Args:
+            batch (dict): The batch.
+            table (dict): The element table of the input records.
+            forward_batch (callable): The vectorized function of the processor.
+
+        Returns:
+            tuple: (table, failed). The element table of the computed elements, and the mask of the input records
+                that cannot be computed.
+        """
+        failed = np.zeros(len(table["records"]), dtype=bool)
+        try:
+            return forward_batch(batch, table), failed
+        except LOOKUP_ERRORS:
+            if "_miss" not in batch:
+                raise
+        parts = []
+        for i in range(len(failed)):
+            try:
+                parts.append(
+                    forward_batch(
+                        batch,
+                        {name: values[i : i + 1] for name, values in table.items()},
+                    )
+                )
+            except LOOKUP_ERRORS as e:
+                logger.debug(f"Error computing element {table['ids'][i]}: {e}")
+                failed[i] = True
+        index = np.arange(len(parts), dtype=np.int64)
+        return (
+            gather(
+                parts,
+                index,
+                np.zeros(len(parts), dtype=np.int64),
+                table["building"][~failed],
+            ),
+            failed,
+        )
+
+    @staticmethod
+    def _baseline_groups(batch, keys, baseline):
+        """
+        Groups the buildings of a batch by their values of some building-level columns, compared to the ones of
+        a baseline.
+
+        Args:
+            batch (dict): The batch.
+            keys (list): The names of the columns.
+            baseline (dict): The state of a single building.
+
+        Returns:
+            tuple: (same, groups). A boolean array, True for the buildings with the values of baseline, and the
+                group of each building, the same for the buildings with the same values.
+        """
+        same = np.ones(len(batch["postal_code"]), dtype=bool)
+        groups = np.zeros(len(same), dtype=np.int64)
+        for key in keys:
+            values = np.asarray(batch[key])
+            equal = np.asarray(values == baseline[key])
+            if equal.ndim > 1:
+                # Monthly values
+                equal = equal.reshape(len(equal), -1).all(axis=1)
+            equal = equal.astype(bool)
+            same &= equal
+            other = np.flatnonzero(~equal)
+            if not len(other):
+                continue
+            # The values of the baseline are coded 0, the others from 1
+            column = np.zeros(len(same), dtype=np.int64)
+            if values.dtype == object:
+                codes = {}
+                for i in other:
+                    try:
+                        column[i] = codes.setdefault(freeze(values[i]), len(codes) + 1)
+                    except TypeError:
+                        # Unhashable value, in a group of its own
+                        column[i] = len(same) + 1 + i
+            else:
+                rows = values[other].reshape(len(other), -1)
+                column[other] = (
+                    np.unique(rows, axis=0, return_inverse=True)[1].ravel() + 1
+                )
+            pairs = np.stack([groups, column], axis=1)
+            groups = np.unique(pairs, axis=0, return_inverse=True)[1].ravel()
+        return same, groups
+
+    def _batch_geographics(self, batch):
+        """
+        Batch equivalent of _calc_geographics.
+
+        Args:
+            batch (dict): The batch.
+        """
+        conventionnel = batch["usage"] == "Conventionnel"
+        for field, (conventional, other) in {
+            "DH_chauffe": ("DH19(°Ch)", "DH21(°Ch)"),
+            "DH_froids": ("DH28(°Ch)", "DH26(°Ch)"),
+            "Nref_chauffe": ("Nref(19°C)", "Nref(21°C)"),
+            "Nref_froids": ("Nref(28°C)", "Nref(26°C)"),
+            "Textmoy_clim": (
+                "Textmoy_clim(°C)Tcons=26°C",
+                "Textmoy_clim(°C)Tcons=28°C",
+            ),
+            "E_fr": ("E_fr(kWh/m²)Tcons=28°C", "E_fr(kWh/m²)Tcons=26°C"),
+        }.items():
+            batch[field] = np.where(conventionnel, conventional, other).astype(object)
+        batch["Tint_froids"] = np.where(conventionnel, 28, 26)
+        batch["Tint_chauffe"] = np.where(conventionnel, 19, 21)
+
+        records, miss = self.department_resolver.resolve_many(batch["postal_code"])
+        if miss.any():
+            # Raises the error of the scalar path
+            self.department_resolver.resolve(batch["postal_code"][miss][0])
+        for field in [
+            "department",
+            "coef_co2_elec_dpt",
+            "zone_climatique",
+            "zone_hiver",
+            "t_ext_basse",
+        ]:
+            batch[field] = records[field]
+
+        altitude = np.array(
+            [np.nan if a is None else a for a in batch["altitude"]], dtype=float
+        )
+        batch["altitude"] = np.where(np.isnan(altitude), records["altitude"], altitude)
+        return batch
+
+    def _batch_n_adeq(self, batch):
+        """
+        Batch equivalent of _calc_n_adeq.
+
+        Args:
+            batch (dict): The batch.
+        """
+        nb_logements = batch["nb_logements"].astype(np.int64)
+        batch["surface_habitable_moyenne"] = (
+            batch["surface_habitable"].astype(float) / nb_logements
+        )
+        maison = batch["type_batiment"] == "Maison individuelle"
+        t1 = np.where(maison, 30, 10)
+        t2 = np.where(maison, 70, 50)
+        c = np.where(maison, 0.025, 0.035)
+
+        surface = batch["surface_habitable_moyenne"]
+        batch["Nmax"] = np.select(
+            [surface < t1, surface < t2],
+            [1.0, 1.75 - 0.01875 * (t2 - surface)],
+            c * surface,
+        )
+        batch["Nadeq"] = np.where(
+            batch["Nmax"] < 1.75,
+            batch["Nmax"] * nb_logements,
+            nb_logements * (1.75 + 0.3 * (batch["Nmax"] - 1.75)),
+        )
+        return batch
+
+    def _batch_parois(self, batch):
+        """
+        Batch equivalent of _calc_parois, with the vectorized Paroi.forward_batch.
+
+        Args:
+            batch (dict): The batch.
+        """
+        batch["parois"] = self._batch_process(
+            batch,
+            batch["parois"],
+            self.parois_processor.forward_batch,
+            ["annee_construction", "zone_hiver", "type_batiment"],
+        )
+        return batch
+
+    def _batch_vitrages(self, batch):
+        """
+        Batch equivalent of _calc_vitrages, with the vectorized Vitrage.forward_batch.
+
+        Args:
+            batch (dict): The batch.
+        """
+        batch["vitrages"] = self._batch_process(
+            batch,
+            batch["vitrages"],
+            self.vitrage_processor.forward_batch,
+            ["zone_climatique", "zone_hiver", "type_batiment"],
+        )
+        return batch
+
+    def _batch_ponts_thermiques(self, batch):
+        """
+        Batch equivalent of _calc_ponts_thermiques, with the vectorized PontThermique.forward_batch.
+
+        As forward, the batch fails on the first bridge whose d_pont cannot be computed: it goes through
+        PontThermique.forward, which raises its error.
+
+        Args:
+            batch (dict): The batch.
+        """
+
+        def forward_batch(batch, ponts_thermiques):
+            table = self.pont_thermique_processor.forward_batch(batch, ponts_thermiques)
+            miss = table.pop("miss")
+            for i in np.flatnonzero(miss):
+                self.pont_thermique_processor.forward(
+                    batch, PontThermiqueInput(**ponts_thermiques["records"][i])
+                )
+            return table
+
+        batch["ponts_thermiques"] = self._batch_process(
+            batch, batch["ponts_thermiques"], forward_batch, []
+        )
+        return batch
+
+    def _batch_deperdition_flux_air(self, batch):
+        """
+        Batch equivalent of _calc_deperdition_flux_air.
+
+        Args:
+            batch (dict): The batch.
+        """
+        n = len(batch["postal_code"])
+        parois = batch["parois"]
+
+        unknown = np.array(
+            [q is None or q == "Unknown or Empty" for q in batch["q4paconv"]],
+            dtype=bool,
+        )
+        q4paconv = np.array(
+            [np.nan if u else q for q, u in zip(batch["q4paconv"], unknown)],
+            dtype=float,
+        )
+        if unknown.any():
+            (q4paconv[unknown],) = self._batch_lookup(
+                "permeabilite_batiment",
+                {
+                    "type_batiment": batch["type_batiment"][unknown],
+                    "annee_construction_max": batch["annee_construction"][unknown],
+                },
+                ["q4paconv"],
+            )
+
+        sh = batch["surface_habitable"].astype(float)
+        hsp = batch["hauteur_sous_plafond"].astype(float)
+
+        identifiant = column(parois, "identifiant", "")
+        mur = contains(identifiant, "mur")
+        nb_facade_exposee = np.bincount(parois["building"][mur], minlength=n)
+        e = np.where(nb_facade_exposee > 1, 0.07, 0.02)
+        f = np.where(nb_facade_exposee > 1, 15, 20)
+
+        qvarepconv, qvasoufconv, smeaconv = self._batch_lookup(
+            "renouvellement_air",
+            {"type_ventilation": batch["type_ventilation"]},
+            ["Qvarepconv", "Qvasoufconv", "Smeaconv"],
+        )
+
+        ## Somme des surfaces hors plancher bas
+        exposee = ~contains(identifiant, "plancher_bas")
+        sdep = segment_sum(
+            column(parois, "surface_paroi")[exposee], parois["building"][exposee], n
+        )
+
+        q4paenv = q4paconv * sh
+        q4pa = q4paenv + 0.45 * smeaconv * sh
+
+        nu_50_num = q4pa
+        nu_50_den = (4 / 50) ** (2 / 3) * sh * hsp
+        nu_50 = safe_divide_many(nu_50_num, nu_50_den)
+
+        Hperm_num = 0.34 * hsp * sh * nu_50 * e
+        Hperm_den = (
+            1 + (f / e) * safe_divide_many(qvasoufconv - qvarepconv, hsp * nu_50) ** 2
+        )
+
+        batch["nu_50"] = nu_50
+        batch["nb_facade_exposee"] = nb_facade_exposee
+        batch["surface_parois_exposees"] = sdep
+        batch["q4paconv"] = q4paconv
+        batch["q4paenv"] = q4paenv
+        batch["q4pa"] = q4pa
+
+        batch["Hvent"] = 0.34 * qvarepconv * sh
+        batch["Hperm"] = safe_divide_many(Hperm_num, Hperm_den)
+        return batch
+
+    def _batch_inertie(self, batch):
+        """
+        Batch equivalent of _calc_inertie.
+
+        Args:
+            batch (dict): The batch.
+        """
+        n = len(batch["postal_code"])
+        parois = batch["parois"]
+        building = parois["building"]
+        identifiant = column(parois, "identifiant", "")
+        surface = column(parois, "surface_paroi")
+        inertie = column(parois, "inertie", None)
+
+        def dominant(mask, default):
+            # The inertia of the largest paroi of each building, the first one on ties
+            out = np.full(n, default, dtype=object)
+            index = np.flatnonzero(mask)
+            index = index[np.lexsort((index, -surface[index], building[index]))]
+            buildings, first = np.unique(building[index], return_index=True)
+            out[buildings] = inertie[index[first]]
+            return out, np.isin(np.arange(n), buildings)
+
+        inerties_mur, has_mur = dominant(contains(identifiant, "mur"), None)
+        if not has_mur.all():
+            raise ValueError(f"Building {np.flatnonzero(~has_mur)[0]} has no mur")
+        inerties_mur = np.where(inerties_mur == "Léger", "Légère", "Lourde").astype(
+            object
+        )
+        inerties_plancher_bas, _ = dominant(
+            contains(identifiant, "plancher_bas"), "Léger"
+        )
+        inerties_plancher_haut, _ = dominant(
+            contains(identifiant, "plancher_haut"), "Léger"
+        )
+
+        (inertie_batiment,) = self._batch_lookup(
+            "inertie_batiment",
+            {
+                "inertie_plancher_bas": inerties_plancher_bas,
+                "inertie_plancher_haut": inerties_plancher_haut,
+                "inertie_mur": inerties_mur,
+            },
+            ["classe_inertie_batiment"],
+        )
+        batch["inertie_batiment"] = inertie_batiment
+        batch["coef_inertie"] = np.select(
+            [inertie_batiment == "Légère", inertie_batiment == "Moyenne"],
+            [2.5, 2.9],
+            3.6,
+        )
+        batch["inertie_globale"] = np.where(
+            np.isin(inertie_batiment, ["Légère", "Moyenne"]),
+            "Légère ou Moyenne",
+            "Lourde ou Très lourde",
+        ).astype(object)
+        return batch
+
+    def _batch_geographics_bis(self, batch):
+        """
+        Batch equivalent of _calc_geographics_bis.
+
+        Args:
+            batch (dict): The batch.
+        """
+        altitude = batch["altitude"]
+        batch["altitude_1"] = np.select(
+            [altitude < 400, altitude < 800], [400, 800], 8000
+        )
+
+        # The buildings sharing a climate context are grouped
+        groups = {}
+        batch["_climate_group"] = np.array(
+            [
+                groups.setdefault(key, len(groups))
+                for key in zip(
+                    batch["zone_climatique"],
+                    batch["altitude_1"].tolist(),
+                    batch["inertie_globale"],
+                )
+            ],
+            dtype=np.int64,
+        )
+        batch["_climate_contexts"] = [self.climate_context(*key) for key in groups]
+
+        batch["Dh_chauffe_j"] = self._batch_monthly(batch, batch["DH_chauffe"])
+        batch["Dh_froids_j"] = self._batch_monthly(batch, batch["DH_froids"])
+        batch["Textmoy_clim_j"] = self._batch_monthly(batch, batch["Textmoy_clim"])
+        batch["Nref_chauffe_j"] = self._batch_monthly(batch, batch["Nref_chauffe"])
+        batch["Nref_froids_j"] = self._batch_monthly(batch, batch["Nref_froids"])
+
+        batch["DHj"] = batch["Dh_chauffe_j"] + batch["Dh_froids_j"]
+        batch["Nrefj"] = batch["Nref_chauffe_j"] + batch["Nref_froids_j"]
+
+        batch["E_chauffe_j"] = self._batch_monthly(batch, "E(kWh/m²)")
+        batch["Nhj"] = self._batch_monthly(batch, "Nh")
+        batch["E_froids_j"] = self._batch_monthly(batch, batch["E_fr"])
+        batch["Ej"] = batch["E_chauffe_j"] + batch["E_froids_j"]
+
+        batch["Textj"] = self._batch_monthly(batch, "Text(°C)")
+        return batch
+
+    def _batch_deperdition_enveloppe(self, batch):
+        """
+        Batch equivalent of _calc_deperdition_enveloppe.
+
+        Args:
+            batch (dict): The batch.
+        """
+        n = len(batch["postal_code"])
+        parois = batch["parois"]
+        vitrages = batch["vitrages"]
+        ponts_thermiques = batch["ponts_thermiques"]
+
+        identifiant = column(parois, "identifiant", "")
+        deperdition = (
+            column(parois, "U") * column(parois, "surface_paroi") * column(parois, "b")
+        )
+        # The plancher haut are matched on "planche_haut", as in _calc_deperdition_enveloppe
+        for field, pattern in [
+            ("DP_mur", "mur"),
+            ("DP_pb", "plancher_bas"),
+            ("DP_ph", "planche_haut"),
+        ]:
+            mask = contains(identifiant, pattern)
+            batch[field] = segment_sum(deperdition[mask], parois["building"][mask], n)
+        batch["DP_vitrage"] = segment_sum(
+            column(vitrages, "U")
+            * column(vitrages, "surface_vitrage")
+            * column(vitrages, "b"),
+            vitrages["building"],
+            n,
+        )
+        batch["PT"] = segment_sum(
+            column(ponts_thermiques, "d_pont"), ponts_thermiques["building"], n
+        )
+        batch["DR"] = batch["Hvent"] + batch["Hperm"]
+        batch["GV"] = (
+            batch["DP_mur"]
+            + batch["DP_pb"]
+            + batch["DP_ph"]
+            + batch["DP_vitrage"]
+            + batch["PT"]
+            + batch["DR"]
+        )
+        return batch
+
+    def _batch_apports_solaire(self, batch):
+        """
+        Batch equivalent of _calc_apports_solaire.
+
+        Args:
+            batch (dict): The batch.
+        """
+        n = len(batch["postal_code"])
+        vitrages = batch["vitrages"]
+        if len(vitrages["building"]) == 0:
+            ssej = np.zeros((0, len(self.months)))
+        elif vitrages.get("ssej", np.empty(0, dtype=object)).dtype == object:
+            # Some vitrages (the doors) have no solar gains
+            raise KeyError("ssej")
+        else:
+            ssej = vitrages["ssej"]
+        batch["ssej"] = segment_sum(ssej, vitrages["building"], n)
+        batch["Asj"] = batch["ssej"] * batch["Ej"] * 1000  ## todo : add veranda
+
+        apports_internes = (
+            (3.18 + 0.34) * batch["surface_habitable"].astype(float)
+            + 90 * (132 / 168) * batch["Nadeq"]
+        )[:, None]
+        batch["Ai_chj"] = apports_internes * batch["Nref_chauffe_j"]
+        batch["Ai_frj"] = apports_internes * batch["Nref_froids_j"]
+        batch["Aij"] = batch["Ai_chj"] + batch["Ai_frj"]
+        batch["Xj"] = safe_divide_rows(
+            batch["Asj"] + batch["Aij"], batch["GV"][:, None] * batch["DHj"]
+        )
+        coef_inertie = batch["coef_inertie"][:, None]
+        batch["Fj"] = safe_divide_rows(
+            batch["Xj"] - batch["Xj"] ** coef_inertie,
+            1 - batch["Xj"] ** coef_inertie,
+        )
+        return batch
+
+    def _batch_besoin_mensuel(self, batch):
+        """
+        Batch equivalent of _calc_besoin_mensuel.
+
+        Args:
+            batch (dict): The batch.
+        """
+        batch["BVj"] = batch["GV"][:, None] * (1 - batch["Fj"])
+        return batch
+
+    def _batch_consommation_ecs(self, batch):
+        """
+        Batch equivalent of _calc_consommation_ecs, with the vectorized ECS.forward_batch.
+
+        Args:
+            batch (dict): The batch.
+        """
+        n = len(batch["postal_code"])
+        batch["Tefsj"] = self._batch_monthly(batch, "Tefs(°C)")
+        batch["Nlmoy"] = np.where(batch["usage"] == "Conventionnel", 56, 79)
+        batch["nj"] = np.tile(
+            np.array(list(map(lambda x: months_days[x], self.months))), (n, 1)
+        )
+        batch["Becsj"] = (
+            1.163
+            * batch["Nadeq"][:, None]
+            * batch["Nlmoy"][:, None]
+            * (40 - batch["Tefsj"])
+            * batch["nj"]
+        )
+        batch["Becs"] = batch["Becsj"].sum(axis=1)
+
+        solaire = np.array(
+            [
+                bool(t) and t != "Unknown or Empty"
+                for t in batch["type_installation_fecs"]
+            ],
+            dtype=bool,
+        )
+        batch["fecs"] = np.zeros(n)
+        if solaire.any():
+            (batch["fecs"][solaire],) = self._batch_lookup(
+                "fecs",
+                {
+                    "type_batiment": batch["type_batiment"][solaire],
+                    "type_installation": batch["type_installation_fecs"][solaire],
+                    "zone_climatique": batch["zone_climatique"][solaire],
+                },
+                ["fecs"],
+            )
+
+        table = self._batch_process(
+            batch,
+            batch["installations"]["ecs"],
+            self.ecs_processor.forward_batch,
+            ["Becs", "fecs", "zone_hiver"],
+        )
+        batch["installations"]["ecs"] = table
+        for field in ["Iecs", "Qgw", "Cecs", "Cecs_primaire", "emission_ecs"]:
+            batch[field] = segment_mean(column(table, field), table["building"], n)
+        return batch
+
+    def _batch_consommation_froids(self, batch):
+        """
+        Batch equivalent of _calc_consommation_froids, with the vectorized Climatisation.forward_batch.
+
+        Args:
+            batch (dict): The batch.
+        """
+        n = len(batch["postal_code"])
+        table = self._batch_process(
+            batch,
+            batch["installations"]["clim"],
+            self.clim_processor.forward_batch,
+            [
+                "Ai_frj",
+                "Asj",
+                "GV",
+                "Textmoy_clim_j",
+                "Tint_froids",
+                "Nref_froids_j",
+                "inertie_batiment",
+                "surface_habitable",
+                "zone_hiver",
+            ],
+        )
+        batch["installations"]["clim"] = table
+        for field in ["Cfr", "Cfr_primaire", "emission_fr"]:
+            batch[field], _ = segment_total(column(table, field), table["building"], n)
+        return batch
+
+    def _batch_consommation_eclairage(self, batch):
+        """
+        Batch equivalent of _calc_consommation_eclairage.
+
+        Args:
+            batch (dict): The batch.
+        """
+        Pecl = 1.4
+        surface = batch["surface_habitable"].astype(float)
+        batch["Cecl_j"] = Pecl * 0.9 * batch["Nhj"] * surface[:, None]
+        batch["Cecl"] = batch["Cecl_j"].sum(axis=1) / 1000
+        batch["coef_emission_ecl"] = np.full(len(batch["Cecl"]), 0.079)
+
+        batch["Cecl_primaire"] = batch["Cecl"] * 2.3
+        batch["emission_ecl"] = batch["Cecl"] * batch["coef_emission_ecl"]
+        return batch
+
+    def _batch_besoin_chauffage(self, batch):
+        """
+        Batch equivalent of _calc_besoin_chauffage.
+
+        Args:
+            batch (dict): The batch.
+        """
         # Auxiliaire de chauffage
-        Q_dw_col_vc_j = np.zeros(12)
-        Q_dw_ind_vc_j = np.zeros(12)
+        Q_dw_col_vc_j = np.zeros(batch["Nref_chauffe_j"].shape)
+        Q_dw_ind_vc_j = np.zeros(batch["Nref_chauffe_j"].shape)
 
-        ## Calcul consommation chauffage
-        dpe["Bch_hp_j"] = dpe["BVj"] * dpe["Dh_chauffe_j"] / 1000
-        ### Pertes recuperes
-        #### Distribution Ecs
+        batch["Bch_hp_j"] = batch["BVj"] * batch["Dh_chauffe_j"] / 1000
         Qrec_chauffe_j = (
-            0.48 * dpe["Nref_chauffe_j"] * (Q_dw_col_vc_j + Q_dw_ind_vc_j) / 8760
+            0.48 * batch["Nref_chauffe_j"] * (Q_dw_col_vc_j + Q_dw_ind_vc_j) / 8760
         )
-        #### Stockage Ecs
-        Qgw_rec_j = 0.48 * dpe["Nref_chauffe_j"] * dpe["Qgw"] / 8760
-        ### Generation Chauffage + Ecs
+        Qgw_rec_j = 0.48 * batch["Nref_chauffe_j"] * batch["Qgw"][:, None] / 8760
         Qgen_rec_j = 0  # ToDo
 
-        dpe["Bch_j"] = (
-            dpe["Bch_hp_j"] - (Qrec_chauffe_j + Qgw_rec_j + Qgen_rec_j) / 1000
+        batch["Bch_j"] = (
+            batch["Bch_hp_j"] - (Qrec_chauffe_j + Qgw_rec_j + Qgen_rec_j) / 1000
         )
+        return batch
 
-        dpe = self._calc_consommation_chauffage(dpe)
+    def _batch_consommation_chauffage(self, batch):
+        """
+        Batch equivalent of _calc_consommation_chauffage, with the vectorized Chauffage.forward_batch.
 
-        ## Emission primaire
-        dpe["C_finale"] = dpe["Cch"] + dpe["Cfr"] + dpe["Cecl"] + dpe["Cecs"]
-        dpe["C_primaire"] = (
-            dpe["Cch_primaire"]
-            + dpe["Cfr_primaire"]
-            + dpe["Cecl_primaire"]
-            + dpe["Cecs_primaire"]
+        Args:
+            batch (dict): The batch.
+        """
+        n = len(batch["postal_code"])
+        table = self._batch_process(
+            batch,
+            batch["installations"]["chauffage"],
+            self.chauffage_processor.forward_batch,
+            [
+                "surface_habitable",
+                "hauteur_sous_plafond",
+                "zone_hiver",
+                "type_batiment",
+                "inertie_globale",
+                "GV",
+                "Bch_j",
+            ],
         )
-        dpe["emission_totale"] = (
-            dpe["emission_ch"]
-            + dpe["emission_fr"]
-            + dpe["emission_ecl"]
-            + dpe["emission_ecs"]
+        batch["installations"]["chauffage"] = table
+        for field in ["Cch", "Cch_primaire", "emission_ch"]:
+            batch[field], _ = segment_total(column(table, field), table["building"], n)
+        return batch
+
+    def _batch_totals(self, batch):
+        """
+        Batch equivalent of _calc_totals.
+
+        Args:
+            batch (dict): The batch.
+        """
+        batch["C_finale"] = batch["Cch"] + batch["Cfr"] + batch["Cecl"] + batch["Cecs"]
+        batch["C_primaire"] = (
+            batch["Cch_primaire"]
+            + batch["Cfr_primaire"]
+            + batch["Cecl_primaire"]
+            + batch["Cecs_primaire"]
+        )
+        batch["emission_totale"] = (
+            batch["emission_ch"]
+            + batch["emission_fr"]
+            + batch["emission_ecl"]
+            + batch["emission_ecs"]
         )
 
-        ## Per square meter
-        dpe["C_finale_m2"] = safe_divide(dpe["C_finale"], dpe["surface_habitable"])
-        dpe["C_primaire_m2"] = safe_divide(dpe["C_primaire"], dpe["surface_habitable"])
-        dpe["emission_totale_m2"] = safe_divide(
-            dpe["emission_totale"], dpe["surface_habitable"]
+        surface = batch["surface_habitable"].astype(float)
+        batch["C_finale_m2"] = safe_divide_many(batch["C_finale"], surface)
+        batch["C_primaire_m2"] = safe_divide_many(batch["C_primaire"], surface)
+        batch["emission_totale_m2"] = safe_divide_many(
+            batch["emission_totale"], surface
         )
+        return batch
 
-        ## Compute DPE and GES
-        dpe["dpe"] = self.abaques["dpe"](
-            {"conso_per_square_meter": dpe["C_primaire_m2"]}, "dpe"
+    def _batch_labels(self, batch):
+        """
+        Batch equivalent of _calc_labels.
+
+        Args:
+            batch (dict): The batch.
+        """
+        (batch["dpe"],) = self._batch_lookup(
+            "dpe", {"conso_per_square_meter": batch["C_primaire_m2"]}, ["dpe"]
         )
-        dpe["ges"] = self.abaques["ges"](
-            {"conso_per_square_meter": dpe["emission_totale_m2"]}, "ges"
+        (batch["ges"],) = self._batch_lookup(
+            "ges", {"conso_per_square_meter": batch["emission_totale_m2"]}, ["ges"]
         )
-        return dpe
-
-    def __call__(self, kwargs: DPEInput):
-        dpe = self.forward(kwargs)
+        return batch
 
     def load_abaques(self, configs):
         """
-        Loads the lookup tables for the DPE model.
+        Sets up the lookup tables for the DPE model. They are loaded from the bundle, or built, on first access.
 
         Args:
             configs (dict): A dictionary containing the paths to the configuration files for the DPE model.
         """
-        self.abaques = {}
-        for key, value in configs.items():
-            print(key)
-            self.abaques[key] = Abaque(value, name=key, data_path=data_path)
+        self.abaques = AbaqueRegistry(configs, data_path, bundle_path=self.bundle_path)
+
+    def preload(self):
+        """
+        Loads all the lookup tables and builds the department records, all the climate contexts and the orientation
+        coefficients of the windows, for services that want them ready before the first request.
+
+        Returns:
+            list: The names of the lookup tables loaded by this call.
+        """
+        loaded = self.abaques.preload()
+        self.department_resolver
+        zone_info = self.abaques["zone_info"]
+        for key in product(
+            zone_info.key_characteristics["zone_climatique"],
+            zone_info.upper_thresholds["altitude"].tolist(),
+            zone_info.key_characteristics["inertie"],
+        ):
+            if key not in self.climate_contexts:
+                self.climate_contexts[key] = ClimateContext(
+                    self.abaques, *key, self.months
+                )
+        self.vitrage_processor.orientation_coefficients
+        return loaded
+
+    @property
+    def materialised_abaques(self):
+        """
+        list: The names of the lookup tables loaded so far.
+        """
+        return self.abaques.materialised()
+
+    def enable_cache(self, names=None, capacity=1024, policy="lru"):
+        """
+        Memoizes the lookups of the given lookup tables.
+
+        Args:
+            names (list, optional): The names of the lookup tables. None selects all of them.
+            capacity (int): The maximum number of memoized inputs per lookup table.
+            policy (str): The eviction policy, 'lru' or 'fifo'.
+        """
+        self.abaques.enable_cache(names, capacity=capacity, policy=policy)
+
+    def disable_cache(self, names=None):
+        """
+        Stops memoizing the lookups of the given lookup tables.
+
+        Args:
+            names (list, optional): The names of the lookup tables. None selects all of them.
+        """
+        self.abaques.disable_cache(names)
+
+    def cache_stats(self):
+        """
+        Returns:
+            dict: The hit, miss and eviction counters of the memoized lookup tables, by name.
+        """
+        return self.abaques.cache_stats()
 
     def get_input_scheme(self):
         # Implementation for returning the input scheme
@@ -650,16 +2504,18 @@ class DPE(BaseProcessor):
         # Implementation for returning valid inputs
         pass
 
-    def _calc_consommation_chauffage(self, dpe):
+    def _calc_consommation_chauffage(self, dpe, ids=None):
         """
         Compute the heating consumption of the building.
 
         Args:
             dpe (dict): Dictionary containing DPE related data.
+            ids (list, optional): The identifiers of the installations to compute. None computes all the heating
+                installations.
         """
         chauffages = []
         # total_power=0
-        for installation in dpe["installations"]:
+        for installation in self._element_ids(dpe["installations"], ids):
             if "chauffage" in installation or "pac" in installation:
                 chauffage_input = ChauffageInput(**dpe["installations"][installation])
                 dpe["installations"][installation] = self.chauffage_processor.forward(
@@ -691,16 +2547,18 @@ class DPE(BaseProcessor):
         )
         return dpe
 
-    def _calc_consommation_froids(self, dpe):
+    def _calc_consommation_froids(self, dpe, ids=None):
         """
         Compute the cold consumption of the building.
 
         Args:
             dpe (dict): Dictionary containing DPE related data.
+            ids (list, optional): The identifiers of the installations to compute. None computes all the cooling
+                installations.
         """
 
         n_clim = 0
-        for installation in dpe["installations"]:
+        for installation in self._element_ids(dpe["installations"], ids):
             if "clim" in installation:
                 clim_input = ClimatisationInput(**dpe["installations"][installation])
                 dpe["installations"][installation] = self.clim_processor.forward(
@@ -748,27 +2606,102 @@ class DPE(BaseProcessor):
         dpe["emission_ecl"] = dpe["Cecl"] * dpe["coef_emission_ecl"]
         return dpe
 
-    def _calc_consommation_ecs(self, dpe):
+    def _calc_besoin_mensuel(self, dpe):
         """
-        Compute the hot water consumption of the building.
+        Compute the monthly heat loss of the building, net of the gains.
 
         Args:
             dpe (dict): Dictionary containing DPE related data.
         """
-        dpe["Tefsj"] = np.array(
-            [
-                self.abaques["zone_info"](
-                    {
-                        "inertie": dpe["inertie_globale"],
-                        "altitude": dpe["altitude_1"],
-                        "month": elt,
-                        "zone_climatique": dpe["zone_climatique"],
-                    },
-                    "Tefs(°C)",
-                )
-                for elt in self.months
-            ]
+        ## Besoin de chauffage mois i
+        dpe["BVj"] = dpe["GV"] * (1 - dpe["Fj"])
+        return dpe
+
+    def _calc_besoin_chauffage(self, dpe):
+        """
+        Compute the heating needs of the building.
+
+        Args:
+            dpe (dict): Dictionary containing DPE related data.
+        """
+        ## Caclcul consommation auxilliaires
+
+        # Auxiliaire de chauffage
+        Q_dw_col_vc_j = np.zeros(12)
+        Q_dw_ind_vc_j = np.zeros(12)
+
+        ## Calcul consommation chauffage
+        dpe["Bch_hp_j"] = dpe["BVj"] * dpe["Dh_chauffe_j"] / 1000
+        ### Pertes recuperes
+        #### Distribution Ecs
+        Qrec_chauffe_j = (
+            0.48 * dpe["Nref_chauffe_j"] * (Q_dw_col_vc_j + Q_dw_ind_vc_j) / 8760
+        )
+        #### Stockage Ecs
+        Qgw_rec_j = 0.48 * dpe["Nref_chauffe_j"] * dpe["Qgw"] / 8760
+        ### Generation Chauffage + Ecs
+        Qgen_rec_j = 0  # ToDo
+
+        dpe["Bch_j"] = (
+            dpe["Bch_hp_j"] - (Qrec_chauffe_j + Qgw_rec_j + Qgen_rec_j) / 1000
+        )
+        return dpe
+
+    def _calc_totals(self, dpe):
+        """
+        Compute the total consumptions and emissions of the building.
+
+        Args:
+            dpe (dict): Dictionary containing DPE related data.
+        """
+        ## Emission primaire
+        dpe["C_finale"] = dpe["Cch"] + dpe["Cfr"] + dpe["Cecl"] + dpe["Cecs"]
+        dpe["C_primaire"] = (
+            dpe["Cch_primaire"]
+            + dpe["Cfr_primaire"]
+            + dpe["Cecl_primaire"]
+            + dpe["Cecs_primaire"]
+        )
+        dpe["emission_totale"] = (
+            dpe["emission_ch"]
+            + dpe["emission_fr"]
+            + dpe["emission_ecl"]
+            + dpe["emission_ecs"]
+        )
+
+        ## Per square meter
+        dpe["C_finale_m2"] = safe_divide(dpe["C_finale"], dpe["surface_habitable"])
+        dpe["C_primaire_m2"] = safe_divide(dpe["C_primaire"], dpe["surface_habitable"])
+        dpe["emission_totale_m2"] = safe_divide(
+            dpe["emission_totale"], dpe["surface_habitable"]
+        )
+        return dpe
+
+    def _calc_labels(self, dpe):
+        """
+        Compute the DPE and GES labels of the building.
+
+        Args:
+            dpe (dict): Dictionary containing DPE related data.
+        """
+        dpe["dpe"] = self.abaques["dpe"](
+            {"conso_per_square_meter": dpe["C_primaire_m2"]}, "dpe"
+        )
+        dpe["ges"] = self.abaques["ges"](
+            {"conso_per_square_meter": dpe["emission_totale_m2"]}, "ges"
         )
+        return dpe
+
+    def _calc_consommation_ecs(self, dpe, ids=None):
+        """
+        Compute the hot water consumption of the building.
+
+        Args:
+            dpe (dict): Dictionary containing DPE related data.
+            ids (list, optional): The identifiers of the installations to compute. None computes all the hot water
+                installations.
+        """
+        dpe["Tefsj"] = self._climate_context(dpe)["Tefs(°C)"].copy()
 
         if dpe["usage"] == "Conventionnel":
             dpe["Nlmoy"] = 56
@@ -797,7 +2730,7 @@ class DPE(BaseProcessor):
         else:
             dpe["fecs"] = 0
 
-        for installation in dpe["installations"]:
+        for installation in self._element_ids(dpe["installations"], ids):
             if "ecs" in installation:
                 ecs_input = EcsInput(**dpe["installations"][installation])
                 dpe["installations"][installation] = self.ecs_processor.forward(
@@ -1023,19 +2956,52 @@ class DPE(BaseProcessor):
         Args:
             dpe (dict): Dictionary containing DPE related data.
         """
-        for id, paroi in dpe["parois"].items():
-            paroi_input = ParoiInput(**paroi)
-            dpe["parois"][id] = self.parois_processor.forward(dpe, paroi_input)
+        dpe = self._calc_parois(dpe)
 
         ## Todo : add veranda
 
         ## Calcul de vitrages / ouvrants
-        for id, vitrage in dpe["vitrages"].items():
-            vitrage_input = VitrageInput(**vitrage)
+        dpe = self._calc_vitrages(dpe)
+
+        ## Calcul des deperditions par ponts thermiques
+        dpe = self._calc_ponts_thermiques(dpe)
+        return dpe
+
+    def _calc_parois(self, dpe, ids=None):
+        """
+        Compute the walls and floors of the building.
+
+        Args:
+            dpe (dict): Dictionary containing DPE related data.
+            ids (list, optional): The identifiers of the walls to compute. None computes all the walls.
+        """
+        for id in self._element_ids(dpe["parois"], ids):
+            paroi_input = ParoiInput(**dpe["parois"][id])
+            dpe["parois"][id] = self.parois_processor.forward(dpe, paroi_input)
+        return dpe
+
+    def _calc_vitrages(self, dpe, ids=None):
+        """
+        Compute the glazing of the building.
+
+        Args:
+            dpe (dict): Dictionary containing DPE related data.
+            ids (list, optional): The identifiers of the glazing to compute. None computes all the glazing.
+        """
+        for id in self._element_ids(dpe["vitrages"], ids):
+            vitrage_input = VitrageInput(**dpe["vitrages"][id])
             dpe["vitrages"][id] = self.vitrage_processor.forward(dpe, vitrage_input)
+        return dpe
 
+    def _calc_ponts_thermiques(self, dpe, ids=None):
+        """
+        Compute the thermal bridges of the building.
+
+        Args:
+            dpe (dict): Dictionary containing DPE related data.
+            ids (list, optional): The identifiers of the thermal bridges to compute. None computes all of them.
+        """
         # Todo
-        ## Calcul des deperditions par ponts thermiques
         ### Determination des ponts thermiques liés aux parois
         # auto_pths={}
         # for id, paroi in dpe['parois'].items():
@@ -1046,16 +3012,31 @@ class DPE(BaseProcessor):
         #                     new_pth_id=f'auto_{id}_{identifiant}'
         #                     auto_pths[new_pth_id] = {'identifiant': new_pth_id, 'longueur_pont': 1, 'type_liaison': 'Menuiserie / Mur', 'isolation_mur': paroi['isolation'], 'isolation_plancher_bas': None, 'type_pose': 'Nu extérieur', 'retour_isolation': 'Avec', 'largeur_dormant': 0.15}
 
-        ponts_thermiques = []
-        for id, pont_thermique in dpe["ponts_thermiques"].items():
+        for id in self._element_ids(dpe["ponts_thermiques"], ids):
 
-            pont_thermique_input = PontThermiqueInput(**pont_thermique)
+            pont_thermique_input = PontThermiqueInput(**dpe["ponts_thermiques"][id])
 
             dpe["ponts_thermiques"][id] = self.pont_thermique_processor.forward(
                 dpe, pont_thermique_input
             )
         return dpe
 
+    @staticmethod
+    def _element_ids(elements, ids):
+        """
+        The identifiers of the elements to compute.
+
+        Args:
+            elements (dict): The elements of the building.
+            ids (list): The requested identifiers, or None for all the elements.
+
+        Returns:
+            list: The requested identifiers of the elements of the building.
+        """
+        if ids is None:
+            return list(elements)
+        return [id for id in ids if id in elements]
+
     def _calc_geographics(self, dpe):
         """
         Compute the geographic data of the building.
@@ -1082,25 +3063,60 @@ class DPE(BaseProcessor):
             dpe["Tint_chauffe"] = 21
             dpe["E_fr"] = "E_fr(kWh/m²)Tcons=26°C"
 
-        dpe["department"] = int(dpe["postal_code"][:2])
-        dpe["coef_co2_elec_dpt"] = self.abaques["kwh_to_co2"](
-            {"departement": dpe["department"]}, "co2"
-        )
-        dpe["zone_climatique"] = self.abaques["department"](
-            {"id": dpe["department"]}, "zone_climatique"
-        )
-        if dpe["zone_climatique"][:2] == "H3":
-            dpe["zone_climatique"] = "H3"
-        dpe["zone_hiver"] = dpe["zone_climatique"][:2]
+        record = self.department_resolver.resolve(dpe["postal_code"])
+        dpe["department"] = record["department"]
+        dpe["coef_co2_elec_dpt"] = record["coef_co2_elec_dpt"]
+        dpe["zone_climatique"] = record["zone_climatique"]
+        dpe["zone_hiver"] = record["zone_hiver"]
+        dpe["t_ext_basse"] = record["t_ext_basse"]
 
         if dpe["altitude"] is None:
-            dpe["altitude"] = (
-                self.abaques["department"]({"id": dpe["department"]}, "altmin")
-                + self.abaques["department"]({"id": dpe["department"]}, "altmax")
-            ) / 2
+            dpe["altitude"] = record["altitude"]
 
         return dpe
 
+    @property
+    def department_resolver(self):
+        """
+        DepartmentResolver: The resolver of the postal codes, built on first use.
+        """
+        if self._department_resolver is None:
+            self._department_resolver = DepartmentResolver(self.abaques)
+        return self._department_resolver
+
+    def _climate_context(self, dpe):
+        """
+        Get the monthly climate data of the building, built once per combination.
+
+        Args:
+            dpe (dict): Dictionary containing DPE related data.
+
+        Returns:
+            ClimateContext: The climate context of the zone, altitude band and inertia of the building.
+        """
+        return self.climate_context(
+            dpe["zone_climatique"], dpe["altitude_1"], dpe["inertie_globale"]
+        )
+
+    def climate_context(self, zone_climatique, altitude, inertie):
+        """
+        Get the monthly climate data of a combination, built on first use.
+
+        Args:
+            zone_climatique (str): The climatic zone.
+            altitude (float): The altitude band (upper bound of the band).
+            inertie (str): The global inertia of the building.
+
+        Returns:
+            ClimateContext: The climate context of the combination.
+        """
+        key = (zone_climatique, altitude, inertie)
+        context = self.climate_contexts.get(key)
+        if context is None:
+            context = ClimateContext(self.abaques, *key, self.months)
+            self.climate_contexts[key] = context
+        return context
+
     def _calc_geographics_bis(self, dpe):
         """
         Compute the geographic data of the building.
@@ -1115,142 +3131,23 @@ class DPE(BaseProcessor):
         else:
             dpe["altitude_1"] = 8000
 
-        dpe["t_ext_basse"] = self.abaques["department"](
-            {"id": dpe["department"]}, "t_ext_basse"
-        )
-
-        dpe["Dh_chauffe_j"] = np.array(
-            [
-                self.abaques["zone_info"](
-                    {
-                        "inertie": dpe["inertie_globale"],
-                        "altitude": dpe["altitude_1"],
-                        "month": elt,
-                        "zone_climatique": dpe["zone_climatique"],
-                    },
-                    dpe["DH_chauffe"],
-                )
-                for elt in self.months
-            ]
-        )
-
-        dpe["Dh_froids_j"] = np.array(
-            [
-                self.abaques["zone_info"](
-                    {
-                        "inertie": dpe["inertie_globale"],
-                        "altitude": dpe["altitude_1"],
-                        "month": elt,
-                        "zone_climatique": dpe["zone_climatique"],
-                    },
-                    dpe["DH_froids"],
-                )
-                for elt in self.months
-            ]
-        )
-
-        dpe["Textmoy_clim_j"] = np.array(
-            [
-                self.abaques["zone_info"](
-                    {
-                        "inertie": dpe["inertie_globale"],
-                        "altitude": dpe["altitude_1"],
-                        "month": elt,
-                        "zone_climatique": dpe["zone_climatique"],
-                    },
-                    dpe["Textmoy_clim"],
-                )
-                for elt in self.months
-            ]
-        )
-
-        dpe["Nref_chauffe_j"] = np.array(
-            [
-                self.abaques["zone_info"](
-                    {
-                        "inertie": dpe["inertie_globale"],
-                        "altitude": dpe["altitude_1"],
-                        "month": elt,
-                        "zone_climatique": dpe["zone_climatique"],
-                    },
-                    dpe["Nref_chauffe"],
-                )
-                for elt in self.months
-            ]
-        )
-
-        dpe["Nref_froids_j"] = np.array(
-            [
-                self.abaques["zone_info"](
-                    {
-                        "inertie": dpe["inertie_globale"],
-                        "altitude": dpe["altitude_1"],
-                        "month": elt,
-                        "zone_climatique": dpe["zone_climatique"],
-                    },
-                    dpe["Nref_froids"],
-                )
-                for elt in self.months
-            ]
-        )
+        # The arrays of the context are read-only and shared: the results get their own copies
+        context = self._climate_context(dpe)
+        dpe["Dh_chauffe_j"] = context[dpe["DH_chauffe"]].copy()
+        dpe["Dh_froids_j"] = context[dpe["DH_froids"]].copy()
+        dpe["Textmoy_clim_j"] = context[dpe["Textmoy_clim"]].copy()
+        dpe["Nref_chauffe_j"] = context[dpe["Nref_chauffe"]].copy()
+        dpe["Nref_froids_j"] = context[dpe["Nref_froids"]].copy()
 
         dpe["DHj"] = dpe["Dh_chauffe_j"] + dpe["Dh_froids_j"]
         dpe["Nrefj"] = dpe["Nref_chauffe_j"] + dpe["Nref_froids_j"]
 
-        dpe["E_chauffe_j"] = np.array(
-            [
-                self.abaques["zone_info"](
-                    {
-                        "inertie": dpe["inertie_globale"],
-                        "altitude": dpe["altitude_1"],
-                        "month": elt,
-                        "zone_climatique": dpe["zone_climatique"],
-                    },
-                    "E(kWh/m²)",
-                )
-                for elt in self.months
-            ]
-        )
-
-        dpe["Nhj"] = np.array(
-            [
-                self.abaques["heure_eclairage"](
-                    {"month": elt, "zone_climatique": dpe["zone_climatique"]}, "Nh"
-                )
-                for elt in self.months
-            ]
-        )
-
-        dpe["E_froids_j"] = np.array(
-            [
-                self.abaques["zone_info"](
-                    {
-                        "inertie": dpe["inertie_globale"],
-                        "altitude": dpe["altitude_1"],
-                        "month": elt,
-                        "zone_climatique": dpe["zone_climatique"],
-                    },
-                    dpe["E_fr"],
-                )
-                for elt in self.months
-            ]
-        )
+        dpe["E_chauffe_j"] = context["E(kWh/m²)"].copy()
+        dpe["Nhj"] = context["Nh"].copy()
+        dpe["E_froids_j"] = context[dpe["E_fr"]].copy()
         dpe["Ej"] = dpe["E_chauffe_j"] + dpe["E_froids_j"]
 
-        dpe["Textj"] = np.array(
-            [
-                self.abaques["zone_info"](
-                    {
-                        "inertie": dpe["inertie_globale"],
-                        "altitude": dpe["altitude_1"],
-                        "month": elt,
-                        "zone_climatique": dpe["zone_climatique"],
-                    },
-                    "Text(°C)",
-                )
-                for elt in self.months
-            ]
-        )
+        dpe["Textj"] = context["Text(°C)"].copy()
         return dpe
 
     def _calc_deperdition_flux_air(self, dpe):
@@ -1288,15 +3185,13 @@ class DPE(BaseProcessor):
             e, f = 0.02, 20
 
         type_ventilation = dpe["type_ventilation"]
-        qvarepconv = self.abaques["renouvellement_air"](
-            {"type_ventilation": type_ventilation}, "Qvarepconv"
-        )
-        qvasoufconv = self.abaques["renouvellement_air"](
-            {"type_ventilation": type_ventilation}, "Qvasoufconv"
-        )
-        smeaconv = self.abaques["renouvellement_air"](
-            {"type_ventilation": type_ventilation}, "Smeaconv"
+        renouvellement_air = self.abaques["renouvellement_air"].fetch(
+            {"type_ventilation": type_ventilation},
+            ["Qvarepconv", "Qvasoufconv", "Smeaconv"],
         )
+        qvarepconv = renouvellement_air["Qvarepconv"]
+        qvasoufconv = renouvellement_air["Qvasoufconv"]
+        smeaconv = renouvellement_air["Smeaconv"]
 
         ## Somme des surfaces hors plancher bas
         sdep = sum(
@@ -0,0 +1,351 @@
+from py3cl.py3CL import DPE, DPEInput, LABELS, iter_elements
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Metric ranking the partial solutions of each label
+LABEL_METRICS = {"dpe": "C_primaire_m2", "ges": "emission_totale_m2"}
+METRICS = ["C_primaire_m2", "emission_totale_m2", "dpe", "ges"]
+
+
+class LabelSolver:
+    """
+    Searches the cheapest changes of the elements of a building reaching a target label.
+
+    The candidate changes set a field of an element (a wall, a window, a thermal bridge or an installation) to
+    another value. Their values come from the key characteristics of the processor of the element, and their
+    costs from a cost table:
+
+        costs = {
+            "parois": {"isolation": {True: lambda paroi, value: 120 * paroi["surface_paroi_opaque"]}},
+            "vitrages": {"type_vitrage": {"Triple Vitrage": 900, "Double Vitrage": 600}},
+            "chauffage": {"type_generateur": 9000},
+        }
+
+    The cost table is keyed by kind of element (the fields of DPEInput holding elements, and the kinds of
+    installations "ecs", "clim" and "chauffage"), then by field. The costs of a field are given by value, or
+    as a single cost for all the values of a categorical field. A cost is a number, or a function of the
+    element and the new value. The changes leading to a combination of categorical values not found in the
+    abaques (valid_cat_combinations of the processor), or to keys not found in an abaque the element was
+    found in (e.g. a material of wall without a value for its thickness), are discarded.
+
+    The search is a beam search: the sets of changes are grown one change at a time, the most promising ones
+    being kept at each depth, and the sets costing more than the best solution found are pruned (branch and
+    bound). The sets of a depth are evaluated together with DPE.forward_variants, the ones that cannot be
+    computed being left out.
+
+    Attributes:
+        dpe (DPE): The DPE model.
+        costs (dict): The cost table.
+        beam_width (int): The number of sets of changes kept at each depth.
+        max_changes (int): The maximum number of changes of a solution.
+    """
+
+    def __init__(self, dpe: DPE, costs, beam_width=20, max_changes=4):
+        """
+        Args:
+            dpe (DPE): The DPE model.
+            costs (dict): The cost table.
+            beam_width (int): The number of sets of changes kept at each depth.
+            max_changes (int): The maximum number of changes of a solution.
+
+        Raises:
+            ValueError: If the cost table holds an unknown kind of element.
+        """
+        self.dpe = dpe
+        self.costs = costs
+        self.beam_width = beam_width
+        self.max_changes = max_changes
+        self.processors = {
+            "parois": dpe.parois_processor,
+            "vitrages": dpe.vitrage_processor,
+            "ponts_thermiques": dpe.pont_thermique_processor,
+            "ecs": dpe.ecs_processor,
+            "clim": dpe.clim_processor,
+            "chauffage": dpe.chauffage_processor,
+        }
+        for kind in costs:
+            if kind not in self.processors:
+                raise ValueError(f"Unknown kind of element {kind}")
+        self._characteristics = {}
+
+    def characteristics(self, kind):
+        """
+        The key characteristics and the valid combinations of categorical values of a kind of element, computed
+        once.
+
+        Args:
+            kind (str): The kind of element.
+
+        Returns:
+            tuple: (key_characteristics, groups). groups is a list of (keys, combinations) pairs, the
+            combinations being a set of tuples of the string values of the keys.
+        """
+        if kind not in self._characteristics:
+            processor = self.processors[kind]
+            groups = []
+            for group in processor.valid_cat_combinations.values():
+                keys = group["keys"]
+                combinations = {
+                    tuple(self._category(c.get(key)) for key in keys)
+                    for c in group["combinations"]
+                }
+                groups.append((keys, combinations))
+            self._characteristics[kind] = (processor.key_characteristics, groups)
+        return self._characteristics[kind]
+
+    def candidates(self, kwargs: DPEInput):
+        """
+        Lists the candidate changes of the elements of a building.
+
+        Args:
+            kwargs (DPEInput): The input parameters of the building.
+
+        Returns:
+            list: The changes, as dicts with the "field" and "id" of the element, the "name" of the changed field,
+            its new "value" and the "cost" of the change.
+
+        Raises:
+            ValueError: If the cost table gives an unknown value, or a single cost for a numerical field.
+        """
+        changes, edits = [], []
+        data = kwargs.dict()
+        for field, kind, id, element in iter_elements(data):
+            if kind not in self.costs:
+                continue
+            characteristics, groups = self.characteristics(kind)
+            for name, costs in self.costs[kind].items():
+                for value, cost in self._values(kind, name, costs, characteristics):
+                    if self._category(element.get(name)) == self._category(value):
+                        continue
+                    changed = {**element, name: value}
+                    if not self._valid(element, changed, name, groups):
+                        continue
+                    if callable(cost):
+                        cost = cost(element, value)
+                    changes.append(
+                        {
+                            "field": field,
+                            "id": id,
+                            "name": name,
+                            "value": value,
+                            "cost": cost,
+                        }
+                    )
+                    edits.append((kind, name, element, changed))
+        keep = self._resolved(edits)
+        return [change for change, kept in zip(changes, keep) if kept]
+
+    def solve(self, kwargs: DPEInput, target, label="dpe"):
+        """
+        Searches the cheapest changes reaching a target label.
+
+        Args:
+            kwargs (DPEInput): The input parameters of the building.
+            target (str): The target label, e.g. "C". Better labels also reach the target.
+            label (str): The label to reach, "dpe" or "ges".
+
+        Returns:
+            dict: The solution, or None if no set of changes reaching the target was found: its "changes" (as
+            returned by candidates), their total "cost", the "delta" of the input parameters (see
+            DPE.forward_delta) and the resulting C_primaire_m2, emission_totale_m2, dpe and ges.
+
+        Raises:
+            ValueError: If the label or the target is unknown.
+        """
+        if label not in LABEL_METRICS:
+            raise ValueError(f"Unknown label {label}")
+        if target not in LABELS:
+            raise ValueError(f"Unknown target label {target}")
+        metric = LABEL_METRICS[label]
+        rank = LABELS.index(target)
+
+        previous = self.dpe.forward(kwargs, keep_input=True)
+        if LABELS.index(previous[label]) <= rank:
+            return self._solution([], 0, {m: previous[m] for m in METRICS})
+
+        changes = self.candidates(kwargs)
+        best = None
+        frontier = [()]
+        seen = set()
+        failed = set()
+        for _ in range(self.max_changes):
+            children = []
+            for state in frontier:
+                slots = {self._slot(changes[i]) for i in state}
+                for j, change in enumerate(changes):
+                    if j in failed or self._slot(change) in slots:
+                        continue
+                    child = tuple(sorted(state + (j,)))
+                    if child in seen:
+                        continue
+                    seen.add(child)
+                    cost = sum(changes[i]["cost"] for i in child)
+                    # Bound: a set costing more than the best solution cannot improve it
+                    if best is not None and cost >= best["cost"]:
+                        continue
+                    children.append((cost, child))
+            if not children:
+                break
+
+            sets = [[changes[i] for i in child] for _, child in children]
+            results = self._evaluate(previous, sets)
+            scored = []
+            for (cost, child), result in zip(children, results):
+                if result is None:
+                    if len(child) == 1:
+                        # The change cannot be computed, it is not combined with others
+                        failed.add(child[0])
+                    continue
+                if LABELS.index(result[label]) <= rank:
+                    if best is None or cost < best["cost"]:
+                        best = self._solution([changes[i] for i in child], cost, result)
+                else:
+                    scored.append((result[metric], cost, child))
+            scored.sort()
+            frontier = [
+                child
+                for _, cost, child in scored[: self.beam_width]
+                if best is None or cost < best["cost"]
+            ]
+            if not frontier:
+                break
+        return best
+
+    def _evaluate(self, previous, sets):
+        """
+        Computes the metrics of sets of changes, all together with DPE.forward_variants.
+
+        Returns:
+            list: The metrics of each set, as dicts, or None for the sets that cannot be computed.
+        """
+        deltas = [self._delta(changes) for changes in sets]
+        batch = self.dpe.forward_variants(
+            previous, deltas, outputs=METRICS, flag_misses=True
+        )
+        results = []
+        for k, delta in enumerate(deltas):
+            if batch["miss"][k]:
+                logger.debug(f"Changes {delta} cannot be computed")
+                results.append(None)
+            else:
+                results.append({metric: batch[metric][k] for metric in METRICS})
+        return results
+
+    def _solution(self, changes, cost, metrics):
+        return {
+            "changes": changes,
+            "cost": cost,
+            "delta": self._delta(changes),
+            **metrics,
+        }
+
+    @staticmethod
+    def _delta(changes):
+        """The delta of the input parameters applying changes, as in DPE.forward_delta."""
+        delta = {}
+        for change in changes:
+            element = delta.setdefault(change["field"], {}).setdefault(change["id"], {})
+            element[change["name"]] = change["value"]
+        return delta
+
+    @staticmethod
+    def _slot(change):
+        # Two changes of the same field of the same element are exclusive
+        return change["field"], change["id"], change["name"]
+
+    def _values(self, kind, name, costs, characteristics):
+        """
+        The candidate values of a field and their costs.
+
+        Raises:
+            ValueError: If a value is not a key characteristic of the field, or the field is numerical and its
+                costs are not given by value.
+        """
+        known = characteristics.get(name)
+        if known is None:
+            raise ValueError(f"Unknown field {name} for {kind}")
+        categories = None if isinstance(known, (dict, str)) else list(known)
+        if not isinstance(costs, dict):
+            if categories is None:
+                raise ValueError(
+                    f"The costs of the numerical field {name} of {kind} must be given by value"
+                )
+            return [
+                (self._value(category), costs)
+                for category in categories
+                if category != "Unknown or Empty"
+            ]
+        for value in costs:
+            if categories is not None and self._category(value) not in categories:
+                raise ValueError(f"Unknown value {value} of the field {name} of {kind}")
+            if isinstance(known, dict) and not known["min"] <= value <= known["max"]:
+                raise ValueError(
+                    f"Value {value} out of the range of the field {name} of {kind}"
+                )
+        return list(costs.items())
+
+    def _valid(self, element, changed, name, groups):
+        """Tests if a change keeps the valid combinations of categorical values of an element valid."""
+        for keys, combinations in groups:
+            if name not in keys:
+                continue
+            before = tuple(self._category(element.get(key)) for key in keys)
+            after = tuple(self._category(changed.get(key)) for key in keys)
+            if before in combinations and after not in combinations:
+                return False
+        return True
+
+    def _resolved(self, edits):
+        """
+        Tests if changes keep the elements found in the abaques looked up with their fields only. A change is
+        discarded if the keys of an abaque were resolved (with the numeric intervals and fallback of the
+        abaque) before the change and are not after it. The abaques with a key left empty by the change are not
+        tested, the element possibly not using them.
+
+        Args:
+            edits (list): The (kind, name, element, changed) tuples of the changes: the kind of element, the
+                changed field, and the element before and after the change.
+
+        Returns:
+            np.ndarray: The mask of the changes kept.
+        """
+        keep = np.ones(len(edits), dtype=bool)
+        for kind in dict.fromkeys(edit[0] for edit in edits):
+            processor = self.processors[kind]
+            fields = processor.input.model_fields
+            for abaque, keys in processor.used_abaques.items():
+                if not all(field in fields for field in keys):
+                    continue
+                tested = [
+                    k
+                    for k, (other, name, _, changed) in enumerate(edits)
+                    if other == kind
+                    and name in keys
+                    and all(changed.get(field) is not None for field in keys)
+                ]
+                if not tested:
+                    continue
+                resolved = []
+                for position in (2, 3):
+                    columns = {}
+                    for field, key in keys.items():
+                        columns[key] = np.empty(len(tested), dtype=object)
+                        columns[key][:] = [
+                            edits[k][position].get(field) for k in tested
+                        ]
+                    resolved.append(
+                        processor.abaques[abaque].resolve_rows(columns) >= 0
+                    )
+                keep[np.array(tested)[resolved[0] & ~resolved[1]]] = False
+        return keep
+
+    @staticmethod
+    def _category(value):
+        # The categorical values of the abaques are compared as strings
+        return "Unknown or Empty" if value is None else str(value)
+
+    @staticmethod
+    def _value(category):
+        return {"True": True, "False": False}.get(category, category)
@@ -0,0 +1,83 @@
+"""
+The processed abaques are saved in a versioned bundle, invalidated by any change of their sources.
+"""
+
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from py3cl import Abaque, abaques_configs, content_hash, load_bundle, save_bundle
+from py3cl.py3CL import data_path
+
+NAMES = ["dpe", "umur0", "ug_vitrage"]
+CONFIGS = {name: abaques_configs[name] for name in NAMES}
+
+
+@pytest.fixture(scope="module")
+def abaques():
+    return {
+        name: Abaque(config, name=name, data_path=data_path)
+        for name, config in CONFIGS.items()
+    }
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "abaques.bundle")
+
+
+def test_bundle_round_trip(abaques, path):
+    digest = content_hash(CONFIGS, data_path)
+    save_bundle(path, abaques, digest)
+
+    bundle = load_bundle(path, digest)
+    assert all(name in bundle for name in NAMES)
+    restored = bundle.load("umur0")
+    assert "umur0" not in bundle
+    columns = {
+        "umur0_materiaux": np.array(
+            ["Murs en briques pleines simples", "Murs en béton banché", "unknown"],
+            dtype=object,
+        ),
+        "epaisseur": np.array([40.0, 22.0, 20.0]),
+    }
+    expected = abaques["umur0"].lookup_many(columns, "umur")
+    values, miss = restored.lookup_many(columns, "umur")
+    np.testing.assert_array_equal(values, expected[0])
+    assert miss.tolist() == expected[1].tolist() == [False, False, True]
+    # The numeric arrays are read-only views of the memory-mapped file
+    arrays = [a for a in restored.compiled["arrays"].values() if a.dtype.kind == "f"]
+    assert arrays and not any(array.flags.writeable for array in arrays)
+
+
+def test_bundle_is_invalidated_by_another_hash(abaques, path):
+    save_bundle(path, abaques, content_hash(CONFIGS, data_path))
+
+    assert load_bundle(path, "another hash") is None
+    assert load_bundle(path + ".missing", content_hash(CONFIGS, data_path)) is None
+    with open(path, "r+b") as f:
+        f.write(b"CORRUPT!")
+    assert load_bundle(path, content_hash(CONFIGS, data_path)) is None
+
+
+def test_content_hash_follows_the_sources(tmp_path):
+    configs = {}
+    for name, config in CONFIGS.items():
+        configs[name] = str(tmp_path / os.path.basename(config))
+        shutil.copy(config, configs[name])
+    digest = content_hash(configs, data_path)
+
+    assert digest == content_hash(CONFIGS, data_path)
+    assert digest != content_hash({"dpe": configs["dpe"]}, data_path)
+    with open(configs["dpe"], "a") as f:
+        f.write("\n# changed\n")
+    assert digest != content_hash(configs, data_path)
+
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "table.csv").write_text("a,b\n1,2\n")
+    first = content_hash(CONFIGS, str(data))
+    (data / "table.csv").write_text("a,b\n1,3\n")
+    assert first != content_hash(CONFIGS, str(data))
@@ -0,0 +1,79 @@
+"""
+The memo caches of the abaques are bounded, with an LRU or FIFO eviction.
+"""
+
+import pytest
+
+from py3cl import AbaqueRegistry, LookupCache, abaques_configs
+from py3cl.py3CL import data_path
+
+
+def fill(cache):
+    for key in "abc":
+        cache.put(key, ord(key))
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = LookupCache(capacity=3, policy="lru")
+    fill(cache)
+
+    assert cache.get("a") == ord("a")
+    cache.put("d", ord("d"))
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == [ord(key) for key in "acd"]
+    assert cache.stats() == {
+        "capacity": 3,
+        "policy": "lru",
+        "size": 3,
+        "hits": 4,
+        "misses": 1,
+        "evictions": 1,
+        "hit_rate": 0.8,
+    }
+
+
+def test_fifo_evicts_the_oldest_entry():
+    cache = LookupCache(capacity=3, policy="fifo")
+    fill(cache)
+
+    assert cache.get("a") == ord("a")
+    cache.put("d", ord("d"))
+    assert cache.get("a") is None
+    assert cache.get("b") == ord("b")
+    # Updating an entry neither evicts nor moves it
+    cache.put("b", 0)
+    cache.put("e", ord("e"))
+    assert cache.get("b") is None and len(cache) == 3
+    assert cache.stats()["evictions"] == 2
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        LookupCache(capacity=0)
+    with pytest.raises(ValueError):
+        LookupCache(policy="random")
+
+
+def test_abaque_lookups_go_through_the_cache():
+    abaques = AbaqueRegistry({"dpe": abaques_configs["dpe"]}, data_path)
+    abaques.enable_cache(capacity=2, policy="lru")
+    dpe = abaques["dpe"]
+
+    labels = [dpe({"conso_per_square_meter": value}, "dpe") for value in [40, 40, 500]]
+    assert labels[0] == labels[1] != labels[2]
+    dpe({"conso_per_square_meter": 120}, "dpe")
+    assert abaques.cache_stats()["dpe"] == {
+        "capacity": 2,
+        "policy": "lru",
+        "size": 2,
+        "hits": 1,
+        "misses": 3,
+        "evictions": 1,
+        "hit_rate": 0.25,
+    }
+    abaques.disable_cache()
+    assert abaques.cache_stats() == {}
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from py3cl import DPE, DPEInput
+
+from tests.test_parity import BASE
+
+MONTHLY = [
+    "Dh_chauffe_j",
+    "Dh_froids_j",
+    "Textmoy_clim_j",
+    "Nref_chauffe_j",
+    "Nref_froids_j",
+    "E_chauffe_j",
+    "Nhj",
+    "E_froids_j",
+    "Textj",
+    "Tefsj",
+]
+
+
+@pytest.fixture(scope="module")
+def dpe():
+    return DPE()
+
+
+def test_climate_context_is_shared_and_read_only(dpe):
+    first = dpe.forward(DPEInput(**BASE))
+    second = dpe.forward(DPEInput(**BASE))
+
+    assert len(dpe.climate_contexts) == 1
+    (context,) = dpe.climate_contexts.values()
+    assert not context["Nh"].flags.writeable
+    with pytest.raises(ValueError):
+        context["Nh"][0] = 0
+    for name in MONTHLY:
+        np.testing.assert_array_equal(first[name], second[name])
+
+
+def test_forward_returns_writable_monthly_arrays(dpe):
+    first = dpe.forward(DPEInput(**BASE))
+    second = dpe.forward(DPEInput(**BASE))
+
+    for name in MONTHLY:
+        assert first[name].flags.writeable, name
+        assert not np.shares_memory(first[name], second[name]), name
+        first[name][0] = -1
+    expected = dpe.forward(DPEInput(**BASE))
+    for name in MONTHLY:
+        np.testing.assert_array_equal(second[name], expected[name], err_msg=name)
@@ -0,0 +1,53 @@
+"""
+The postal codes are resolved to the geographic data of their department.
+"""
+
+import pytest
+
+from py3cl import DPE, DPEInput
+from py3cl.libs import department_code
+
+from tests.test_parity import building
+
+
+@pytest.fixture(scope="module")
+def dpe():
+    return DPE()
+
+
+@pytest.mark.parametrize(
+    "postal_code, code",
+    [
+        ("20000", "2A"),
+        ("20167", "2A"),
+        ("20190", "2A"),
+        ("20200", "2B"),
+        ("20600", "2B"),
+        (" 2a004", "2A"),
+        ("75011", "75"),
+        ("01000", "01"),
+        ("97400", "97"),
+    ],
+)
+def test_department_code(postal_code, code):
+    assert department_code(postal_code) == code
+
+
+def test_corsican_departments_are_resolved(dpe):
+    south = dpe.department_resolver.resolve("20000")
+    north = dpe.department_resolver.resolve("20200")
+
+    assert (south["code"], north["code"]) == ("2A", "2B")
+    columns, miss = dpe.department_resolver.resolve_many(["20000", "20200"])
+    assert columns["code"].tolist() == ["2A", "2B"]
+    assert not miss.any()
+
+
+def test_overseas_postal_codes_are_rejected(dpe):
+    with pytest.raises(ValueError):
+        dpe.department_resolver.resolve("97400")
+    columns, miss = dpe.department_resolver.resolve_many(["97400", "75011"])
+    assert miss.tolist() == [True, False]
+    assert columns["code"][0] is None
+    with pytest.raises(ValueError):
+        dpe.forward(DPEInput(**building(postal_code="97400")))
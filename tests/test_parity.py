@@ -0,0 +1,221 @@
+"""
+The vectorized and incremental paths of DPE must give exactly the same results as forward.
+"""
+
+import copy
+
+import numpy as np
+import pytest
+
+from py3cl import DPE, DPEInput
+
+MUR = {
+    "identifiant": "mur1",
+    "identifiant_adjacents": ["plancher_bas1", "plancher_haut1", "vitrage1"],
+    "surface_paroi": 90,
+    "hauteur": 9,
+    "largeur": 10,
+    "inertie": "Lourd",
+    "materiaux": "Murs en briques pleines simples",
+    "epaisseur": 40,
+    "isolation": True,
+    "annee_isolation": 2015,
+    "r_isolant": 0.6,
+    "effet_joule": True,
+    "enduit": False,
+    "doublage_with_lame_below_15mm": False,
+    "doublage_with_lame_above_15mm": False,
+    "exterior_type_or_local_non_chauffe": "Extérieur",
+}
+
+PLANCHER_BAS = {
+    "identifiant": "plancher_bas1",
+    "identifiant_adjacents": [],
+    "surface_paroi": 40,
+    "inertie": "Léger",
+    "materiaux": "Plancher avec ou sans remplissage",
+    "epaisseur": 20,
+    "isolation": True,
+    "annee_isolation": 2015,
+    "epaisseur_isolant": 10,
+    "effet_joule": False,
+    "is_vide_sanitaire": False,
+    "is_unheated_underground": True,
+    "is_terre_plain": False,
+    "surface_immeuble": 40,
+    "perimeter_immeuble": 28,
+    "exterior_type_or_local_non_chauffe": "Cellier",
+    "surface_paroi_contact": 4,
+    "surface_paroi_local_non_chauffe": 20,
+    "local_non_chauffe_isole": False,
+}
+
+PLANCHER_HAUT = {
+    "identifiant": "plancher_haut1",
+    "identifiant_adjacents": [],
+    "surface_paroi": 40,
+    "inertie": "Léger",
+    "materiaux": "Plafond avec ou sans remplissage",
+    "isolation": True,
+    "annee_isolation": 2015,
+    "epaisseur_isolant": 20,
+    "effet_joule": True,
+    "exterior_type_or_local_non_chauffe": "Extérieur",
+}
+
+VITRAGE = {
+    "identifiant": "vitrage1",
+    "surface_vitrage": 10,
+    "hauteur_vitrage": 2,
+    "largeur_vitrage": 5,
+    "type_vitrage": "Double Vitrage",
+    "orientation": "Sud",
+    "inclinaison": ">=75°",
+    "remplissage": "Air Sec",
+    "isolation": True,
+    "traitement_vitrage": "Non Traités",
+    "epaisseur_lame": 10,
+    "type_pose": "Nu Extérieur",
+    "type_materiaux": "Bois ou bois/métal",
+    "type_menuiserie": "Portes-fenêtres battantes avec soubassement",
+    "type_baie": "Portes-fenêtres battantes  avec soubassement",
+    "masque_proche_type_masque": "Absence de masque proche",
+    "masque_lointain_hauteur_alpha": "60 <=… < 90",
+    "masque_lointain_orientation": "Sud",
+    "exterior_type_or_local_non_chauffe": "Extérieur",
+}
+
+ECS = {
+    "identifiant": "ecs1",
+    "type_energie": "Electricité d'origine non renouvelable",
+    "type_generateur": "Electrique",
+    "type_generateur_distribution": "Electrique classique",
+    "type_installation": "Individuelle",
+    "production_en_volume_habitable": True,
+    "pieces_alimentees_contigues": True,
+    "type_stockage": "Chauffe-eau vertical",
+    "category_stockage": "Other",
+    "volume_ballon": 700,
+}
+
+CHAUFFAGE = {
+    "identifiant": "chauffage1",
+    "surface_chauffee": 120,
+    "type_energie": "Electricité d'origine non renouvelable",
+    "type_installation": "Chauffage Individuel",
+    "type_generateur": "Générateur à effet joule direct",
+    "annee_installation": 2010,
+    "type_emetteur": "Radiateur électrique NFC",
+    "type_distribution": "Pas de réseau de distribution",
+    "isolation_distribution": False,
+    "type_regulation": "Radiateur électrique NFC",
+    "equipement_intermittence": "Absent",
+    "comptage_individuel": None,
+    "type_regulation_intermittence": "Sans régulation pièce par pièce",
+    "type_chauffage": "Central",
+}
+
+PAC = dict(
+    CHAUFFAGE,
+    identifiant="pac1",
+    surface_chauffee=20,
+    type_generateur="Réseau de chaleur",
+    annee_installation=2018,
+    type_pac="PAC Eau/Eau",
+)
+
+CLIM = {
+    "identifiant": "clim1",
+    "type_energie": "Electricité d'origine non renouvelable",
+    "annee_installation": 1910,
+    "surface_refroidie": 50,
+}
+
+BASE = {
+    "postal_code": "75015",
+    "type_batiment": "Maison individuelle",
+    "usage": "Conventionnel",
+    "annee_construction": 1970,
+    "altitude": 20,
+    "surface_habitable": 120,
+    "nb_logements": 1,
+    "hauteur_sous_plafond": 2.8,
+    "type_ventilation": "Ventilation naturelle par conduit",
+    "parois": {
+        element["identifiant"]: element
+        for element in [MUR, PLANCHER_BAS, PLANCHER_HAUT]
+    },
+    "vitrages": {"vitrage1": VITRAGE},
+    "ponts_thermiques": {},
+    "installations": {"ecs1": ECS, "chauffage1": CHAUFFAGE},
+}
+
+
+def building(**changes):
+    """Returns the input parameters of the base building, with the given fields replaced."""
+    data = copy.deepcopy(BASE)
+    data.update(copy.deepcopy(changes))
+    return data
+
+
+SAMPLES = {
+    "base": building(),
+    "pac": building(installations={"ecs1": ECS, "chauffage1": CHAUFFAGE, "pac1": PAC}),
+    "clim": building(
+        installations={"ecs1": ECS, "chauffage1": CHAUFFAGE, "clim1": CLIM}
+    ),
+    "corse": building(postal_code="20200", altitude=None),
+}
+
+DELTAS = {
+    "vitrage": {"vitrages": {"vitrage1": {"type_vitrage": "Triple Vitrage"}}},
+    "isolation": {"parois": {"mur1": {"isolation": False}}},
+    "clim": {"installations": {"clim1": CLIM}},
+    "corse": {"postal_code": "2A004"},
+    "surface": {"surface_habitable": 95.0},
+}
+
+
+@pytest.fixture(scope="module")
+def dpe():
+    return DPE()
+
+
+def assert_same(expected, actual, path="dpe"):
+    """Asserts that two results are exactly equal, NaN being equal to NaN."""
+    if isinstance(expected, dict):
+        assert isinstance(actual, dict), path
+        assert expected.keys() == actual.keys(), path
+        for key in expected:
+            assert_same(expected[key], actual[key], f"{path}[{key!r}]")
+    elif isinstance(expected, (np.ndarray, list, tuple)) or isinstance(
+        actual, np.ndarray
+    ):
+        np.testing.assert_array_equal(expected, actual, err_msg=path)
+    elif isinstance(expected, float) and expected != expected:
+        assert actual != actual, path
+    else:
+        assert expected == actual, path
+
+
+def test_forward_batch_matches_forward(dpe):
+    expected = [dpe.forward(DPEInput(**data)) for data in SAMPLES.values()]
+    batch = dpe.forward_batch([DPEInput(**data) for data in SAMPLES.values()])
+
+    assert {"C_primaire_m2", "emission_totale_m2", "dpe", "ges"} <= batch.keys()
+    for i, (name, result) in enumerate(zip(SAMPLES, expected)):
+        for key, value in result.items():
+            if key in batch and not isinstance(value, dict):
+                assert_same(value, batch[key][i], f"{name}[{key!r}]")
+
+
+@pytest.mark.parametrize("name", list(DELTAS))
+def test_forward_delta_matches_forward(dpe, name):
+    previous = dpe.forward(DPEInput(**BASE), keep_input=True)
+    before = copy.deepcopy({k: v for k, v in previous.items() if k != "input"})
+
+    result = dpe.forward_delta(previous, DELTAS[name])
+    expected = dpe.forward(result["input"], keep_input=True)
+
+    assert_same(expected, result)
+    assert_same(before, {k: v for k, v in previous.items() if k != "input"})
@@ -0,0 +1,119 @@
+"""
+The stages of a pipeline are run, and re-run after a change, following the DAG of their fields.
+"""
+
+import pytest
+
+from py3cl import Pipeline, Stage
+
+
+def half(state):
+    state["y"] = state["x"] // 2
+
+
+def double(state):
+    state["z"] = state["y"] * 2
+
+
+def scale(state, ids=None):
+    for id in state["items"] if ids is None else ids:
+        state["items"][id] = state["items"][id] * state["y"]
+
+
+def total(state):
+    state["total"] = state["z"] + sum(state["items"].values())
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def pipeline(calls):
+    def traced(name, function):
+        def forward(state, **kwargs):
+            calls.append((name, kwargs.get("ids")))
+            function(state, **kwargs)
+
+        return forward
+
+    return Pipeline(
+        [
+            Stage("half", ["x"], ["y"], traced("half", half)),
+            Stage(
+                "scale",
+                ["items", "y"],
+                ["items"],
+                traced("scale", scale),
+                elements="items",
+                element_patterns=["w"],
+            ),
+            Stage("double", ["y"], ["z"], traced("double", double)),
+            Stage("total", ["z", "items"], ["total"], traced("total", total)),
+        ]
+    )
+
+
+def names(stages):
+    return [stage.name for stage in stages]
+
+
+def test_required(pipeline):
+    assert names(pipeline.required(["z"])) == ["half", "double"]
+    assert names(pipeline.required(["total"])) == ["half", "scale", "double", "total"]
+    assert pipeline.inputs == ["x", "items"]
+    with pytest.raises(KeyError):
+        pipeline.required(["unknown"])
+
+
+def test_affected(pipeline):
+    assert [(s.name, ids) for s, ids in pipeline.affected(["x"])] == [
+        ("half", None),
+        ("scale", None),
+        ("double", None),
+        ("total", None),
+    ]
+    changed = pipeline.affected(["items"], {"items": ["w1", "v1"]})
+    assert [(s.name, ids) for s, ids in changed] == [
+        ("scale", ["w1"]),
+        ("total", None),
+    ]
+    # No changed element is processed by the stage
+    changed = pipeline.affected(["items"], {"items": ["v1"]})
+    assert [(s.name, ids) for s, ids in changed] == [("total", None)]
+
+
+def test_update_follows_the_changed_outputs(pipeline, calls):
+    state = pipeline.run({"x": 4, "items": {"w1": 1, "w2": 2}})
+    assert state["total"] == 2 * 2 + 2 + 4
+    calls.clear()
+
+    # y stays 2: the stages reading it are not re-run
+    state["x"] = 5
+    rerun = pipeline.update(state, ["x"], same=lambda a, b: a == b)
+    assert names(stage for stage, _ in rerun) == ["half"] == [n for n, _ in calls]
+
+    calls.clear()
+    state["items"]["w1"] = 3
+    rerun = pipeline.update(state, ["items"], {"items": ["w1"]})
+    assert calls == [("scale", ["w1"]), ("total", None)]
+    assert state["items"] == {"w1": 6, "w2": 4} and state["total"] == 14
+
+    calls.clear()
+    state["x"] = 6
+    pipeline.update(state, ["x"])
+    assert [n for n, _ in calls] == ["half", "scale", "double", "total"]
+
+
+def test_parallel_run_matches_the_sequential_run(pipeline):
+    sequential = pipeline.run({"x": 7, "items": {"w1": 1}})
+    parallel = pipeline.run({"x": 7, "items": {"w1": 1}}, max_workers=4)
+    assert parallel == sequential
+
+
+def test_invalid_dags():
+    with pytest.raises(ValueError):
+        Pipeline([Stage("a", ["x"], ["y"], half), Stage("b", ["x"], ["y"], half)])
+    with pytest.raises(ValueError):
+        Pipeline([Stage("b", ["y"], ["z"], double), Stage("a", ["x"], ["y"], half)])
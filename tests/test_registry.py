@@ -0,0 +1,74 @@
+"""
+The abaques of DPE are materialised on first access, from the bundle when it is up to date.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from py3cl import AbaqueRegistry, abaques_configs
+from py3cl.libs import registry
+from py3cl.py3CL import data_path
+
+NAMES = ["dpe", "ges", "heure_eclairage"]
+CONFIGS = {name: abaques_configs[name] for name in NAMES}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "abaques.bundle")
+
+
+def test_abaques_are_materialised_on_first_access():
+    abaques = AbaqueRegistry(CONFIGS, data_path)
+    assert abaques.materialised() == []
+    assert "ges" in abaques and len(abaques) == len(NAMES)
+
+    abaques["ges"]
+    assert abaques.materialised() == ["ges"]
+    with pytest.raises(KeyError):
+        abaques["unknown"]
+
+
+def test_preload_reports_the_abaques_it_materialises():
+    abaques = AbaqueRegistry(CONFIGS, data_path)
+    abaques["ges"]
+
+    assert abaques.preload() == ["dpe", "heure_eclairage"]
+    assert abaques.materialised() == NAMES
+    assert abaques.preload() == []
+
+
+def test_stale_bundle_is_rewritten_after_first_access(path):
+    abaques = AbaqueRegistry(CONFIGS, data_path, path)
+    abaques["dpe"]
+    assert os.path.exists(path)
+    assert abaques.materialised() == NAMES
+
+    restored = AbaqueRegistry(CONFIGS, data_path, path)
+    restored["dpe"]
+    assert restored.materialised() == ["dpe"]
+    inputs = {"conso_per_square_meter": np.array([40.0, 120.0, 500.0])}
+    labels, miss = restored["dpe"].lookup_many(inputs, "dpe")
+    assert labels.tolist() == abaques["dpe"].lookup_many(inputs, "dpe")[0].tolist()
+    assert not miss.any()
+
+
+def test_preload_rewrites_a_stale_bundle(path):
+    abaques = AbaqueRegistry(CONFIGS, data_path, path)
+    assert abaques.preload() == NAMES
+    assert os.path.exists(path)
+
+    restored = AbaqueRegistry(CONFIGS, data_path, path)
+    assert restored.preload() == NAMES
+    assert restored.preload() == []
+
+
+def test_unwritable_bundle_directory_keeps_abaques_lazy(path, monkeypatch):
+    monkeypatch.setattr(registry.os, "access", lambda *args: False)
+    abaques = AbaqueRegistry(CONFIGS, data_path, path)
+
+    abaques["dpe"]
+    assert abaques.materialised() == ["dpe"]
+    assert not os.path.exists(path)
@@ -0,0 +1,40 @@
+"""
+forward_sensitivity ranks the numerical fields of a building by the elasticities of its consumption.
+"""
+
+import numpy as np
+import pytest
+
+from py3cl import DPE, DPEInput
+
+from tests.test_parity import BASE, MUR, building
+
+
+@pytest.fixture(scope="module")
+def dpe():
+    return DPE()
+
+
+def test_elasticities_match_forward_delta(dpe):
+    kwargs = DPEInput(
+        **building(parois={**BASE["parois"], "mur1": {**MUR, "r_isolant": 0.0}})
+    )
+    previous = dpe.forward(kwargs, keep_input=True)
+
+    table = dpe.forward_sensitivity(kwargs)
+
+    first = table.iloc[0]
+    delta = {first["name"]: first["perturbed"]}
+    if first["field"] is not None:
+        delta = {first["field"]: {first["id"]: delta}}
+    expected = dpe.forward_delta(previous, delta)
+    assert first["C_primaire_m2"] == expected["C_primaire_m2"]
+    change = (first["perturbed"] - first["value"]) / first["value"]
+    assert first["elasticity_C_primaire_m2"] == pytest.approx(
+        (expected["C_primaire_m2"] / previous["C_primaire_m2"] - 1) / change
+    )
+
+    # The fields set to 0 have no relative perturbation, and are listed last
+    zero = table[(table["id"] == "mur1") & (table["name"] == "r_isolant")]
+    assert len(zero) == 1 and zero.index[0] >= (~table["perturbed"].isna()).sum()
+    assert np.isnan(zero[["perturbed", "elasticity_C_primaire_m2"]].values).all()
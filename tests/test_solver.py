@@ -0,0 +1,83 @@
+"""
+The label solver searches the cheapest changes reaching a label, evaluated with forward_variants.
+"""
+
+import numpy as np
+import pytest
+
+from py3cl import DPE, DPEInput, LabelSolver
+
+from tests.test_parity import BASE, MUR, building
+
+COSTS = {
+    "parois": {"isolation": {True: 5000}, "materiaux": 3000},
+    "vitrages": {"type_vitrage": {"Triple Vitrage": 900}},
+    "chauffage": {"type_generateur": 9000},
+}
+METRICS = ["C_primaire_m2", "emission_totale_m2", "dpe", "ges"]
+
+
+@pytest.fixture(scope="module")
+def dpe():
+    return DPE()
+
+
+@pytest.fixture
+def uninsulated():
+    return DPEInput(
+        **building(parois={**BASE["parois"], "mur1": {**MUR, "isolation": False}})
+    )
+
+
+def test_candidates_can_be_computed(dpe, uninsulated):
+    solver = LabelSolver(dpe, COSTS)
+    previous = dpe.forward(uninsulated, keep_input=True)
+    changes = solver.candidates(uninsulated)
+
+    walls = [c for c in changes if c["id"] == "mur1" and c["name"] == "materiaux"]
+    # The materials of floors have no value for the thickness of the wall
+    assert walls
+    assert "Bardeaux et remplissage" not in [c["value"] for c in walls]
+    for change in changes:
+        if change["field"] == "parois":
+            dpe.forward_delta(previous, solver._delta([change]))
+
+
+def test_forward_variants_flags_the_variants_that_cannot_be_computed(dpe):
+    previous = dpe.forward(DPEInput(**BASE), keep_input=True)
+    deltas = [
+        {"vitrages": {"vitrage1": {"type_vitrage": "Triple Vitrage"}}},
+        {"parois": {"mur1": {"materiaux": "Bardeaux et remplissage"}}},
+        {"postal_code": "unknown"},
+        {"surface_habitable": 95.0},
+    ]
+
+    batch = dpe.forward_variants(previous, deltas, outputs=METRICS, flag_misses=True)
+
+    assert batch["miss"].tolist() == [False, True, True, False]
+    assert np.isnan(batch["C_primaire_m2"][[1, 2]]).all()
+    assert batch["dpe"][1] is None and batch["dpe"][2] is None
+    for k in [0, 3]:
+        expected = dpe.forward_delta(previous, deltas[k])
+        for metric in METRICS:
+            assert batch[metric][k] == expected[metric], metric
+    with pytest.raises(ValueError):
+        dpe.forward_variants(previous, deltas[1:2], outputs=METRICS)
+
+
+def test_solution_reaches_the_target(dpe, uninsulated):
+    solver = LabelSolver(dpe, COSTS)
+    assert dpe.forward(uninsulated)["dpe"] == "D"
+
+    solution = solver.solve(uninsulated, "C")
+
+    assert solution["cost"] == sum(change["cost"] for change in solution["changes"])
+    assert solution["dpe"] in ["A", "B", "C"]
+    result = dpe.forward_delta(
+        dpe.forward(uninsulated, keep_input=True), solution["delta"]
+    )
+    for metric in METRICS:
+        assert result[metric] == solution[metric], metric
+    # The insulation of the wall is the cheapest single change reaching C
+    assert solution["delta"] == {"parois": {"mur1": {"isolation": True}}}
+    assert solver.solve(uninsulated, "E")["changes"] == []
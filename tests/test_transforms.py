@@ -0,0 +1,116 @@
+"""
+The named transforms of the abaque configs give the same columns as the lambdas they replaced.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from py3cl import Abaque, abaques_configs
+from py3cl.libs.transforms import apply_reduction, apply_transform
+from py3cl.py3CL import data_path
+
+# The lambdas of the configs, their transforms and sample values of their columns
+MIGRATED = [
+    (
+        "lambda x: True if x == 1 else False",
+        {"transform": "equals", "value": 1},
+        [1, 0, 1.0, 2, np.nan],
+    ),
+    (
+        "lambda x: not('<' in str(x) or '?' in str(x))",
+        {"transform": "contains_any", "values": ["<", "?"], "negate": True},
+        ["< 10", "10 ?", "10", np.nan, 5],
+    ),
+    (
+        "lambda x: '<' in str(x) or '?' in str(x)",
+        {"transform": "contains_any", "values": ["<", "?"]},
+        ["< 10", "10 ?", "10", np.nan, 5],
+    ),
+    (
+        "lambda x: x if not(np.isnan(x)) else 100",
+        {"transform": "fill_missing", "value": 100},
+        [1.5, np.nan, 0.0],
+    ),
+    (
+        'lambda x: True if x=="Isolé" else False',
+        {"transform": "equals", "value": "Isolé"},
+        ["Isolé", "Non isolé", np.nan],
+    ),
+    ("lambda x: x[-1]", {"transform": "substring", "start": -1}, ["H1a", "H2"]),
+    ("lambda x: x/1000", {"transform": "divide", "by": 1000}, [1500, 0, np.nan]),
+    (
+        "lambda x: x=='Chauffage'",
+        {"transform": "equals", "value": "Chauffage"},
+        ["Chauffage", "ECS", np.nan],
+    ),
+    (
+        "lambda x: 'Bois ou bois/métal' if x == 'Bois' else x",
+        {"transform": "map_values", "values": {"Bois": "Bois ou bois/métal"}},
+        ["Bois", "PVC", np.nan],
+    ),
+    ("lambda x: not(str(x)=='nan')", {"transform": "notna"}, ["a", np.nan, 0.0]),
+    (
+        "lambda x: x in ['Inconnu']",
+        {"transform": "isin", "values": ["Inconnu"]},
+        ["Inconnu", "Connu", np.nan],
+    ),
+    ("lambda x: x == 0", {"transform": "equals", "value": 0}, [0, 1, 0.0]),
+]
+
+
+@pytest.mark.parametrize("function, spec, values", MIGRATED)
+def test_transform_matches_the_lambda(function, spec, values):
+    series = pd.Series(values, dtype=object)
+
+    expected = series.apply(eval(function))
+    actual = apply_transform(series.copy(), {"col": "x", **spec})
+    # NaN are equal in Series.equals
+    assert pd.Series(actual.tolist()).equals(pd.Series(expected.tolist()))
+
+
+def test_concat_matches_the_lambda():
+    frame = pd.DataFrame({"a": ["H1", "H2"], "b": ["a", "b"], "c": [1, 2]})
+    spec = {"cols": ["a", "b"], "new_col": "zone", "transform": "concat"}
+
+    expected = frame.apply(lambda row: (lambda x: x[0] + x[1])([row.a, row.b]), axis=1)
+    assert apply_reduction(frame, spec).tolist() == expected.tolist()
+
+
+def test_rd_ecs_lambda_was_never_applied():
+    # The mapping of Rd_ecs was a syntax error, the column was left unchanged
+    with pytest.raises(SyntaxError):
+        eval("lambda x: True if x == 1 elif False if x == 0 else None")
+    spec = {"transform": "map_values", "values": {1: True, 0: False}, "default": None}
+
+    mapped = apply_transform(pd.Series([1, 0, 2]), spec)
+    assert mapped.tolist() == [True, False, None]
+
+
+def test_legacy_functions_give_the_same_abaque(tmp_path):
+    with open(abaques_configs["umur0"]) as f:
+        config = yaml.safe_load(f)
+    config["mapping"] = [
+        {
+            "col": "epaisseur",
+            "function": 'lambda x: float(x.replace(" et -", "").replace("Sans objet", "100"))',
+        }
+    ]
+    legacy = tmp_path / "umur0.yaml"
+    legacy.write_text(yaml.safe_dump(config, allow_unicode=True))
+
+    expected = Abaque(abaques_configs["umur0"], name="umur0", data_path=data_path)
+    actual = Abaque(str(legacy), name="umur0", data_path=data_path)
+    assert actual.key_characteristics["epaisseur"] == (
+        expected.key_characteristics["epaisseur"]
+    )
+    combinations = pd.DataFrame(expected.valid_cat_combinations)
+    materials = combinations["umur0_materiaux"].repeat(4).to_numpy()
+    columns = {
+        "umur0_materiaux": materials,
+        "epaisseur": np.tile([5.0, 20.0, 42.0, 100.0], len(combinations)),
+    }
+    np.testing.assert_array_equal(
+        actual.lookup_many(columns, "umur")[0], expected.lookup_many(columns, "umur")[0]
+    )